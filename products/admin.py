@@ -1,6 +1,7 @@
 # products/admin.py
 from django.contrib import admin
 from .models import ClothingStyle
+from .search import search_index_available, search_queryset
 
 @admin.register(ClothingStyle)
 class ClothingStyleAdmin(admin.ModelAdmin):
@@ -8,4 +9,10 @@ class ClothingStyleAdmin(admin.ModelAdmin):
     list_filter = ['is_active', 'created_at']
     search_fields = ['name', 'description']
     readonly_fields = ['id', 'created_at', 'updated_at']
-    list_editable = ['is_active']
\ No newline at end of file
+    list_editable = ['is_active']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the FTS5 index instead of LIKE '%term%' scans over search_fields.
+        if not search_term or not search_index_available():
+            return super().get_search_results(request, queryset, search_term)
+        return search_queryset(queryset, search_term), False
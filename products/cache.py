@@ -0,0 +1,60 @@
+# products/cache.py
+import time
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db.models import Count, Max
+from .models import ClothingStyle
+
+CATALOG_VERSION_KEY = 'products:catalog-version'
+CATALOG_GENERATION_KEY = 'products:catalog-generation'
+
+
+def generation_cache():
+    # Shared by every process, so a write made anywhere starts a generation
+    # everybody sees; the versions themselves are cached per process.
+    return caches[getattr(settings, 'CATALOG_VERSION_CACHE', 'default')]
+
+
+def _catalog_generation():
+    shared = generation_cache()
+    generation = shared.get(CATALOG_GENERATION_KEY)
+    if generation is None:
+        # add() so concurrent first readers agree on one generation
+        shared.add(CATALOG_GENERATION_KEY, str(time.time_ns()), None)
+        generation = shared.get(CATALOG_GENERATION_KEY)
+    return generation
+
+
+def get_catalog_version():
+    """
+    Return ``(version, last_modified)`` for the ClothingStyle table.
+
+    The version combines the row count with the newest ``updated_at`` so it
+    changes on every insert, update and delete. It is computed with one
+    aggregate query and then served from the cache, under the current
+    generation, until a model signal invalidates it.
+    """
+    key = f'{CATALOG_VERSION_KEY}:{_catalog_generation()}'
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    stats = ClothingStyle.objects.aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+    last_modified = stats['last_modified']
+    stamp = f'{last_modified.timestamp():.6f}' if last_modified else '0'
+    cached = (f"{stats['count']}-{stamp}", last_modified)
+    cache.set(key, cached, getattr(settings, 'CATALOG_VERSION_TIMEOUT', 60))
+    return cached
+
+
+def invalidate_catalog():
+    """
+    Start a new generation. A reader that read the old generation and
+    aggregated the old rows stores its version where nobody looks any more,
+    and every response cached under the old version becomes unreachable and
+    simply expires.
+    """
+    generation_cache().delete(CATALOG_GENERATION_KEY)
+
+
+def catalog_cache_key(prefix, version=None):
+    return f'products:{prefix}:{version or get_catalog_version()[0]}'
@@ -0,0 +1,20 @@
+# products/checks.py
+from django.conf import settings
+from django.core import checks
+from sews.result_cache import PER_PROCESS_BACKENDS
+
+
+@checks.register(checks.Tags.caches)
+def check_catalog_version_cache(app_configs, **kwargs):
+    alias = getattr(settings, 'CATALOG_VERSION_CACHE', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend in PER_PROCESS_BACKENDS:
+        return [checks.Warning(
+            f'CATALOG_VERSION_CACHE names the per-process cache {alias!r}.',
+            hint=(
+                'Writes made by other processes will not change the catalog ETag until '
+                'CATALOG_VERSION_TIMEOUT passes; use a cache every process shares.'
+            ),
+            id='products.W001',
+        )]
+    return []
@@ -0,0 +1,74 @@
+# products/management/commands/backfill_thumbnails.py
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from products.models import ClothingStyle
+from products.signals import clothing_styles_changed
+from products.thumbnails import is_readable_source, render_source, thumbnail_options
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnails for every clothing style image in parallel (safe to interrupt and rerun)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+        parser.add_argument(
+            '--chunk-size', type=int, default=200,
+            help='Styles per chunk; progress is committed after each chunk',
+        )
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many styles')
+        parser.add_argument('--force', action='store_true', help='Reprocess styles that already have thumbnails')
+
+    def handle(self, *args, **options):
+        options_for_workers = thumbnail_options()
+        queryset = ClothingStyle.objects.order_by('pk')
+        if not options['force']:
+            # Finished styles are skipped, which is what makes a rerun resume.
+            queryset = queryset.filter(image_sha256='')
+        done = failed = skipped = 0
+        last_pk = None
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            while options['limit'] is None or done + failed + skipped < options['limit']:
+                chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+                size = options['chunk_size']
+                if options['limit'] is not None:
+                    size = min(size, options['limit'] - done - failed - skipped)
+                rows = list(chunk.values_list('pk', 'image')[:size])
+                if not rows:
+                    break
+                last_pk = rows[-1][0]
+                futures = {}
+                for pk, image in rows:
+                    # The image field is free text: never open arbitrary paths or schemes
+                    if not is_readable_source(image, options_for_workers['source_root']):
+                        skipped += 1
+                        logger.warning('Skipping clothing style %s: cannot read image source %r', pk, image)
+                        continue
+                    futures[executor.submit(render_source, image, options_for_workers)] = pk
+                finished = []
+                for future in as_completed(futures):
+                    pk = futures[future]
+                    try:
+                        finished.append(ClothingStyle(
+                            pk=pk, image_sha256=future.result(), updated_at=timezone.now(),
+                        ))
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f'{pk}: {e}')
+                with transaction.atomic():
+                    ClothingStyle.objects.bulk_update(finished, ['image_sha256', 'updated_at'])
+                    clothing_styles_changed.send(sender=ClothingStyle, pks=[style.pk for style in finished])
+                done += len(finished)
+                self.stdout.write(f'{done} processed, {failed} failed, {skipped} skipped')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled thumbnails for {done} clothing styles in {elapsed:.1f}s '
+            f'({failed} failed, {skipped} skipped)'
+        ))
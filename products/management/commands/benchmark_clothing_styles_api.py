@@ -0,0 +1,57 @@
+# products/management/commands/benchmark_clothing_styles_api.py
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from products.views import clothing_styles_api
+from sews.benchmark import run_isolated, scratch_database
+
+
+def _measure(query_string):
+    request = RequestFactory().get('/api/clothing-styles/' + query_string)
+    started = time.perf_counter()
+    response = clothing_styles_api(request)
+    if response.streaming:
+        chunks = iter(response.streaming_content)
+        size = len(next(chunks))
+        first_byte = time.perf_counter() - started
+        for chunk in chunks:
+            size += len(chunk)
+    else:
+        size = len(response.content)
+        first_byte = time.perf_counter() - started
+    return {
+        'ttfb': first_byte,
+        'total': time.perf_counter() - started,
+        'bytes': size,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare peak RSS and time-to-first-byte of the buffered and streaming clothing styles API'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[1000, 100000, 1000000],
+            help='Catalog sizes to benchmark',
+        )
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(
+                f"{'rows':>9} {'mode':<9} {'ttfb ms':>10} {'total ms':>10} {'MiB out':>9} "
+                f"{'peak RSS MiB':>13} {'RSS growth MiB':>15}"
+            )
+            for rows in sorted(options['rows']):
+                call_command('seed_data', count=rows, batch_size=options['batch_size'], stdout=StringIO())
+                for mode, query_string in (('buffered', ''), ('streaming', '?stream=1')):
+                    result = run_isolated(_measure, query_string)
+                    self.stdout.write(
+                        f"{rows:>9} {mode:<9} {result['ttfb'] * 1000:>10.1f} "
+                        f"{result['total'] * 1000:>10.1f} {result['bytes'] / 2**20:>9.1f} "
+                        f"{result['peak_rss_kb'] / 1024:>13.1f} {result['rss_growth_kb'] / 1024:>15.1f}"
+                    )
@@ -0,0 +1,72 @@
+import json
+import statistics
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from sews.benchmark import scratch_database
+from users.authentication import refresh_token_for
+from users.models import CustomUser, TailorDetail
+from users.schema import TAILOR_DIRECTORY_ORDERING
+
+# What the app asks for when the catalog screen opens.
+OPERATIONS = [
+    {'query': '''query Catalog { allClothingStyles(first: 20) {
+        edges { node { id name cost thumbnailUrl(size: 256) } } pageInfo { hasNextPage endCursor } } }'''},
+    {'query': '''query Directory { tailors(first: 10) {
+        edges { node { id username areaOfWork products { productName cost } } } } }'''},
+    {'query': 'query Tailor($id: ID) { tailor(id: $id) { id fullName products { productName cost } } }'},
+    {'query': 'query Me($id: ID) { customUser(id: $id) { id email firstName lastName } }'},
+]
+
+
+def _screen_us(client, bodies, header, repeat):
+    """Median time to post ``bodies`` one after another, through every middleware."""
+    payloads = [json.dumps(body) for body in bodies]
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for payload in payloads:
+            response = client.post('/graphql/', payload, content_type='application/json', HTTP_AUTHORIZATION=header)
+            if response.status_code != 200:
+                raise RuntimeError(response.content.decode())
+        samples.append(time.perf_counter() - started)
+    with CaptureQueriesContext(connection) as ctx:
+        for payload in payloads:
+            client.post('/graphql/', payload, content_type='application/json', HTTP_AUTHORIZATION=header)
+    return statistics.median(samples) * 1e6, len(ctx.captured_queries), sum(map(len, payloads))
+
+
+class Command(BaseCommand):
+    help = 'Time the operations of one screen sent as separate requests and as one batched request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=2000, help='Clothing styles to seed')
+        parser.add_argument('--tailors', type=int, default=200, help='Tailors to seed')
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            call_command('seed_data', count=options['count'], tailors=options['tailors'], stdout=self.stdout)
+            user = CustomUser.objects.create_user(email='bench@example.com', password='bench-pass')
+            header = f'Bearer {refresh_token_for(user).access_token}'
+            # The directory's first tailor, so the tailor screen can reuse its products
+            tailor = TailorDetail.objects.order_by(*TAILOR_DIRECTORY_ORDERING).first()
+            operations = [dict(operation) for operation in OPERATIONS]
+            operations[2]['variables'] = {'id': tailor.pk}
+            operations[3]['variables'] = {'id': user.pk}
+
+            client = Client()
+            cases = [
+                (f'{len(operations)} separate requests', operations),
+                ('1 batched request', [operations]),
+            ]
+            _screen_us(client, cases[1][1], header, 5)  # warm the document cache
+            self.stdout.write(f"{'case':<24} {'us/screen':>10} {'queries':>8} {'body bytes':>11}")
+            for label, bodies in cases:
+                cost, queries, size = _screen_us(client, bodies, header, options['repeat'])
+                self.stdout.write(f'{label:<24} {cost:>10.0f} {queries:>8} {size:>11}')
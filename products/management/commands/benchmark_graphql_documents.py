@@ -0,0 +1,79 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from graphql import parse, validate
+
+from sews.benchmark import scratch_database
+from sews.persisted_queries import document_cache, query_hash
+from sews.schema import schema
+from sews.views import PersistedQueryGraphQLView
+
+# A catalog page the way a client typically writes it: variables, a fragment, nested fields.
+QUERY = '''
+    query CatalogPage($first: Int, $after: String, $minCost: Decimal, $maxCost: Decimal) {
+        activeClothingStyles(first: $first, after: $after, minCost: $minCost, maxCost: $maxCost, orderBy: COST) {
+            edges { cursor node { ...StyleCard } }
+            pageInfo { hasNextPage endCursor }
+        }
+        clothingStylePriceFacets(buckets: 5) { lower upper count }
+        catalogVersion
+    }
+    fragment StyleCard on ClothingStyleType {
+        id name description cost isActive createdAt
+        small: thumbnailUrl(size: 128) large: thumbnailUrl(size: 512, format: "jpeg")
+    }
+'''
+VARIABLES = {'first': 20, 'minCost': '1000', 'maxCost': '200000'}
+
+
+def _request_us(view, body, repeat, cold=False):
+    factory = RequestFactory()
+    payload = json.dumps(body)
+    samples = []
+    for _ in range(repeat):
+        if cold:
+            document_cache.clear()
+        request = factory.post('/graphql/', payload, content_type='application/json')
+        started = time.perf_counter()
+        response = view(request)
+        samples.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise RuntimeError(response.content.decode())
+    return statistics.median(samples) * 1e6, len(payload)
+
+
+class Command(BaseCommand):
+    help = 'Parse/validate cost and request size of a GraphQL operation: full text, cached document and APQ hash'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=500)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        graphql_schema = schema.graphql_schema
+        started = time.perf_counter()
+        for _ in range(repeat):
+            validate(graphql_schema, parse(QUERY))
+        parse_validate_us = (time.perf_counter() - started) / repeat * 1e6
+        self.stdout.write(f'parse + validate alone: {parse_validate_us:.0f} us')
+
+        view = PersistedQueryGraphQLView.as_view()
+        full = {'query': QUERY, 'variables': VARIABLES}
+        persisted = {
+            'variables': VARIABLES,
+            'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': query_hash(QUERY)}},
+        }
+        with scratch_database():
+            _request_us(view, dict(full, **persisted), 1)  # registers the hash
+            self.stdout.write(f"{'request':<28} {'us/request':>11} {'body bytes':>11}")
+            for label, body, cold in (
+                ('full text, parsed each time', full, True),
+                ('full text, cached document', full, False),
+                ('APQ hash, cached document', persisted, False),
+                ('APQ hash, stored text', persisted, True),
+            ):
+                cost, size = _request_us(view, body, repeat, cold)
+                self.stdout.write(f'{label:<28} {cost:>11.0f} {size:>11}')
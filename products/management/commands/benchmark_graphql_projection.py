@@ -0,0 +1,82 @@
+import statistics
+import time
+from contextlib import contextmanager
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+
+from sews.benchmark import scratch_database
+from sews.schema import schema
+
+QUERIES = {
+    'catalog id name cost': '{ allClothingStyles(first: 100) { edges { node { id name cost } } } }',
+    'catalog + thumbnail': '{ allClothingStyles(first: 100) { edges { node { id name thumbnailUrl } } } }',
+    'catalog all fields': '''{ allClothingStyles(first: 100) { edges { node {
+        id name description cost image createdAt updatedAt isActive } } } }''',
+    'search id name': '{ searchClothingStyles(query: "kitenge", first: 100) { edges { node { id name } } } }',
+}
+
+
+def _value_bytes(value):
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    return 8
+
+
+@contextmanager
+def bytes_read(counter):
+    """Add the size of every value the wrapped queries return to ``counter['bytes']``."""
+    measuring = False
+
+    def wrapper(execute, sql, params, many, context):
+        nonlocal measuring
+        result = execute(sql, params, many, context)
+        if not measuring and sql.lstrip().upper().startswith('SELECT'):
+            # Re-run the statement on a second cursor to size its rows
+            # without consuming the caller's.
+            measuring = True
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    counter['bytes'] += sum(_value_bytes(value) for row in cursor.fetchall() for value in row)
+            finally:
+                measuring = False
+        return result
+
+    with connection.execute_wrapper(wrapper):
+        yield counter
+
+
+class Command(BaseCommand):
+    help = 'Bytes read from the database and latency per GraphQL query, with and without column projection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--styles', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            call_command('seed_data', count=options['styles'], stdout=StringIO())
+            self.stdout.write(f"{'query':<22} {'projection':<10} {'KiB read':>9} {'p50 ms':>8}")
+            for label, query in QUERIES.items():
+                for enabled in (False, True):
+                    with override_settings(GRAPHQL_PROJECTION=enabled):
+                        counter = {'bytes': 0}
+                        with bytes_read(counter):
+                            result = schema.execute(query)
+                        if result.errors:
+                            raise result.errors[0]
+                        samples = []
+                        for _ in range(options['repeat']):
+                            started = time.perf_counter()
+                            schema.execute(query)
+                            samples.append(time.perf_counter() - started)
+                    self.stdout.write(
+                        f"{label:<22} {'on' if enabled else 'off':<10} {counter['bytes'] / 1024:>9.1f} "
+                        f"{statistics.median(samples) * 1000:>8.2f}"
+                    )
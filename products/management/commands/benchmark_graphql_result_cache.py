@@ -0,0 +1,66 @@
+import json
+import statistics
+import time
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from products.models import ClothingStyle
+from sews.benchmark import scratch_database
+from sews.result_cache import result_cache
+from sews.views import PersistedQueryGraphQLView
+
+# The anonymous catalog reads the result cache is meant for.
+QUERIES = [
+    ('allClothingStyles', '''query { allClothingStyles(first: 20) {
+        edges { node { id name cost thumbnailUrl(size: 256) } } pageInfo { hasNextPage endCursor } } }''', {}),
+    ('activeClothingStyles', '''query Active($minCost: Decimal) { activeClothingStyles(first: 20, minCost: $minCost, orderBy: COST) {
+        edges { node { id name cost } } } }''', {'minCost': '1000'}),
+    ('clothingStyle', 'query Style($id: ID) { clothingStyle(id: $id) { id name description cost thumbnailUrl } }', None),
+]
+
+
+def _request_us(view, payload, repeat, cold=False):
+    factory = RequestFactory()
+    samples = []
+    for _ in range(repeat):
+        if cold:
+            caches['graphql-results'].clear()
+        request = factory.post('/graphql/', payload, content_type='application/json')
+        started = time.perf_counter()
+        response = view(request)
+        samples.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise RuntimeError(response.content.decode())
+    return statistics.median(samples) * 1e6
+
+
+class Command(BaseCommand):
+    help = 'Catalog read latency with the GraphQL result cache off, missing and hitting'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20000, help='Clothing styles to seed')
+        parser.add_argument('--repeat', type=int, default=300)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        view = PersistedQueryGraphQLView.as_view()
+        with scratch_database():
+            call_command('seed_data', count=options['count'], stdout=self.stdout)
+            style_id = str(ClothingStyle.objects.values_list('pk', flat=True).first())
+            self.stdout.write(f"{'query':<22} {'uncached us':>12} {'miss us':>9} {'hit us':>8}")
+            for label, query, variables in QUERIES:
+                payload = json.dumps({'query': query, 'variables': variables or {'id': style_id}})
+                _request_us(view, payload, 5)  # warm the document cache
+                with override_settings(GRAPHQL_RESULT_CACHE_FIELDS={}):
+                    uncached = _request_us(view, payload, repeat)
+                miss = _request_us(view, payload, repeat, cold=True)
+                hit = _request_us(view, payload, repeat)
+                self.stdout.write(f'{label:<22} {uncached:>12.0f} {miss:>9.0f} {hit:>8.0f}')
+            stats = result_cache.stats()
+            self.stdout.write(
+                f"result cache: {stats['hits']} hits, {stats['misses']} misses, hit rate {stats['hit_rate']:.0%}"
+            )
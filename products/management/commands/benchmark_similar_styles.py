@@ -0,0 +1,60 @@
+# products/management/commands/benchmark_similar_styles.py
+import random
+import statistics
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from products.models import ClothingStyle
+from products.similarity import rebuild_similar_styles, refresh_similar_styles, similar_clothing_styles
+from sews.benchmark import scratch_database, timed
+
+
+def _percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Time the similar styles rebuild, an incremental refresh and the query path'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[10000, 100000],
+            help='Catalog sizes to benchmark',
+        )
+        parser.add_argument('--queries', type=int, default=1000)
+        parser.add_argument('--edits', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    @override_settings(SIMILAR_STYLES_ASYNC=False)
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with scratch_database():
+            self.stdout.write(
+                f"{'rows':>9} {'rebuild s':>10} {'refresh ms':>11} "
+                f"{'query p50 ms':>13} {'query p99 ms':>13}"
+            )
+            for rows in sorted(options['rows']):
+                call_command('seed_data', count=rows, stdout=StringIO())
+                rebuild = timed(rebuild_similar_styles)
+
+                ids = list(ClothingStyle.objects.values_list('pk', flat=True))
+                refreshes = []
+                for pk in rng.sample(ids, min(options['edits'], len(ids))):
+                    style = ClothingStyle.objects.get(pk=pk)
+                    ClothingStyle.objects.filter(pk=pk).update(description=style.description + ' reversible')
+                    refreshes.append(timed(refresh_similar_styles, [pk]))
+
+                latencies = []
+                for pk in rng.choices(ids, k=options['queries']):
+                    started = time.perf_counter()
+                    similar_clothing_styles(pk)
+                    latencies.append(time.perf_counter() - started)
+                self.stdout.write(
+                    f"{rows:>9} {rebuild:>10.1f} {statistics.median(refreshes) * 1000:>11.1f} "
+                    f"{statistics.median(latencies) * 1000:>13.2f} {_percentile(latencies, 0.99) * 1000:>13.2f}"
+                )
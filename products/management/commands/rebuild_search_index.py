@@ -0,0 +1,24 @@
+# products/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from products.models import ClothingStyle
+from products.search import install_search_index, search_index_available
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the clothing style full-text search index in one bulk pass'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not search_index_available(connection):
+            self.stdout.write(self.style.WARNING(
+                f'{connection.vendor} has no FTS5 index; search uses LIKE filters instead'
+            ))
+            return
+        with transaction.atomic(using=options['database']):
+            install_search_index(connection)
+        count = ClothingStyle.objects.using(options['database']).count()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search index for {count} clothing styles'))
@@ -0,0 +1,16 @@
+# products/management/commands/rebuild_similar_styles.py
+import time
+
+from django.core.management.base import BaseCommand
+from products.similarity import rebuild_similar_styles
+
+
+class Command(BaseCommand):
+    help = 'Recompute the similar clothing styles index from every name and description'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_similar_styles()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt similar styles for {count} clothing styles in {time.perf_counter() - started:.1f}s'
+        ))
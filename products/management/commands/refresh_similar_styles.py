@@ -0,0 +1,39 @@
+# products/management/commands/refresh_similar_styles.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from products.similarity import WRITE_BATCH_SIZE, drain_refresh_queue
+
+
+class Command(BaseCommand):
+    help = 'Apply the queued similar styles refreshes; with --interval, keep polling the queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Seconds to wait between polls; 0 drains the queue once and exits',
+        )
+        parser.add_argument('--batch-size', type=int, default=WRITE_BATCH_SIZE, help='Queue rows per refresh')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        while True:
+            started = time.perf_counter()
+            try:
+                handled = drain_refresh_queue(options['batch_size'])
+            except Exception as e:
+                if not options['interval']:
+                    raise
+                # A worker outlives one bad batch; the rows stay queued for the next poll
+                self.stderr.write(f'Similar styles refresh failed: {e}')
+                connection.close()
+            else:
+                if handled or not options['interval']:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Refreshed similar styles for {handled} queued changes in {time.perf_counter() - started:.1f}s'
+                    ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -1,12 +1,80 @@
 # products/management/commands/seed_data.py
-from django.core.management.base import BaseCommand
-from products.models import ClothingStyle
+import itertools
+import random
+import time
 import uuid
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from products.models import ClothingStyle
+from products.search import install_search_index, uninstall_search_index
+from products.signals import clothing_styles_changed
+from products.similarity import clear_similar_styles
+from users.auth_cache import principal_cache
+from users.models import CustomUser, TailorDetail, TailorProduct
+
+# Synthetic accounts are recognisable by these prefixes so a re-seed only
+# replaces what an earlier run generated, never real accounts.
+SEED_TAILOR_PREFIX = 'seed-tailor-'
+SEED_USER_PREFIX = 'seed-user-'
+
+ADJECTIVES = [
+    'Casual', 'Elegant', 'Classic', 'Modern', 'Vintage', 'Slim', 'Relaxed', 'Formal',
+    'Summer', 'Winter', 'Linen', 'Denim', 'Silk', 'Kitenge', 'Kanga', 'Embroidered',
+]
+GARMENTS = [
+    'T-Shirt', 'Dress', 'Suit', 'Jeans', 'Blouse', 'Coat', 'Hoodie', 'Shirt',
+    'Skirt', 'Jacket', 'Trouser', 'Gauni', 'Kanzu', 'Waistcoat', 'Shorts', 'Jumpsuit',
+]
+WORDS = [
+    'comfortable', 'cotton', 'tailored', 'fit', 'fabric', 'colors', 'evening', 'office',
+    'breathable', 'durable', 'hand', 'stitched', 'pattern', 'print', 'lining', 'pockets',
+    'collar', 'sleeves', 'wedding', 'casual', 'wear', 'local', 'bright', 'soft',
+]
+AREAS = [
+    'Kinondoni', 'Ilala', 'Temeke', 'Ubungo', 'Kigamboni', 'Arusha', 'Mwanza', 'Dodoma',
+    'Mbeya', 'Morogoro', 'Tanga', 'Moshi', 'Zanzibar', 'Iringa', 'Tabora', 'Kigoma',
+]
+FIRST_NAMES = ['Amani', 'Baraka', 'Neema', 'Juma', 'Rehema', 'Zawadi', 'Hassan', 'Asha', 'Daudi', 'Mwajuma']
+LAST_NAMES = ['Mushi', 'Mwakyusa', 'Kimaro', 'Said', 'Massawe', 'Nyerere', 'Mollel', 'Lyimo', 'Swai', 'Komba']
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
 
 class Command(BaseCommand):
     help = 'Seed the database with sample clothing styles'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count', type=int, default=0,
+            help='Generate this many synthetic clothing styles instead of the samples',
+        )
+        parser.add_argument('--tailors', type=int, default=0, help='Synthetic tailors to generate')
+        parser.add_argument(
+            '--products', type=int, default=0,
+            help='Synthetic tailor products to generate, spread over the seeded tailors',
+        )
+        parser.add_argument('--users', type=int, default=0, help='Synthetic customer users to generate')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed yields the same data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT transaction')
+        parser.add_argument(
+            '--password', default='seed-password',
+            help='Password shared by every synthetic account (hashed once)',
+        )
+
     def handle(self, *args, **options):
+        if any(options[name] for name in ('count', 'tailors', 'products', 'users')):
+            return self.seed_synthetic(options)
+        self.seed_samples()
+
+    def seed_samples(self):
         # Clear existing data
         ClothingStyle.objects.all().delete()
         
@@ -95,3 +163,169 @@ class Command(BaseCommand):
             self.style.SUCCESS(f'Successfully seeded {len(sample_styles)} clothing styles')
         )
 
+    def seed_synthetic(self, options):
+        """
+        Generate deterministic synthetic data with bulk_create, one
+        transaction per batch. Replaces the whole catalog and any accounts
+        from an earlier synthetic run.
+        """
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['products'] and not options['tailors']:
+            raise CommandError('--products needs --tailors to attach the products to')
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        if connection.vendor == 'sqlite':
+            # Random UUID keys hit every page of the indexes; the default 2 MB
+            # page cache turns that into disk reads long before a million rows.
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA cache_size = -262144')
+
+        if options['count']:
+            # The search triggers would index row by row; drop them and
+            # rebuild the index in one pass at the end instead, even when
+            # the insert fails part way.
+            uninstall_search_index()
+            try:
+                clear_similar_styles()
+                self.delete_catalog()
+                self.bulk_insert(ClothingStyle, self.clothing_styles(rng, options['count']), batch_size)
+            finally:
+                install_search_index()
+            clothing_styles_changed.send(sender=ClothingStyle)
+            self.stdout.write('Run rebuild_similar_styles to recompute the similar styles index.')
+
+        if options['tailors']:
+            self.delete_seeded(TailorDetail, 'username', SEED_TAILOR_PREFIX, batch_size)
+            password = make_password(options['password'])
+            self.bulk_insert(TailorDetail, self.tailors(rng, options['tailors'], password), batch_size)
+
+        if options['products']:
+            tailor_ids = list(
+                TailorDetail.objects.filter(username__startswith=SEED_TAILOR_PREFIX)
+                .order_by('id').values_list('id', flat=True)
+            )
+            self.bulk_insert(TailorProduct, self.products(rng, options['products'], tailor_ids), batch_size)
+
+        if options['users']:
+            self.delete_seeded(CustomUser, 'email', SEED_USER_PREFIX, batch_size)
+            password = make_password(options['password'])
+            self.bulk_insert(CustomUser, self.users(rng, options['users'], password), batch_size)
+
+    def delete_catalog(self):
+        """
+        Empty products_clothingstyle with one DELETE. QuerySet.delete()
+        would load every row to send post_delete; nothing cascades from
+        ClothingStyle and the caller announces the change once with
+        clothing_styles_changed instead.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(ClothingStyle._meta.db_table)}')
+
+    def delete_seeded(self, model, field, prefix, batch_size):
+        """
+        Delete the ``model`` rows whose ``field`` starts with ``prefix``
+        with raw DELETEs over ``batch_size`` wide pk ranges, one transaction
+        each. QuerySet.delete() would collect every account and its
+        products in memory and send post_delete row by row; instead the
+        rows that cascade (products, group and permission links, admin log
+        entries) go first, range by range, and the principal cache is
+        cleared once at the end.
+        """
+        seeded = model.objects.filter(**{f'{field}__startswith': prefix})
+        bounds = seeded.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            return
+        quote = connection.ops.quote_name
+        opts = model._meta
+        table, pk = quote(opts.db_table), quote(opts.pk.column)
+        dependents = [
+            (relation.related_model._meta.db_table, relation.field.column)
+            for relation in opts.related_objects if not relation.many_to_many
+        ] + [
+            (many.remote_field.through._meta.db_table, many.m2m_column_name())
+            for many in opts.many_to_many
+        ]
+        condition = f'{pk} >= %s AND {pk} < %s AND {quote(opts.get_field(field).column)} LIKE %s'
+        started = time.perf_counter()
+        total = 0
+        for low in range(bounds['low'], bounds['high'] + 1, batch_size):
+            params = [low, low + batch_size, f'{prefix}%']
+            with transaction.atomic(), connection.cursor() as cursor:
+                for dependent, column in dependents:
+                    cursor.execute(
+                        f'DELETE FROM {quote(dependent)} WHERE {quote(column)} IN '
+                        f'(SELECT {pk} FROM {table} WHERE {condition})',
+                        params,
+                    )
+                cursor.execute(f'DELETE FROM {table} WHERE {condition}', params)
+                total += cursor.rowcount
+        principal_cache.clear()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'Deleted {total} earlier {opts.verbose_name_plural} in {elapsed:.1f}s')
+
+    def bulk_insert(self, model, objects, batch_size):
+        started = time.perf_counter()
+        total = 0
+        for batch in batched(objects, batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=batch_size)
+            total += len(batch)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {total} {model._meta.verbose_name_plural} in {elapsed:.1f}s '
+            f'({total / elapsed if elapsed else total:.0f} rows/s)'
+        ))
+
+    def clothing_styles(self, rng, count):
+        for i in range(count):
+            name = f'{rng.choice(ADJECTIVES)} {rng.choice(GARMENTS)} {i:07d}'
+            yield ClothingStyle(
+                id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                name=name,
+                description=' '.join(rng.choices(WORDS, k=rng.randint(8, 30))).capitalize() + '.',
+                cost=Decimal(rng.randrange(5000, 300000, 500)),
+                image=f'https://images.example.com/styles/{i}.jpg',
+                is_active=rng.random() < 0.9,
+            )
+
+    def tailors(self, rng, count, password):
+        for i in range(count):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            tailor = TailorDetail(
+                username=f'{SEED_TAILOR_PREFIX}{i:07d}',
+                full_name=f'{first} {last}',
+                email=f'{SEED_TAILOR_PREFIX}{i:07d}@example.com',
+                national_id_number=f'SEED{i:016d}',
+                phone_number=f'+2557{rng.randrange(10**8):08d}',
+                sex=rng.choice('MF'),
+                area_of_residence=rng.choice(AREAS),
+                area_of_work=rng.choice(AREAS),
+                password=password,
+            )
+            # bulk_create() bypasses save()
+            tailor.set_area_keys()
+            yield tailor
+
+    def products(self, rng, count, tailor_ids):
+        categories = [value for value, _ in TailorProduct.CATEGORY_CHOICES]
+        for i in range(count):
+            category = rng.choice(categories)
+            yield TailorProduct(
+                tailor_id=rng.choice(tailor_ids),
+                category=category,
+                product_name=f'{rng.choice(ADJECTIVES)} {category.title()} {i:07d}',
+                product_image=f'https://images.example.com/products/{i}.jpg',
+                cost=Decimal(rng.randrange(5000, 300000, 500)),
+                description=' '.join(rng.choices(WORDS, k=rng.randint(8, 30))).capitalize() + '.',
+                measurement_guides='Chest, waist, hip and length in centimetres.',
+            )
+
+    def users(self, rng, count, password):
+        for i in range(count):
+            yield CustomUser(
+                email=f'{SEED_USER_PREFIX}{i:07d}@example.com',
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                password=password,
+            )
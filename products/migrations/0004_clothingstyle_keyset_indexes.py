@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-17 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_clothingstyle_delete_productdetail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clothingstyle',
+            index=models.Index(fields=['name', 'id'], name='products_cs_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clothingstyle',
+            index=models.Index(fields=['is_active', 'name', 'id'], name='products_cs_active_name_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2 on 2026-10-17 18:40
+
+from django.db import migrations
+
+# Frozen copy of the index as products.search defined it when this
+# migration was written: an external-content FTS5 table over the implicit
+# rowid of products_clothingstyle. 0009 replaces it; later changes to
+# products.search must not change what this migration does.
+FTS_SETUP_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_clothingstyle_fts USING fts5(
+        name, description,
+        content='products_clothingstyle', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    "DROP TRIGGER IF EXISTS products_clothingstyle_fts_ai",
+    "DROP TRIGGER IF EXISTS products_clothingstyle_fts_ad",
+    "DROP TRIGGER IF EXISTS products_clothingstyle_fts_au",
+    """
+    CREATE TRIGGER products_clothingstyle_fts_ai AFTER INSERT ON products_clothingstyle BEGIN
+        INSERT INTO products_clothingstyle_fts(rowid, name, description)
+        VALUES (new.rowid, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER products_clothingstyle_fts_ad AFTER DELETE ON products_clothingstyle BEGIN
+        INSERT INTO products_clothingstyle_fts(products_clothingstyle_fts, rowid, name, description)
+        VALUES ('delete', old.rowid, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER products_clothingstyle_fts_au AFTER UPDATE OF name, description ON products_clothingstyle BEGIN
+        INSERT INTO products_clothingstyle_fts(products_clothingstyle_fts, rowid, name, description)
+        VALUES ('delete', old.rowid, old.name, old.description);
+        INSERT INTO products_clothingstyle_fts(rowid, name, description)
+        VALUES (new.rowid, new.name, new.description);
+    END
+    """,
+    "INSERT INTO products_clothingstyle_fts(products_clothingstyle_fts) VALUES ('rebuild')",
+    "INSERT INTO products_clothingstyle_fts(products_clothingstyle_fts) VALUES ('optimize')",
+]
+
+FTS_TEARDOWN_SQL = [
+    "DROP TRIGGER IF EXISTS products_clothingstyle_fts_ai",
+    "DROP TRIGGER IF EXISTS products_clothingstyle_fts_ad",
+    "DROP TRIGGER IF EXISTS products_clothingstyle_fts_au",
+    "DROP TABLE IF EXISTS products_clothingstyle_fts",
+]
+
+
+def install_search_index(apps, schema_editor):
+    # FTS5 is SQLite only; other backends search with LIKE
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in FTS_SETUP_SQL:
+        schema_editor.execute(statement)
+
+
+def uninstall_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in FTS_TEARDOWN_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_clothingstyle_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
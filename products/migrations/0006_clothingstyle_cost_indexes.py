@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-17 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_clothingstyle_search_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='clothingstyle',
+            name='products_cs_active_name_idx',
+        ),
+        migrations.AddIndex(
+            model_name='clothingstyle',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['name', 'id'], name='products_cs_active_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clothingstyle',
+            index=models.Index(fields=['cost', 'id'], name='products_cs_cost_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clothingstyle',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['cost', 'id'], name='products_cs_active_cost_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clothingstyle',
+            index=models.Index(fields=['created_at', 'id'], name='products_cs_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clothingstyle',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at', 'id'], name='products_cs_active_created_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-17 18:43
+
+from django.db import migrations, models
+
+
+def reinstall_search_index(apps, schema_editor):
+    # Adding the column rebuilds products_clothingstyle on SQLite, which drops
+    # the search triggers and renumbers the rowids the index points at.
+    from products.search import install_search_index
+    install_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_clothingstyle_cost_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clothingstyle',
+            name='image_sha256',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(reinstall_search_index, reinstall_search_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-17 18:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_clothingstyle_image_sha256'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClothingStyleVector',
+            fields=[
+                ('style', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='products.clothingstyle')),
+                ('vector', models.BinaryField()),
+                ('threshold', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SimilarClothingStyle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('similar', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.clothingstyle')),
+                ('style', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.clothingstyle')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='similarclothingstyle',
+            constraint=models.UniqueConstraint(fields=('style', 'rank'), name='products_similar_style_rank_uniq'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 4.2 on 2026-10-17 19:05
+
+from django.db import migrations
+
+# Frozen copy of products.search as of this migration: the index moves off
+# the implicit rowid of products_clothingstyle onto its own key table, and
+# the FTS5 table keeps its own copy of the text. Later changes to
+# products.search must not change what this migration does.
+FTS_TEARDOWN_SQL = [
+    "DROP TRIGGER IF EXISTS products_clothingstyle_fts_ai",
+    "DROP TRIGGER IF EXISTS products_clothingstyle_fts_ad",
+    "DROP TRIGGER IF EXISTS products_clothingstyle_fts_au",
+    "DROP TABLE IF EXISTS products_clothingstyle_fts",
+    "DROP TABLE IF EXISTS products_clothingstyle_fts_key",
+]
+
+FTS_SETUP_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS products_clothingstyle_fts_key (
+        id INTEGER PRIMARY KEY,
+        style_id char(32) NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_clothingstyle_fts USING fts5(
+        name, description,
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER products_clothingstyle_fts_ai AFTER INSERT ON products_clothingstyle BEGIN
+        INSERT INTO products_clothingstyle_fts_key(style_id) VALUES (new.id);
+        INSERT INTO products_clothingstyle_fts(rowid, name, description)
+        VALUES ((SELECT id FROM products_clothingstyle_fts_key WHERE style_id = new.id), new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER products_clothingstyle_fts_ad AFTER DELETE ON products_clothingstyle BEGIN
+        DELETE FROM products_clothingstyle_fts
+        WHERE rowid = (SELECT id FROM products_clothingstyle_fts_key WHERE style_id = old.id);
+        DELETE FROM products_clothingstyle_fts_key WHERE style_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER products_clothingstyle_fts_au AFTER UPDATE OF name, description ON products_clothingstyle BEGIN
+        UPDATE products_clothingstyle_fts SET name = new.name, description = new.description
+        WHERE rowid = (SELECT id FROM products_clothingstyle_fts_key WHERE style_id = new.id);
+    END
+    """,
+    "INSERT INTO products_clothingstyle_fts_key(style_id) SELECT id FROM products_clothingstyle",
+    """
+    INSERT INTO products_clothingstyle_fts(rowid, name, description)
+    SELECT k.id, c.name, c.description
+    FROM products_clothingstyle_fts_key k JOIN products_clothingstyle c ON c.id = k.style_id
+    """,
+    "INSERT INTO products_clothingstyle_fts(products_clothingstyle_fts) VALUES ('optimize')",
+]
+
+
+def install_search_index(apps, schema_editor):
+    # FTS5 is SQLite only; other backends search with LIKE
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in FTS_TEARDOWN_SQL + FTS_SETUP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_similar_clothing_styles'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
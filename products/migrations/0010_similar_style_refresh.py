@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-17 19:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_clothingstyle_search_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarStyleRefresh',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('style_id', models.UUIDField()),
+            ],
+        ),
+    ]
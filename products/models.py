@@ -9,14 +9,78 @@ class ClothingStyle(models.Model):
     description = models.TextField()
     cost = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     image = models.URLField(max_length=500)
+    # sha256 of the ingested source image; thumbnails live under MEDIA_ROOT by this digest.
+    image_sha256 = models.CharField(max_length=64, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Keyset pagination over (column, id) for the catalog connections.
+            # The "active" variants are partial indexes because the ORM
+            # renders is_active=True as a bare boolean predicate, which an
+            # index leading with is_active cannot serve on SQLite.
+            models.Index(fields=['name', 'id'], name='products_cs_name_id_idx'),
+            models.Index(
+                fields=['name', 'id'], name='products_cs_active_name_idx',
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(fields=['cost', 'id'], name='products_cs_cost_id_idx'),
+            models.Index(
+                fields=['cost', 'id'], name='products_cs_active_cost_idx',
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(fields=['created_at', 'id'], name='products_cs_created_id_idx'),
+            models.Index(
+                fields=['created_at', 'id'], name='products_cs_active_created_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
         verbose_name = 'Clothing Style'
         verbose_name_plural = 'Clothing Styles'
 
     def __str__(self):
         return self.name
+
+
+# The similarity tables reference ClothingStyle without database constraints
+# so bulk and raw deletes of styles never fail on them; products.similarity
+# removes the dangling rows when it refreshes the deleted ids.
+class ClothingStyleVector(models.Model):
+    """Hashed text features of a clothing style, kept for incremental similarity updates."""
+    style = models.OneToOneField(
+        ClothingStyle, primary_key=True, related_name='+',
+        on_delete=models.DO_NOTHING, db_constraint=False,
+    )
+    vector = models.BinaryField()
+    # Score of the weakest stored neighbour (0 while the list is not full);
+    # a changed style only disturbs the lists whose threshold it beats.
+    threshold = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class SimilarClothingStyle(models.Model):
+    """Precomputed top-k neighbours of a clothing style, best first."""
+    # Served by the (style, rank) unique index.
+    style = models.ForeignKey(
+        ClothingStyle, related_name='+', on_delete=models.DO_NOTHING,
+        db_constraint=False, db_index=False,
+    )
+    similar = models.ForeignKey(
+        ClothingStyle, related_name='+', on_delete=models.DO_NOTHING, db_constraint=False,
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['style', 'rank'], name='products_similar_style_rank_uniq'),
+        ]
+
+
+class SimilarStyleRefresh(models.Model):
+    """A clothing style whose neighbour lists still wait for the refresh_similar_styles worker."""
+    # A plain UUID rather than a key: deleted styles stay queued so their links get removed.
+    style_id = models.UUIDField()
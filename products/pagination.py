@@ -0,0 +1,134 @@
+# products/pagination.py
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from graphene import relay
+
+
+def get_page_size(first):
+    """
+    Clamp a client supplied ``first`` to the server-side page size limits.
+    """
+    default = getattr(settings, 'PAGINATION_DEFAULT_PAGE_SIZE', 20)
+    maximum = getattr(settings, 'PAGINATION_MAX_PAGE_SIZE', 100)
+    if first is None:
+        return min(default, maximum)
+    if first < 0:
+        raise ValueError('Argument "first" must be a non-negative integer')
+    return min(first, maximum)
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder without its rounding of times to milliseconds: a
+    cursor must hold the exact stored value, or rows sharing the truncated
+    millisecond are repeated or skipped. The ISO strings decode through the
+    model field like any other lookup value.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(ordering, values):
+    """
+    Encode the position ``values`` in ``ordering``. The ordering travels
+    with the values, so a cursor is only accepted by the ordering it was
+    built for.
+    """
+    payload = json.dumps([list(ordering), list(values)], cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor, ordering):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(payload, list) or len(payload) != 2 or payload[0] != list(ordering):
+        raise ValueError('Invalid cursor')
+    values = payload[1]
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def cursor_values(model, ordering, cursor):
+    """
+    Decode ``cursor`` and convert each value with its ordering field, so a
+    tampered cursor fails as ``Invalid cursor`` rather than in the query.
+    """
+    values = decode_cursor(cursor, ordering)
+    converted = []
+    for field, value in zip(ordering, values):
+        if value is None:
+            raise ValueError('Invalid cursor')
+        try:
+            converted.append(model._meta.get_field(field.lstrip('-')).to_python(value))
+        except (ValidationError, TypeError):
+            raise ValueError('Invalid cursor')
+    return converted
+
+
+def cursor_for(obj, ordering):
+    return encode_cursor(ordering, (getattr(obj, field.lstrip('-')) for field in ordering))
+
+
+def keyset_filter(ordering, values):
+    """
+    Build the ``Q`` that selects the rows strictly after ``values`` in
+    ``ordering``, i.e. ``(a > x) OR (a = x AND b > y) OR ...``.
+
+    The disjunction is anded with ``a >= x`` so backends that do not rewrite
+    the OR themselves still get a single index range scan.
+    """
+    leading = ordering[0].lstrip('-')
+    bound = 'lte' if ordering[0].startswith('-') else 'gte'
+    condition = Q()
+    for position, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        clause = Q(**{f'{name}__{lookup}': values[position]})
+        for previous, value in zip(ordering[:position], values[:position]):
+            clause &= Q(**{previous.lstrip('-'): value})
+        condition |= clause
+    return Q(**{f'{leading}__{bound}': values[0]}) & condition
+
+
+def paginate(queryset, ordering, first=None, after=None):
+    """
+    Return ``(rows, has_next_page)`` for one keyset page of ``queryset``.
+
+    ``ordering`` must end with a unique column so every row has a distinct
+    position; the page is located with an indexed range condition rather than
+    an OFFSET, so deep pages cost the same as the first one.
+    """
+    limit = get_page_size(first)
+    queryset = queryset.order_by(*ordering)
+    if after:
+        queryset = queryset.filter(keyset_filter(ordering, cursor_values(queryset.model, ordering, after)))
+    rows = list(queryset[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def connection_from_page(connection_type, rows, has_next_page, ordering, after=None):
+    edges = [
+        connection_type.Edge(node=row, cursor=cursor_for(row, ordering))
+        for row in rows
+    ]
+    return connection_type(
+        edges=edges,
+        page_info=relay.PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=bool(after),
+            has_next_page=has_next_page,
+        ),
+    )
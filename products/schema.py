@@ -1,30 +1,207 @@
 # products/schema.py
 import graphene
+from decimal import Decimal
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Subquery, Value, When
+from django.db.models.functions import Floor, Least
+from django.utils import timezone
+from graphene import relay
+from graphene.utils.str_converters import to_snake_case
 from graphene_django import DjangoObjectType
-from graphene_django.filter import DjangoFilterConnectionField
+from graphql import GraphQLError
+from sews.projection import project, selected_fields
+from .cache import get_catalog_version
 from .models import ClothingStyle
+from .pagination import connection_from_page, paginate
+from .search import search_clothing_styles
+from .signals import clothing_styles_changed
+from .similarity import similar_clothing_styles
+from .thumbnails import thumbnail_url
+
+# Keyset ordering for catalog pages; each must match a (..., column, id) index on ClothingStyle.
+CLOTHING_STYLE_ORDERING = ('name', 'id')
 
 class ClothingStyleType(DjangoObjectType):
+    thumbnail_url = graphene.String(
+        size=graphene.Int(description='Wanted edge length in pixels; the nearest larger variant is used.'),
+        format=graphene.String(default_value='webp', description='webp or jpeg'),
+        description='Resized variant of the image, or the original URL until it has been processed.',
+    )
+
+    # Columns read by resolvers of non-model fields, for sews.projection
+    field_dependencies = {'thumbnail_url': ('image', 'image_sha256')}
+
     class Meta:
         model = ClothingStyle
         fields = '__all__'
 
+    def resolve_thumbnail_url(self, info, size=None, format='webp'):
+        url = thumbnail_url(self, size, format)
+        if url.startswith('/') and hasattr(info.context, 'build_absolute_uri'):
+            return info.context.build_absolute_uri(url)
+        return url
+
+class ClothingStyleConnection(relay.Connection):
+    class Meta:
+        node = ClothingStyleType
+
+class ClothingStyleOrder(graphene.Enum):
+    NAME = 'name'
+    NAME_DESC = '-name'
+    COST = 'cost'
+    COST_DESC = '-cost'
+    CREATED_AT = 'created_at'
+    CREATED_AT_DESC = '-created_at'
+
+class PriceBucket(graphene.ObjectType):
+    lower = graphene.Decimal()
+    upper = graphene.Decimal()
+    count = graphene.Int()
+
+def catalog_arguments(**extra):
+    return dict(
+        first=graphene.Int(),
+        after=graphene.String(),
+        min_cost=graphene.Decimal(),
+        max_cost=graphene.Decimal(),
+        order_by=ClothingStyleOrder(default_value=ClothingStyleOrder.NAME.value),
+        **extra,
+    )
+
+def filter_clothing_styles(queryset, min_cost=None, max_cost=None, is_active=None):
+    if is_active is not None:
+        queryset = queryset.filter(is_active=is_active)
+    if min_cost is not None:
+        queryset = queryset.filter(cost__gte=min_cost)
+    if max_cost is not None:
+        queryset = queryset.filter(cost__lte=max_cost)
+    return queryset
+
+def resolve_clothing_style_page(info, queryset, first=None, after=None, order_by=None):
+    order_by = getattr(order_by, 'value', order_by)
+    if order_by and order_by.lstrip('-') != 'name':
+        # The id tie-breaker follows the primary column's direction so one
+        # index can serve the ordering in either scan direction.
+        ordering = (order_by, '-id' if order_by.startswith('-') else 'id')
+    elif order_by == '-name':
+        ordering = ('-name', '-id')
+    else:
+        ordering = CLOTHING_STYLE_ORDERING
+    # Only the selected columns, plus the ordering the cursors are built from
+    queryset = project(queryset, info, ('edges', 'node'), ordering)
+    rows, has_next_page = paginate(queryset, ordering, first, after)
+    return connection_from_page(ClothingStyleConnection, rows, has_next_page, ordering, after)
+
+def price_facets(queryset, buckets):
+    """
+    Histogram of ``cost`` over ``queryset`` in ``buckets`` equal-width
+    buckets, computed by one grouped query. The range bounds come from
+    uncorrelated MIN/MAX subqueries answered by the cost indexes.
+    """
+    cost_field = DecimalField(max_digits=20, decimal_places=10)
+    low = Subquery(queryset.order_by('cost').values('cost')[:1], output_field=cost_field)
+    high = Subquery(queryset.order_by('-cost').values('cost')[:1], output_field=cost_field)
+    position = Floor((F('cost') - low) * buckets / (high - low))
+    rows = (
+        # The redundant range keeps the planner on a cost index.
+        queryset.filter(cost__gte=low, cost__lte=high)
+        .order_by()
+        .annotate(
+            low=low,
+            high=high,
+            bucket=Case(
+                When(cost__gte=high, then=Value(buckets - 1)),
+                default=Least(position, Value(buckets - 1)),
+                output_field=IntegerField(),
+            ),
+        )
+        .values('bucket', 'low', 'high')
+        .annotate(count=Count('pk'))
+    )
+    counts = {}
+    low_value = high_value = None
+    for row in rows:
+        counts[int(row['bucket'])] = row['count']
+        low_value, high_value = Decimal(row['low']), Decimal(row['high'])
+    if low_value is None:
+        return []
+    if low_value == high_value:
+        # Every cost is the same: one bucket holds them all
+        bound = low_value.quantize(Decimal('0.01'))
+        return [PriceBucket(lower=bound, upper=bound, count=sum(counts.values()))]
+    width = (high_value - low_value) / buckets
+    return [
+        PriceBucket(
+            lower=(low_value + width * index).quantize(Decimal('0.01')),
+            upper=(low_value + width * (index + 1)).quantize(Decimal('0.01')),
+            count=counts.get(index, 0),
+        )
+        for index in range(buckets)
+    ]
+
 class Query(graphene.ObjectType):
-    all_clothing_styles = graphene.List(ClothingStyleType)
+    all_clothing_styles = graphene.Field(
+        ClothingStyleConnection, **catalog_arguments(is_active=graphene.Boolean())
+    )
     clothing_style = graphene.Field(ClothingStyleType, id=graphene.ID())
-    active_clothing_styles = graphene.List(ClothingStyleType)
+    active_clothing_styles = graphene.Field(ClothingStyleConnection, **catalog_arguments())
+    clothing_style_price_facets = graphene.List(
+        PriceBucket,
+        buckets=graphene.Int(default_value=10),
+        is_active=graphene.Boolean(default_value=True),
+        description='Histogram of clothing style prices in equal-width buckets.',
+    )
+    search_clothing_styles = graphene.Field(
+        ClothingStyleConnection,
+        query=graphene.String(required=True),
+        first=graphene.Int(),
+        after=graphene.String(),
+        description='Active clothing styles matching every word of the query, best match first.',
+    )
+    similar_clothing_styles = graphene.List(
+        ClothingStyleType,
+        id=graphene.ID(required=True),
+        first=graphene.Int(),
+        description='Active clothing styles with the most similar name and description, most similar first.',
+    )
+    catalog_version = graphene.String(
+        description='Changes whenever any clothing style is created, updated or deleted.'
+    )
 
-    def resolve_all_clothing_styles(self, info):
-        return ClothingStyle.objects.all()
+    def resolve_all_clothing_styles(self, info, first=None, after=None, order_by=None,
+                                    min_cost=None, max_cost=None, is_active=None):
+        queryset = filter_clothing_styles(ClothingStyle.objects.all(), min_cost, max_cost, is_active)
+        return resolve_clothing_style_page(info, queryset, first, after, order_by)
 
     def resolve_clothing_style(self, info, id):
         try:
-            return ClothingStyle.objects.get(pk=id)
+            return project(ClothingStyle.objects.all(), info).get(pk=id)
         except ClothingStyle.DoesNotExist:
             return None
 
-    def resolve_active_clothing_styles(self, info):
-        return ClothingStyle.objects.filter(is_active=True)
+    def resolve_active_clothing_styles(self, info, first=None, after=None, order_by=None,
+                                       min_cost=None, max_cost=None):
+        queryset = filter_clothing_styles(ClothingStyle.objects.all(), min_cost, max_cost, True)
+        return resolve_clothing_style_page(info, queryset, first, after, order_by)
+
+    def resolve_clothing_style_price_facets(self, info, buckets, is_active=None):
+        if not 1 <= buckets <= 100:
+            raise GraphQLError('buckets must be between 1 and 100')
+        return price_facets(filter_clothing_styles(ClothingStyle.objects.all(), is_active=is_active), buckets)
+
+    def resolve_search_clothing_styles(self, info, query, first=None, after=None):
+        # 'name' orders the pages when the search falls back to LIKE filters
+        queryset = project(ClothingStyle.objects.all(), info, ('edges', 'node'), ('name',))
+        rows, has_next_page, ordering = search_clothing_styles(query, first, after, queryset=queryset)
+        return connection_from_page(ClothingStyleConnection, rows, has_next_page, ordering, after)
+
+    def resolve_similar_clothing_styles(self, info, id, first=None):
+        return similar_clothing_styles(id, first, project=lambda links: project(links, info, through='similar'))
+
+    def resolve_catalog_version(self, info):
+        return get_catalog_version()[0]
 
 class CreateClothingStyle(graphene.Mutation):
     class Arguments:
@@ -46,6 +223,14 @@ class CreateClothingStyle(graphene.Mutation):
         return CreateClothingStyle(clothing_style=clothing_style)
 
 class UpdateClothingStyle(graphene.Mutation):
+    """
+    Apply a partial update with a single ``UPDATE ... WHERE id = ?`` that
+    writes only the supplied columns plus ``updated_at``.
+
+    With ``expected_updated_at`` the statement also matches on the previous
+    ``updated_at``, so an edit based on a stale read fails instead of
+    overwriting someone else's change.
+    """
     class Arguments:
         id = graphene.ID(required=True)
         name = graphene.String()
@@ -53,19 +238,47 @@ class UpdateClothingStyle(graphene.Mutation):
         cost = graphene.Decimal()
         image = graphene.String()
         is_active = graphene.Boolean()
+        expected_updated_at = graphene.DateTime()
 
     clothing_style = graphene.Field(ClothingStyleType)
 
-    def mutate(self, info, id, **kwargs):
-        try:
-            clothing_style = ClothingStyle.objects.get(pk=id)
-            for field, value in kwargs.items():
-                if value is not None:
-                    setattr(clothing_style, field, value)
-            clothing_style.save()
-            return UpdateClothingStyle(clothing_style=clothing_style)
-        except ClothingStyle.DoesNotExist:
+    def mutate(self, info, id, expected_updated_at=None, **kwargs):
+        pk = ClothingStyle._meta.pk.to_python(id)
+        values = {field: value for field, value in kwargs.items() if value is not None}
+        values['updated_at'] = timezone.now()
+        lookup = {'pk': pk}
+        if expected_updated_at is not None:
+            lookup['updated_at'] = expected_updated_at
+        if not ClothingStyle.objects.filter(**lookup).update(**values):
+            # Only the failure path pays for a second query.
+            if expected_updated_at is not None and ClothingStyle.objects.filter(pk=pk).exists():
+                raise GraphQLError(
+                    'Clothing style was modified by someone else; reload it and try again'
+                )
             return None
+        clothing_styles_changed.send(sender=ClothingStyle, pks=[pk])
+        values['id'] = pk
+        return UpdateClothingStyle(clothing_style=updated_instance(info, pk, values))
+
+def selected_model_fields(info, field_name, model):
+    """
+    Concrete field names of ``model`` that the client selected below the
+    ``field_name`` field of the current mutation payload.
+    """
+    concrete = {field.name for field in model._meta.concrete_fields}
+    nodes = selected_fields(info, info.field_nodes).get(field_name, [])
+    return {to_snake_case(name) for name in selected_fields(info, nodes)} & concrete
+
+def updated_instance(info, pk, values):
+    """
+    Build the updated row from the values just written, loading only the
+    other columns the client actually selected (usually none).
+    """
+    missing = selected_model_fields(info, 'clothingStyle', ClothingStyle) - set(values)
+    if missing:
+        values.update(ClothingStyle.objects.filter(pk=pk).values(*missing).get())
+    names = [field.attname for field in ClothingStyle._meta.concrete_fields if field.attname in values]
+    return ClothingStyle.from_db(ClothingStyle.objects.db, names, [values[name] for name in names])
 
 class DeleteClothingStyle(graphene.Mutation):
     class Arguments:
@@ -81,9 +294,195 @@ class DeleteClothingStyle(graphene.Mutation):
         except ClothingStyle.DoesNotExist:
             return DeleteClothingStyle(success=False)
 
+class ClothingStyleInput(graphene.InputObjectType):
+    name = graphene.String(required=True)
+    description = graphene.String(required=True)
+    cost = graphene.Decimal(required=True)
+    image = graphene.String(required=True)
+    is_active = graphene.Boolean()
+
+class ClothingStyleUpdateInput(graphene.InputObjectType):
+    id = graphene.ID(required=True)
+    name = graphene.String()
+    description = graphene.String()
+    cost = graphene.Decimal()
+    image = graphene.String()
+    is_active = graphene.Boolean()
+
+class BulkClothingStyleResult(graphene.ObjectType):
+    index = graphene.Int(description='Position of the item in the input list.')
+    id = graphene.ID()
+    success = graphene.Boolean()
+    message = graphene.String()
+    clothing_style = graphene.Field(ClothingStyleType)
+
+def check_bulk_size(items):
+    limit = getattr(settings, 'BULK_MUTATION_MAX_ITEMS', 5000)
+    if len(items) > limit:
+        raise GraphQLError(f'At most {limit} items can be sent in one bulk mutation')
+
+def validation_message(error):
+    if hasattr(error, 'message_dict'):
+        return '; '.join(
+            f"{field}: {' '.join(messages)}" for field, messages in error.message_dict.items()
+        )
+    return ' '.join(error.messages)
+
+def parse_style_ids(ids):
+    """Return ``(pks, errors)`` with one entry per id; bad or repeated ids get an error."""
+    pks, errors, seen = [], [], set()
+    for value in ids:
+        try:
+            pk = ClothingStyle._meta.pk.to_python(value)
+        except ValidationError:
+            pks.append(None)
+            errors.append('Invalid clothing style id')
+            continue
+        pks.append(pk)
+        errors.append('Duplicate clothing style id' if pk in seen else None)
+        seen.add(pk)
+    return pks, errors
+
+def bulk_results(styles, errors, ids=None):
+    """Per-item results; ``success`` is true only when no item failed."""
+    failed = any(errors)
+    results = []
+    for index, (style, error) in enumerate(zip(styles, errors)):
+        results.append(BulkClothingStyleResult(
+            index=index,
+            id=str(style.pk) if style is not None else (ids[index] if ids else None),
+            success=not failed,
+            message=error or ('Not applied: other items failed validation' if failed else None),
+            clothing_style=None if failed else style,
+        ))
+    return results, not failed
+
+class BulkCreateClothingStyles(graphene.Mutation):
+    """
+    Validate every item, then insert them all with bulk_create in one
+    transaction. Nothing is written if any item is invalid.
+    """
+    class Arguments:
+        items = graphene.List(graphene.NonNull(ClothingStyleInput), required=True)
+
+    success = graphene.Boolean()
+    results = graphene.List(BulkClothingStyleResult)
+
+    def mutate(self, info, items):
+        check_bulk_size(items)
+        styles, errors = [], []
+        for item in items:
+            style = ClothingStyle(**{field: value for field, value in item.items() if value is not None})
+            try:
+                style.full_clean(validate_unique=False)
+                errors.append(None)
+            except ValidationError as e:
+                errors.append(validation_message(e))
+            styles.append(style)
+
+        results, success = bulk_results(styles, errors)
+        if success and styles:
+            with transaction.atomic():
+                ClothingStyle.objects.bulk_create(styles)
+                clothing_styles_changed.send(sender=ClothingStyle, pks=[style.pk for style in styles])
+        return BulkCreateClothingStyles(success=success, results=results)
+
+class BulkUpdateClothingStyles(graphene.Mutation):
+    """
+    Load every target row in one query, validate the changes, then write
+    them with bulk_update in one transaction. Only the columns supplied by at
+    least one item are written.
+    """
+    class Arguments:
+        items = graphene.List(graphene.NonNull(ClothingStyleUpdateInput), required=True)
+
+    success = graphene.Boolean()
+    results = graphene.List(BulkClothingStyleResult)
+
+    def mutate(self, info, items):
+        check_bulk_size(items)
+        ids = [item['id'] for item in items]
+        pks, errors = parse_style_ids(ids)
+        existing = ClothingStyle.objects.in_bulk([pk for pk in pks if pk is not None])
+        now = timezone.now()
+        styles, fields = [], {'updated_at'}
+        for position, (item, pk) in enumerate(zip(items, pks)):
+            style = existing.get(pk)
+            if style is None:
+                errors[position] = errors[position] or 'Clothing style not found'
+                styles.append(None)
+                continue
+            for field, value in item.items():
+                if field != 'id' and value is not None:
+                    setattr(style, field, value)
+                    fields.add(field)
+            style.updated_at = now
+            if errors[position] is None:
+                try:
+                    style.full_clean(validate_unique=False)
+                except ValidationError as e:
+                    errors[position] = validation_message(e)
+            styles.append(style)
+
+        results, success = bulk_results(styles, errors, ids)
+        if success and styles:
+            with transaction.atomic():
+                ClothingStyle.objects.bulk_update(styles, sorted(fields))
+                clothing_styles_changed.send(sender=ClothingStyle, pks=pks)
+        return BulkUpdateClothingStyles(success=success, results=results)
+
+class BulkDeleteClothingStyles(graphene.Mutation):
+    """
+    Delete every listed style with one filtered DELETE. Ids that do not
+    exist are reported per item; the others are still deleted.
+    """
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+
+    success = graphene.Boolean()
+    deleted_count = graphene.Int()
+    results = graphene.List(BulkClothingStyleResult)
+
+    def mutate(self, info, ids):
+        check_bulk_size(ids)
+        pks, errors = parse_style_ids(ids)
+        with transaction.atomic():
+            queryset = ClothingStyle.objects.filter(pk__in=[pk for pk in pks if pk is not None])
+            existing = set(queryset.values_list('pk', flat=True))
+            deleted = 0
+            if existing:
+                # QuerySet.delete() would load every row to send post_delete;
+                # nothing cascades from ClothingStyle, so one statement does,
+                # and the caches, search and similarity hear of it once.
+                pk_field = ClothingStyle._meta.pk
+                values = [pk_field.get_db_prep_value(pk, connection) for pk in existing]
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'DELETE FROM {connection.ops.quote_name(ClothingStyle._meta.db_table)} '
+                        f'WHERE {connection.ops.quote_name(pk_field.column)} IN ({", ".join(["%s"] * len(values))})',
+                        values,
+                    )
+                    deleted = cursor.rowcount
+                clothing_styles_changed.send(sender=ClothingStyle, pks=list(existing))
+        results = []
+        for index, (value, pk, error) in enumerate(zip(ids, pks, errors)):
+            if error is None and pk not in existing:
+                error = 'Clothing style not found'
+            results.append(BulkClothingStyleResult(
+                index=index, id=value, success=error is None, message=error,
+            ))
+        return BulkDeleteClothingStyles(
+            success=all(result.success for result in results),
+            deleted_count=deleted,
+            results=results,
+        )
+
 class Mutation(graphene.ObjectType):
     create_clothing_style = CreateClothingStyle.Field()
     update_clothing_style = UpdateClothingStyle.Field()
     delete_clothing_style = DeleteClothingStyle.Field()
+    bulk_create_clothing_styles = BulkCreateClothingStyles.Field()
+    bulk_update_clothing_styles = BulkUpdateClothingStyles.Field()
+    bulk_delete_clothing_styles = BulkDeleteClothingStyles.Field()
 
 schema = graphene.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
@@ -0,0 +1,227 @@
+# products/search.py
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from .models import ClothingStyle
+from .pagination import decode_cursor, get_page_size, paginate
+
+FTS_TABLE = 'products_clothingstyle_fts'
+FTS_KEY_TABLE = 'products_clothingstyle_fts_key'
+
+# BM25 column weights: a hit in the name counts ten times a hit in the description.
+BM25_WEIGHTS = (10.0, 1.0)
+
+# Cursor ordering for search pages; ``search_rank`` and ``search_rowid`` are
+# set on each row by search_clothing_styles().
+SEARCH_ORDERING = ('search_rank', 'search_rowid')
+
+# The index is an FTS5 table holding its own copy of the text, keyed through
+# FTS_KEY_TABLE, which maps an explicit INTEGER PRIMARY KEY to the style's
+# UUID. Nothing points at the implicit rowid of products_clothingstyle, so a
+# VACUUM or a table rebuild by the schema editor leaves the index correct.
+# Triggers keep it in sync, so bulk_create(), QuerySet.update() and raw SQL
+# writes are indexed as well as save(). A table rebuild does drop the
+# triggers; the post_migrate receiver in products.signals reinstalls the
+# index after any products migration.
+FTS_SETUP_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {FTS_KEY_TABLE} (
+        id INTEGER PRIMARY KEY,
+        style_id char(32) NOT NULL UNIQUE
+    )
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description,
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON products_clothingstyle BEGIN
+        INSERT INTO {FTS_KEY_TABLE}(style_id) VALUES (new.id);
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES ((SELECT id FROM {FTS_KEY_TABLE} WHERE style_id = new.id), new.name, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON products_clothingstyle BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = (SELECT id FROM {FTS_KEY_TABLE} WHERE style_id = old.id);
+        DELETE FROM {FTS_KEY_TABLE} WHERE style_id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF name, description ON products_clothingstyle BEGIN
+        UPDATE {FTS_TABLE} SET name = new.name, description = new.description
+        WHERE rowid = (SELECT id FROM {FTS_KEY_TABLE} WHERE style_id = new.id);
+    END
+    """,
+]
+
+FTS_POPULATE_SQL = [
+    f"INSERT INTO {FTS_KEY_TABLE}(style_id) SELECT id FROM products_clothingstyle",
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, name, description)
+    SELECT k.id, c.name, c.description
+    FROM {FTS_KEY_TABLE} k JOIN products_clothingstyle c ON c.id = k.style_id
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')",
+]
+
+FTS_TEARDOWN_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+    f"DROP TABLE IF EXISTS {FTS_KEY_TABLE}",
+]
+
+
+def search_index_available(using=None):
+    """The FTS5 index only exists on SQLite; other backends fall back to LIKE."""
+    return (using or connection).vendor == 'sqlite'
+
+
+def install_search_index(using=None):
+    """
+    (Re)create the FTS5 table, its key table and the triggers, and build
+    the index from products_clothingstyle in one bulk pass.
+    """
+    using = using or connection
+    if not search_index_available(using):
+        return
+    with using.cursor() as cursor:
+        for statement in FTS_TEARDOWN_SQL + FTS_SETUP_SQL + FTS_POPULATE_SQL:
+            cursor.execute(statement)
+
+
+def ensure_search_index(using=None):
+    """
+    Reinstall the index when any of its tables or triggers is missing, e.g.
+    after the schema editor rebuilt products_clothingstyle.
+    """
+    using = using or connection
+    if not search_index_available(using):
+        return
+    with using.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {name for name, in cursor.fetchall()}
+    if 'products_clothingstyle' not in existing:
+        return  # products is migrated to zero
+    wanted = {FTS_TABLE, FTS_KEY_TABLE, f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au'}
+    if not wanted <= existing:
+        install_search_index(using)
+
+
+def uninstall_search_index(using=None):
+    using = using or connection
+    if not search_index_available(using):
+        return
+    with using.cursor() as cursor:
+        for statement in FTS_TEARDOWN_SQL:
+            cursor.execute(statement)
+
+
+def terms(text):
+    return re.findall(r'\w+', text or '')
+
+
+def build_match_query(text):
+    """
+    Turn free text into an FTS5 query: every word must match, as a prefix,
+    in either column. Returns None when the text has no searchable words.
+    """
+    words = terms(text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_queryset(queryset, text):
+    """Restrict ``queryset`` to rows matching ``text``, without ranking."""
+    match = build_match_query(text)
+    if match is None:
+        return queryset.none()
+    if not search_index_available():
+        return queryset.filter(_like_filter(text))
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT style_id FROM {FTS_KEY_TABLE} WHERE id IN '
+        f'(SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+        [match],
+    ))
+
+
+def _like_filter(text):
+    condition = Q()
+    for word in terms(text):
+        condition &= Q(name__icontains=word) | Q(description__icontains=word)
+    return condition
+
+
+def search_clothing_styles(text, first=None, after=None, active_only=True, queryset=None):
+    """
+    Return ``(rows, has_next_page, ordering)`` for one page of clothing
+    styles matching ``text``, best BM25 match first.
+
+    Pages are keyed on ``(rank, index rowid)`` so paging deeper does not re-rank
+    the rows already returned. Without the FTS5 index the search degrades
+    to ``icontains`` filters paged on ``(name, id)``.
+
+    The styles themselves are loaded from ``queryset`` (all clothing
+    styles by default), e.g. one restricted to the selected columns.
+    """
+    if queryset is None:
+        queryset = ClothingStyle.objects.all()
+    match = build_match_query(text)
+    if match is None:
+        return [], False, SEARCH_ORDERING
+    if not search_index_available():
+        queryset = queryset.filter(_like_filter(text))
+        if active_only:
+            queryset = queryset.filter(is_active=True)
+        ordering = ('name', 'id')
+        rows, has_next_page = paginate(queryset, ordering, first, after)
+        return rows, has_next_page, ordering
+
+    limit = get_page_size(first)
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    sql = (
+        f'SELECT style_id, rank, rid FROM ('
+        f'SELECT k.style_id AS style_id, bm25({FTS_TABLE}, {weights}) AS rank, {FTS_TABLE}.rowid AS rid '
+        f'FROM {FTS_TABLE} JOIN {FTS_KEY_TABLE} k ON k.id = {FTS_TABLE}.rowid '
+        f'JOIN products_clothingstyle c ON c.id = k.style_id '
+        f'WHERE {FTS_TABLE} MATCH %s'
+    )
+    params = [match]
+    if active_only:
+        sql += ' AND c.is_active'
+    sql += ')'
+    if after:
+        rank, rowid = decode_cursor(after, SEARCH_ORDERING)
+        try:
+            rank, rowid = float(rank), int(rowid)
+        except (TypeError, ValueError):
+            raise ValueError('Invalid cursor')
+        sql += ' WHERE (rank, rid) > (%s, %s)'
+        params += [rank, rowid]
+    sql += ' ORDER BY rank, rid LIMIT %s'
+    params.append(limit + 1)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        hits = cursor.fetchall()
+
+    to_pk = ClothingStyle._meta.pk.to_python
+    styles = queryset.in_bulk([to_pk(style_id) for style_id, _, _ in hits[:limit]])
+    rows = []
+    for style_id, rank, rowid in hits[:limit]:
+        style = styles.get(to_pk(style_id))
+        if style is None:  # deleted between the two queries
+            continue
+        style.search_rank = rank
+        style.search_rowid = rowid
+        rows.append(style)
+    return rows, len(hits) > limit, SEARCH_ORDERING
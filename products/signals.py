@@ -0,0 +1,53 @@
+# products/signals.py
+from functools import partial
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import Signal, receiver
+from sews.result_cache import result_cache
+from .cache import invalidate_catalog
+from .models import ClothingStyle
+from .search import ensure_search_index
+from .similarity import schedule_refresh
+
+# Sent by write paths that bypass post_save/post_delete (bulk_create,
+# bulk_update, QuerySet.update and raw deletes), with the affected ``pks``
+# when they are known.
+clothing_styles_changed = Signal()
+
+
+@receiver(post_save, sender=ClothingStyle)
+@receiver(post_delete, sender=ClothingStyle)
+@receiver(clothing_styles_changed)
+def clothing_style_changed(sender, **kwargs):
+    # After the commit, so readers of the new generation see the new rows.
+    transaction.on_commit(invalidate_catalog)
+    transaction.on_commit(partial(result_cache.invalidate, ClothingStyle))
+
+
+@receiver(post_save, sender=ClothingStyle)
+@receiver(post_delete, sender=ClothingStyle)
+def clothing_style_text_changed(sender, instance, **kwargs):
+    schedule_refresh([instance.pk])
+
+
+@receiver(clothing_styles_changed)
+def clothing_styles_text_changed(sender, pks=None, **kwargs):
+    # Without pks (wholesale reseeding) the index is rebuilt explicitly instead.
+    if pks:
+        schedule_refresh(pks)
+
+
+@receiver(post_migrate)
+def search_index_migrated(sender, using='default', **kwargs):
+    # Rebuilding products_clothingstyle for an ALTER drops the search triggers.
+    if sender.name == 'products':
+        ensure_search_index(connections[using])
+
+
+@receiver(post_migrate)
+def invalidation_cache_migrated(sender, using='default', **kwargs):
+    # The shared invalidation state lives in a DatabaseCache; create its
+    # table with the schema so a plain migrate is enough to deploy.
+    if sender.name == 'products':
+        call_command('createcachetable', database=using, verbosity=0)
@@ -0,0 +1,394 @@
+# products/similarity.py
+import math
+import re
+import threading
+import zlib
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from .models import ClothingStyle, ClothingStyleVector, SimilarClothingStyle, SimilarStyleRefresh
+
+# A word in the name says more about a style than one in its description.
+NAME_WEIGHT = 2.0
+
+STOP_WORDS = frozenset('''
+    a an and are as at be but by for from has have in is it its of on or our
+    so that the this to was with you your
+'''.split())
+
+TOKEN_RE = re.compile(r'[^\W\d_]{2,}')
+
+# Rows scored per matrix product; bounds the (rows x styles) score block.
+BLOCK_SIZE = 256
+
+WRITE_BATCH_SIZE = 2000
+
+_pending = threading.local()
+_index = None
+_index_lock = threading.Lock()
+
+
+def dimensions():
+    return getattr(settings, 'SIMILAR_STYLES_DIMENSIONS', 256)
+
+
+def neighbour_count():
+    return getattr(settings, 'SIMILAR_STYLES_COUNT', 10)
+
+
+def vectorize(name, description, dims=None):
+    """
+    Hashed, signed, sublinear term-frequency vector of a style's text,
+    L2-normalised so a dot product is the cosine similarity.
+
+    Tokens are hashed with crc32 rather than ``hash()`` so vectors written by
+    one process compare equal to vectors computed by another.
+    """
+    dims = dims or dimensions()
+    vector = np.zeros(dims, dtype=np.float32)
+    for weight, text in ((NAME_WEIGHT, name), (1.0, description)):
+        counts = Counter(
+            token for token in TOKEN_RE.findall((text or '').lower())
+            if token not in STOP_WORDS
+        )
+        for token, count in counts.items():
+            bucket = zlib.crc32(token.encode())
+            sign = 1.0 if bucket & 0x80000000 else -1.0
+            vector[bucket % dims] += sign * weight * (1.0 + math.log(count))
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector
+
+
+def style_vector(name, description, is_active, dims):
+    """
+    The stored vector of a style. Inactive styles get the zero vector: it
+    scores 0 against everything, so they are ranked neither as neighbours
+    nor for themselves, and toggling is_active re-ranks like a text edit.
+    """
+    if not is_active:
+        return np.zeros(dims, dtype=np.float32)
+    return vectorize(name, description, dims)
+
+
+class SimilarityIndex:
+    """
+    All stored vectors as one float32 matrix, plus each row's neighbour
+    threshold. Deleted rows are zeroed rather than removed, so positions stay
+    valid until the next full load.
+    """
+
+    def __init__(self, ids, matrix, thresholds, fingerprint):
+        self.ids = ids
+        self.matrix = matrix
+        self.thresholds = thresholds
+        self.fingerprint = fingerprint
+        self.positions = {pk: position for position, pk in enumerate(ids)}
+        # Primary keys as the database stores them, for raw link inserts.
+        self.db_ids = [_db_id(pk) for pk in ids]
+
+    @classmethod
+    def load(cls, dims):
+        fingerprint = _fingerprint()
+        ids, vectors, thresholds = [], [], []
+        rows = ClothingStyleVector.objects.values_list('style_id', 'vector', 'threshold')
+        for style_id, vector, threshold in rows.iterator(chunk_size=WRITE_BATCH_SIZE):
+            ids.append(style_id)
+            vectors.append(np.frombuffer(vector, dtype=np.float32))
+            thresholds.append(threshold)
+        matrix = np.vstack(vectors) if vectors else np.zeros((0, dims), dtype=np.float32)
+        return cls(ids, matrix, np.array(thresholds, dtype=np.float32), fingerprint)
+
+    def put(self, vectors):
+        """Replace or append the rows of ``vectors`` ({pk: vector})."""
+        added = []
+        for pk, vector in vectors.items():
+            position = self.positions.get(pk)
+            if position is None:
+                added.append((pk, vector))
+            else:
+                self.matrix[position] = vector
+                self.thresholds[position] = 0.0
+        if added:
+            for pk, _ in added:
+                self.positions[pk] = len(self.ids)
+                self.ids.append(pk)
+                self.db_ids.append(_db_id(pk))
+            self.matrix = np.vstack([self.matrix] + [vector for _, vector in added])
+            self.thresholds = np.concatenate([self.thresholds, np.zeros(len(added), dtype=np.float32)])
+
+    def discard(self, pks):
+        for pk in pks:
+            position = self.positions.pop(pk, None)
+            if position is not None:
+                self.matrix[position] = 0.0
+                self.thresholds[position] = 0.0
+
+    def scores(self, pks):
+        """Cosine similarity of each of ``pks`` against every row."""
+        return self.matrix[[self.positions[pk] for pk in pks]] @ self.matrix.T
+
+    def top_k(self, pks, k):
+        """Yield ``(pk, [(similar_position, score), ...])`` with the best ``k`` neighbours of each pk."""
+        for start in range(0, len(pks), BLOCK_SIZE):
+            block = pks[start:start + BLOCK_SIZE]
+            scores = self.scores(block)
+            scores[np.arange(len(block)), [self.positions[pk] for pk in block]] = -np.inf
+            kk = min(k, scores.shape[1] - 1)
+            if kk <= 0:
+                for pk in block:
+                    yield pk, []
+                continue
+            best = np.argpartition(scores, -kk, axis=1)[:, -kk:]
+            best_scores = np.take_along_axis(scores, best, axis=1)
+            for pk, columns, values in zip(block, best.tolist(), best_scores.tolist()):
+                # Equal scores are ordered by key so a refresh and a rebuild agree.
+                yield pk, sorted(
+                    ((column, score) for column, score in zip(columns, values) if score > 0),
+                    key=lambda item: (-item[1], self.db_ids[item[0]]),
+                )
+
+
+def _db_id(pk):
+    return ClothingStyle._meta.pk.get_db_prep_value(pk, connection)
+
+
+def _fingerprint():
+    """Changes whenever any process writes the vector table."""
+    stats = ClothingStyleVector.objects.aggregate(count=Count('pk'), latest=Max('updated_at'))
+    return stats['count'], stats['latest']
+
+
+def get_index():
+    """The per-process matrix, reloaded only when another process changed the vectors."""
+    global _index
+    dims = dimensions()
+    if _index is None or _index.matrix.shape[1] != dims or _index.fingerprint != _fingerprint():
+        _index = SimilarityIndex.load(dims)
+    return _index
+
+
+def _neighbour_rows(index, pks, k):
+    """
+    Recompute the neighbours of ``pks``; returns the link rows as
+    ``(style_id, similar_id, rank, score)`` tuples and each pk's new threshold.
+    """
+    links, thresholds = [], {}
+    for pk, neighbours in index.top_k(pks, k):
+        threshold = neighbours[-1][1] if len(neighbours) == k else 0.0
+        thresholds[pk] = threshold
+        index.thresholds[index.positions[pk]] = threshold
+        style_id = index.db_ids[index.positions[pk]]
+        links.extend(
+            (style_id, index.db_ids[position], rank, score)
+            for rank, (position, score) in enumerate(neighbours)
+        )
+    return links, thresholds
+
+
+def _insert_links(links):
+    # Plain executemany: building a model instance per link costs several
+    # times more than the scoring that produced it.
+    table = connection.ops.quote_name(SimilarClothingStyle._meta.db_table)
+    sql = f'INSERT INTO {table} (style_id, similar_id, rank, score) VALUES (%s, %s, %s, %s)'
+    with connection.cursor() as cursor:
+        for start in range(0, len(links), WRITE_BATCH_SIZE):
+            cursor.executemany(sql, links[start:start + WRITE_BATCH_SIZE])
+
+
+def _write_neighbours(index, pks, k):
+    """Replace the stored neighbour lists and thresholds of ``pks``."""
+    links, thresholds = _neighbour_rows(index, pks, k)
+    for start in range(0, len(pks), WRITE_BATCH_SIZE):
+        SimilarClothingStyle.objects.filter(style_id__in=pks[start:start + WRITE_BATCH_SIZE]).delete()
+    _insert_links(links)
+    # bulk_update() skips auto_now; bump updated_at so other processes reload the thresholds.
+    now = timezone.now()
+    ClothingStyleVector.objects.bulk_update(
+        [ClothingStyleVector(style_id=pk, threshold=threshold, updated_at=now) for pk, threshold in thresholds.items()],
+        ['threshold', 'updated_at'], batch_size=WRITE_BATCH_SIZE,
+    )
+
+
+def refresh_similar_styles(pks):
+    """
+    Bring the neighbour lists up to date after the styles in ``pks`` were
+    created, edited or deleted.
+
+    Only the lists that can have changed are recomputed: those of the changed
+    styles, those that referenced a changed or deleted style, and those whose
+    threshold a changed style now beats. Styles whose name and description
+    produce the same vector as before cost two queries and no matrix work.
+    """
+    pks = set(pks)
+    if not pks:
+        return
+    dims = dimensions()
+    texts = dict(
+        (pk, fields) for pk, *fields in
+        ClothingStyle.objects.filter(pk__in=pks).values_list('pk', 'name', 'description', 'is_active')
+    )
+    deleted = pks - texts.keys()
+    stored = dict(ClothingStyleVector.objects.filter(style_id__in=texts).values_list('style_id', 'vector'))
+    changed = {}
+    for pk, (name, description, is_active) in texts.items():
+        vector = style_vector(name, description, is_active, dims)
+        if pk not in stored or bytes(stored[pk]) != vector.tobytes():
+            changed[pk] = vector
+    if not changed and not deleted:
+        return
+
+    global _index
+    with _index_lock:
+        # Load before the transaction: on SQLite a transaction that reads
+        # first cannot wait for another writer once it starts writing.
+        index = get_index()
+        try:
+            with transaction.atomic():
+                _apply_changes(index, changed, deleted, neighbour_count())
+        except Exception:
+            _index = None  # the in-memory copy may hold the rolled back rows
+            raise
+
+
+def _apply_changes(index, changed, deleted, k):
+    if deleted:
+        ClothingStyleVector.objects.filter(style_id__in=deleted).delete()
+        SimilarClothingStyle.objects.filter(style_id__in=deleted).delete()
+        index.discard(deleted)
+    if changed:
+        ClothingStyleVector.objects.filter(style_id__in=changed).delete()
+        ClothingStyleVector.objects.bulk_create(
+            [ClothingStyleVector(style_id=pk, vector=vector.tobytes()) for pk, vector in changed.items()],
+            batch_size=WRITE_BATCH_SIZE,
+        )
+        index.put(changed)
+
+    stale = set(changed)
+    stale.update(SimilarClothingStyle.objects.filter(
+        similar_id__in=deleted | changed.keys(),
+    ).values_list('style_id', flat=True))
+    changed_pks = list(changed)
+    for start in range(0, len(changed_pks), BLOCK_SIZE):
+        scores = index.scores(changed_pks[start:start + BLOCK_SIZE])
+        beaten = np.flatnonzero((scores > index.thresholds).any(axis=0))
+        stale.update(index.ids[position] for position in beaten)
+    stale = [pk for pk in stale if pk in index.positions]
+    _write_neighbours(index, stale, k)
+    index.fingerprint = _fingerprint()
+
+
+def rebuild_similar_styles():
+    """
+    Recompute every vector and neighbour list from scratch and return the
+    number of styles. The whole matrix is built in memory first, so both
+    tables are written with plain bulk inserts.
+    """
+    global _index
+    dims = dimensions()
+    ids, vectors = [], []
+    rows = ClothingStyle.objects.order_by().values_list('pk', 'name', 'description', 'is_active')
+    for pk, name, description, is_active in rows.iterator(chunk_size=WRITE_BATCH_SIZE):
+        ids.append(pk)
+        vectors.append(style_vector(name, description, is_active, dims))
+    matrix = np.vstack(vectors) if vectors else np.zeros((0, dims), dtype=np.float32)
+    del vectors
+    k = neighbour_count()
+    with _index_lock, transaction.atomic():
+        clear_similar_styles()
+        index = SimilarityIndex(ids, matrix, np.zeros(len(ids), dtype=np.float32), None)
+        thresholds = {}
+        for start in range(0, len(ids), WRITE_BATCH_SIZE):
+            links, block_thresholds = _neighbour_rows(index, ids[start:start + WRITE_BATCH_SIZE], k)
+            _insert_links(links)
+            thresholds.update(block_thresholds)
+        ClothingStyleVector.objects.bulk_create(
+            (
+                ClothingStyleVector(style_id=pk, vector=vector.tobytes(), threshold=thresholds[pk])
+                for pk, vector in zip(ids, matrix)
+            ),
+            batch_size=WRITE_BATCH_SIZE,
+        )
+        index.fingerprint = _fingerprint()
+        _index = index
+    return len(ids)
+
+
+def clear_similar_styles():
+    """Drop every vector and neighbour list, e.g. before the catalog is replaced wholesale."""
+    global _index
+    # Nothing listens to or cascades from these models, so each is one DELETE
+    SimilarClothingStyle.objects.all().delete()
+    ClothingStyleVector.objects.all().delete()
+    _index = None
+
+
+def drain_refresh_queue(batch_size=WRITE_BATCH_SIZE):
+    """
+    Refresh the styles queued by schedule_refresh(), ``batch_size`` queue
+    rows at a time, until the queue is empty. Returns the number of queue
+    rows handled. Rows queued meanwhile are picked up by the next batch.
+    """
+    handled = 0
+    while True:
+        queued = list(SimilarStyleRefresh.objects.order_by('id').values_list('id', 'style_id')[:batch_size])
+        if not queued:
+            return handled
+        refresh_similar_styles(style_id for _, style_id in queued)
+        # By id: a row committed late with a lower id is not lost
+        SimilarStyleRefresh.objects.filter(id__in=[queue_id for queue_id, _ in queued]).delete()
+        handled += len(queued)
+
+
+def _flush():
+    pks = getattr(_pending, 'pks', None)
+    if not pks:
+        return
+    _pending.pks = set()
+    if getattr(settings, 'SIMILAR_STYLES_ASYNC', True):
+        SimilarStyleRefresh.objects.bulk_create(
+            [SimilarStyleRefresh(style_id=pk) for pk in pks], batch_size=WRITE_BATCH_SIZE,
+        )
+    else:
+        refresh_similar_styles(pks)
+
+
+def schedule_refresh(pks):
+    """
+    Refresh the neighbour lists of ``pks`` once the current transaction
+    commits. Every pk scheduled in the transaction is queued for the
+    refresh_similar_styles worker in one insert, so web processes never load
+    the matrix; with SIMILAR_STYLES_ASYNC False the refresh runs right away
+    in this process instead.
+    """
+    if not hasattr(_pending, 'pks'):
+        _pending.pks = set()
+    _pending.pks.update(pks)
+    transaction.on_commit(_flush)
+
+
+def similar_clothing_styles(pk, first=None, project=None):
+    """
+    The stored neighbours of ``pk``, best first, in one indexed query.
+    ``project`` may narrow the query, e.g. to the columns a client selected.
+
+    Inactive styles are never ranked (see style_vector). The is_active filter
+    hides deactivations the worker has not processed yet; it applies before
+    the cut, so the next stored neighbour takes such a style's place.
+    """
+    k = neighbour_count()
+    first = k if first is None else max(0, min(first, k))
+    links = (
+        SimilarClothingStyle.objects
+        .filter(style_id=pk, similar__is_active=True)
+        .select_related('similar')
+        .order_by('rank')
+    )
+    if project is not None:
+        links = project(links)
+    return [link.similar for link in links[:first]]
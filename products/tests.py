@@ -1,3 +1,1257 @@
-from django.test import TestCase
+import base64
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from io import BytesIO, StringIO
+from pathlib import Path
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.contrib.admin.sites import AdminSite
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from graphql import parse
+
+from sews.persisted_queries import document_cache, query_hash
+from sews.result_cache import check_tag_cache, result_cache
+from users.authentication import refresh_token_for
+from users.models import CustomUser, TailorDetail, TailorProduct
+
+from .admin import ClothingStyleAdmin
+from .cache import CATALOG_GENERATION_KEY, get_catalog_version
+from .checks import check_catalog_version_cache
+from .models import ClothingStyle, SimilarClothingStyle, SimilarStyleRefresh
+from .pagination import cursor_for, cursor_values, encode_cursor, get_page_size
+from .schema import price_facets, schema
+from .search import FTS_TABLE, SEARCH_ORDERING, ensure_search_index, search_clothing_styles
+from .signals import clothing_styles_changed
+from .similarity import rebuild_similar_styles, similar_clothing_styles
+from .thumbnails import read_source, thumbnail_options, thumbnail_url
+from .views import _encode_style_row
 
 # Create your tests here.
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class CatalogQueryPlanTests(TestCase):
+    """The catalog filters, orderings and facets must be answered from indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        ClothingStyle.objects.bulk_create(
+            ClothingStyle(
+                name=f'Style {i:03d}',
+                description='Synthetic style',
+                cost=Decimal(1000 + 500 * (i % 40)),
+                image=f'https://example.com/{i}.jpg',
+                is_active=i % 10 != 0,
+            )
+            for i in range(200)
+        )
+
+    def execute(self, query, variables=None):
+        with CaptureQueriesContext(connection) as ctx:
+            result = schema.execute(query, variables=variables)
+        self.assertIsNone(result.errors)
+        return result.data, [captured['sql'] for captured in ctx.captured_queries]
+
+    def query_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[3] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, sql, index):
+        plan = self.query_plan(sql)
+        self.assertTrue(
+            any(f'INDEX {index}' in step for step in plan),
+            f'{index} not used by {sql}\n{plan}',
+        )
+        self.assertFalse(
+            any(step == 'SCAN products_clothingstyle' for step in plan),
+            f'full table scan in {sql}\n{plan}',
+        )
+
+    def test_active_catalog_orderings_use_partial_indexes(self):
+        query = '''
+            query($order: ClothingStyleOrder, $after: String) {
+                activeClothingStyles(first: 5, orderBy: $order, after: $after) {
+                    edges { node { name } }
+                    pageInfo { endCursor }
+                }
+            }
+        '''
+        for order, index in (
+            ('NAME', 'products_cs_active_name_idx'),
+            ('COST', 'products_cs_active_cost_idx'),
+            ('COST_DESC', 'products_cs_active_cost_idx'),
+            ('CREATED_AT_DESC', 'products_cs_active_created_idx'),
+        ):
+            with self.subTest(order=order):
+                data, queries = self.execute(query, {'order': order})
+                end_cursor = data['activeClothingStyles']['pageInfo']['endCursor']
+                _, next_page = self.execute(query, {'order': order, 'after': end_cursor})
+                self.assertUsesIndex(queries[0], index)
+                self.assertUsesIndex(next_page[0], index)
+                self.assertNotIn('TEMP B-TREE', ' '.join(self.query_plan(next_page[0])))
+
+    def test_cost_range_filter_uses_cost_index(self):
+        data, queries = self.execute('''{
+            allClothingStyles(first: 50, minCost: "2000", maxCost: "3000", orderBy: COST) {
+                edges { node { cost } }
+            }
+        }''')
+        costs = [Decimal(edge['node']['cost']) for edge in data['allClothingStyles']['edges']]
+        self.assertTrue(costs)
+        self.assertTrue(all(Decimal('2000') <= cost <= Decimal('3000') for cost in costs))
+        self.assertEqual(costs, sorted(costs))
+        self.assertUsesIndex(queries[0], 'products_cs_cost_id_idx')
+
+    def test_price_facets_are_one_indexed_query(self):
+        data, queries = self.execute('{ clothingStylePriceFacets(buckets: 4) { lower upper count } }')
+        buckets = data['clothingStylePriceFacets']
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(len(buckets), 4)
+        self.assertEqual(sum(bucket['count'] for bucket in buckets), 180)
+        self.assertEqual(buckets[0]['lower'], '1500.00')
+        self.assertEqual(buckets[-1]['upper'], '20500.00')
+        self.assertUsesIndex(queries[0], 'products_cs_active_cost_idx')
+
+
+    def test_price_facets_of_equal_costs_are_one_bucket(self):
+        cost = ClothingStyle.objects.filter(is_active=True).values_list('cost', flat=True)[0]
+        styles = ClothingStyle.objects.filter(is_active=True, cost=cost)
+        [bucket] = price_facets(styles, 4)
+        self.assertEqual((bucket.lower, bucket.upper, bucket.count), (cost, cost, styles.count()))
+
+@override_settings(SIMILAR_STYLES_ASYNC=False)
+class CatalogCacheTests(TestCase):
+    """The REST catalog answers conditional GETs and follows every committed write."""
+
+    URL = '/api/clothing-styles/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.style = ClothingStyle.objects.create(
+            name='Kitenge dress', description='Wax print', cost=Decimal('30000'), image='https://example.com/1.jpg',
+        )
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def save(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.style.name = name
+            self.style.save()
+
+    def names(self, response):
+        return [style['name'] for style in json.loads(response.content)['clothing_styles']]
+
+    def test_unchanged_catalog_is_not_modified(self):
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'])
+        self.assertTrue(response['Last-Modified'])
+        with self.assertNumQueries(1):  # the shared generation, nothing else
+            again = self.client.get(self.URL, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+
+    def test_save_changes_the_etag_and_the_document(self):
+        response = self.client.get(self.URL)
+        self.save('Kitenge gown')
+        again = self.client.get(self.URL, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 200)
+        self.assertNotEqual(again['ETag'], response['ETag'])
+        self.assertEqual(self.names(again), ['Kitenge gown'])
+
+    def test_delete_changes_the_etag(self):
+        response = self.client.get(self.URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.style.delete()
+        again = self.client.get(self.URL, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(self.names(again), [])
+
+    def test_writes_from_other_processes_change_the_etag(self):
+        response = self.client.get(self.URL)
+        # Another worker or a management command starts a new generation
+        ClothingStyle.objects.filter(pk=self.style.pk).update(name='Kitenge gown', updated_at=timezone.now())
+        caches['invalidation'].delete(CATALOG_GENERATION_KEY)
+        again = self.client.get(self.URL, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(self.names(again), ['Kitenge gown'])
+
+    def test_per_process_version_cache_is_reported(self):
+        self.assertEqual(check_catalog_version_cache(None), [])
+        with override_settings(CATALOG_VERSION_CACHE='default'):
+            self.assertEqual([warning.id for warning in check_catalog_version_cache(None)], ['products.W001'])
+
+    def test_reader_racing_a_write_cannot_cache_the_old_version(self):
+        stale = ClothingStyle.objects.aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+
+        def aggregate_then_commit(**kwargs):
+            # The reader's aggregate saw the old rows; the write commits before it caches them.
+            self.save('Kitenge gown')
+            return stale
+
+        with mock.patch.object(ClothingStyle.objects, 'aggregate', side_effect=aggregate_then_commit):
+            old_version = get_catalog_version()
+        self.assertNotEqual(get_catalog_version(), old_version)
+        self.assertEqual(self.names(self.client.get(self.URL)), ['Kitenge gown'])
+
+
+@override_settings(CLOTHING_STYLES_STREAM_CHUNK_SIZE=2)
+class CatalogStreamTests(TestCase):
+    """``?stream=1`` sends the same document as the buffered response, in chunks."""
+
+    URL = '/api/clothing-styles/'
+
+    @classmethod
+    def setUpTestData(cls):
+        names = ['Kitenge "dress"', 'Kanga \\ wrap', 'Boubou ünï', 'Agbada\nlong', 'Kaftan']
+        ClothingStyle.objects.bulk_create([ClothingStyle(
+            name=name, description=f'Style {i} – wax', cost=Decimal('1234.50') * (i + 1),
+            image=f'https://example.com/{i}.jpg', is_active=i != 2,
+        ) for i, name in enumerate(names)])
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def streamed(self):
+        response = self.client.get(self.URL, {'stream': '1'})
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_streamed_body_equals_buffered_body(self):
+        buffered = self.client.get(self.URL)
+        response, body = self.streamed()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, buffered.content)
+        self.assertEqual(len(json.loads(body)['clothing_styles']), 4)
+
+    def test_query_failure_is_a_500(self):
+        with mock.patch('products.views._encode_style_row', side_effect=RuntimeError('disk on fire')):
+            response = self.client.get(self.URL, {'stream': '1'})
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(json.loads(response.content), {'error': 'disk on fire'})
+
+    def test_failure_after_the_first_chunk_closes_the_document(self):
+        rows = []
+
+        def fail_on_fourth_row(row):
+            rows.append(row)
+            if len(rows) == 4:
+                raise RuntimeError('connection lost')
+            return _encode_style_row(row)
+
+        with mock.patch('products.views._encode_style_row', side_effect=fail_on_fourth_row), \
+                self.assertLogs('products.views', 'ERROR'):
+            response, body = self.streamed()
+        self.assertEqual(response.status_code, 200)
+        document = json.loads(body)
+        self.assertEqual(document['error'], 'The catalog stream was interrupted')
+        self.assertEqual(len(document['clothing_styles']), 2)
+
+
+class CursorTests(TestCase):
+    """Cursors round-trip exact column values, and bad or tampered ones are refused as such."""
+
+    QUERY = '''
+        query($first: Int, $after: String) {
+            allClothingStyles(first: $first, after: $after, orderBy: COST) {
+                edges { node { name } }
+                pageInfo { hasNextPage endCursor }
+            }
+        }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.styles = [
+            ClothingStyle.objects.create(
+                name=f'Style {i}', description='Cursor', cost=Decimal('1000.50') * (i + 1),
+                image=f'https://example.com/{i}.jpg',
+            )
+            for i in range(5)
+        ]
+
+    def page(self, **variables):
+        return schema.execute(self.QUERY, variables=variables)
+
+    def test_cursor_round_trips_every_column_type(self):
+        created = timezone.now().replace(microsecond=123456)  # below the millisecond
+        ClothingStyle.objects.filter(pk=self.styles[0].pk).update(created_at=created)
+        style = ClothingStyle.objects.get(pk=self.styles[0].pk)
+        ordering = ('-created_at', 'cost', 'name', 'id')
+        cursor = cursor_for(style, ordering)
+        self.assertEqual(
+            cursor_values(ClothingStyle, ordering, cursor),
+            [created, style.cost, style.name, style.pk],
+        )
+
+    def test_malformed_cursors(self):
+        for cursor in (
+            'garbage', '', '%%%',
+            base64.urlsafe_b64encode(b'not json').decode(),
+            encode_cursor(('cost', 'id'), []),
+            encode_cursor(('cost', 'id'), ['1000.50']),
+            base64.urlsafe_b64encode(b'["1000.50", 1]').decode(),
+            base64.urlsafe_b64encode(b'{"cost": 1}').decode(),
+        ):
+            with self.subTest(cursor=cursor):
+                with self.assertRaisesMessage(ValueError, 'Invalid cursor'):
+                    cursor_values(ClothingStyle, ('cost', 'id'), cursor)
+
+    def test_tampered_cursors_are_invalid(self):
+        style_id = str(self.styles[0].pk)
+        for values in (['abc', style_id], ['1000.50', 'not-a-uuid'], [None, style_id], [{'cost': 1}, style_id]):
+            with self.subTest(values=values):
+                result = self.page(first=2, after=encode_cursor(('cost', 'id'), values))
+                self.assertEqual([error.message for error in result.errors], ['Invalid cursor'])
+
+    def test_cursor_pages_continue_after_the_row(self):
+        result = self.page(first=2)
+        after = result.data['allClothingStyles']['pageInfo']['endCursor']
+        self.assertEqual(cursor_values(ClothingStyle, ('cost', 'id'), after), [Decimal('2001.00'), self.styles[1].pk])
+        result = self.page(first=2, after=after)
+        self.assertEqual([edge['node']['name'] for edge in result.data['allClothingStyles']['edges']], ['Style 2', 'Style 3'])
+
+    def test_cursor_of_another_ordering_is_invalid(self):
+        after = self.page(first=2).data['allClothingStyles']['pageInfo']['endCursor']
+        result = schema.execute(
+            'query($after: String) { allClothingStyles(first: 2, after: $after, orderBy: NAME) { edges { node { name } } } }',
+            variables={'after': after},
+        )
+        self.assertEqual([error.message for error in result.errors], ['Invalid cursor'])
+        with self.assertRaisesMessage(ValueError, 'Invalid cursor'):
+            cursor_values(ClothingStyle, ('-cost', '-id'), after)
+
+    @override_settings(PAGINATION_DEFAULT_PAGE_SIZE=20, PAGINATION_MAX_PAGE_SIZE=3)
+    def test_page_size_is_clamped(self):
+        self.assertEqual([get_page_size(first) for first in (None, 0, 2, 3, 1000)], [3, 0, 2, 3, 3])
+        with self.assertRaisesMessage(ValueError, 'Argument "first" must be a non-negative integer'):
+            get_page_size(-1)
+        for first in (None, 1000):
+            with self.subTest(first=first):
+                page = self.page(first=first).data['allClothingStyles']
+                self.assertEqual(len(page['edges']), 3)
+                self.assertTrue(page['pageInfo']['hasNextPage'])
+
+    def test_tampered_search_cursor_is_a_400(self):
+        response = self.client.get('/api/clothing-styles/search/', {'q': 'style', 'after': encode_cursor(SEARCH_ORDERING, ['abc', 1])})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Invalid cursor'})
+
+
+class CatalogPageWalkTests(TestCase):
+    """Following endCursor visits every row exactly once, in order, for every ordering."""
+
+    QUERY = '''
+        query($order: ClothingStyleOrder, $after: String) {
+            allClothingStyles(first: 2, orderBy: $order, after: $after) {
+                edges { node { name } }
+                pageInfo { hasNextPage endCursor }
+            }
+        }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        created = timezone.now().replace(microsecond=0)
+        for i in range(7):
+            style = ClothingStyle.objects.create(
+                name=f'Style {i % 3}', description='Walk', cost=Decimal(1000 * (i % 2)),
+                image=f'https://example.com/{i}.jpg',
+            )
+            # Several rows inside one millisecond, and some exact ties on the leading column
+            ClothingStyle.objects.filter(pk=style.pk).update(
+                created_at=created + timedelta(microseconds=100 * (i // 2)),
+            )
+
+    def walk(self, order):
+        names, after = [], None
+        for _ in range(10):
+            result = schema.execute(self.QUERY, variables={'order': order, 'after': after})
+            self.assertIsNone(result.errors)
+            page = result.data['allClothingStyles']
+            names += [edge['node']['name'] for edge in page['edges']]
+            if not page['pageInfo']['hasNextPage']:
+                return names
+            after = page['pageInfo']['endCursor']
+        self.fail(f'{order} pages never end')
+
+    def test_every_ordering_walks_every_row_once(self):
+        for order, ordering in (
+            ('NAME', ('name', 'id')),
+            ('NAME_DESC', ('-name', '-id')),
+            ('COST', ('cost', 'id')),
+            ('COST_DESC', ('-cost', '-id')),
+            ('CREATED_AT', ('created_at', 'id')),
+            ('CREATED_AT_DESC', ('-created_at', '-id')),
+        ):
+            with self.subTest(order=order):
+                expected = list(ClothingStyle.objects.order_by(*ordering).values_list('name', flat=True))
+                self.assertEqual(self.walk(order), expected)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'the FTS5 index is SQLite specific')
+@override_settings(SIMILAR_STYLES_ASYNC=False)
+class SearchTests(TestCase):
+    """Full-text search ranks name hits first and follows every write path."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dress = ClothingStyle.objects.create(
+            name='Kitenge dress', description='Bright wax print', cost=Decimal('30000'), image='https://example.com/1.jpg',
+        )
+        cls.gown = ClothingStyle.objects.create(
+            name='Evening gown', description='Silk with kitenge trim', cost=Decimal('90000'), image='https://example.com/2.jpg',
+        )
+        cls.suit = ClothingStyle.objects.create(
+            name='Linen suit', description='Two piece', cost=Decimal('120000'), image='https://example.com/3.jpg',
+        )
+
+    def search(self, text, **kwargs):
+        rows, _, _ = search_clothing_styles(text, **kwargs)
+        return [row.name for row in rows]
+
+    def test_name_hits_rank_above_description_hits(self):
+        self.assertEqual(self.search('kitenge'), ['Kitenge dress', 'Evening gown'])
+        self.assertEqual(self.search('kit'), ['Kitenge dress', 'Evening gown'])  # prefixes match
+        self.assertEqual(self.search('kitenge silk'), ['Evening gown'])  # every word must match
+        self.assertEqual(self.search('!!'), [])
+
+    def test_pages_follow_the_ranking(self):
+        rows, has_next_page, ordering = search_clothing_styles('kitenge', first=1)
+        self.assertTrue(has_next_page)
+        rows, has_next_page, _ = search_clothing_styles('kitenge', first=1, after=cursor_for(rows[0], ordering))
+        self.assertEqual([row.name for row in rows], ['Evening gown'])
+        self.assertFalse(has_next_page)
+
+    def test_triggers_follow_every_write_path(self):
+        ClothingStyle.objects.bulk_create([ClothingStyle(
+            name='Kanzu', description='White robe', cost=Decimal('50000'), image='https://example.com/4.jpg',
+        )])
+        self.assertEqual(self.search('kanzu'), ['Kanzu'])
+        ClothingStyle.objects.filter(name='Kanzu').update(name='Kaftan')
+        self.assertEqual(self.search('kanzu'), [])
+        self.assertEqual(self.search('kaftan'), ['Kaftan'])
+        ClothingStyle.objects.filter(pk=self.suit.pk).update(is_active=False)
+        self.assertEqual(self.search('linen'), [])
+        self.assertEqual(self.search('linen', active_only=False), ['Linen suit'])
+        ClothingStyle.objects.filter(name='Kaftan').delete()
+        self.assertEqual(self.search('kaftan', active_only=False), [])
+
+    def test_renumbered_rowids_do_not_corrupt_the_index(self):
+        # What a VACUUM or a table rebuild may do to products_clothingstyle
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE products_clothingstyle SET rowid = rowid + 1000')
+        self.assertEqual(self.search('kitenge'), ['Kitenge dress', 'Evening gown'])
+        self.assertEqual(self.search('linen'), ['Linen suit'])
+
+    def test_missing_triggers_are_reinstalled(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {FTS_TABLE}_ai')  # as after a table rebuild
+        ensure_search_index()
+        ClothingStyle.objects.create(name='Kanga', description='Wrap', cost=Decimal('10000'), image='https://example.com/5.jpg')
+        self.assertEqual(self.search('kanga'), ['Kanga'])
+
+    def test_rebuild_command_restores_the_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        self.assertEqual(self.search('kitenge'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Rebuilt search index for 3 clothing styles', out.getvalue())
+        self.assertEqual(self.search('kitenge'), ['Kitenge dress', 'Evening gown'])
+
+    def test_rest_search_pages(self):
+        response = self.client.get('/api/clothing-styles/search/', {'q': 'kitenge', 'first': 1})
+        self.assertEqual(response.status_code, 200)
+        page = response.json()
+        self.assertEqual([style['name'] for style in page['clothing_styles']], ['Kitenge dress'])
+        self.assertTrue(page['has_next_page'])
+        response = self.client.get('/api/clothing-styles/search/', {'q': 'kitenge', 'after': page['next_cursor']})
+        self.assertEqual([style['name'] for style in response.json()['clothing_styles']], ['Evening gown'])
+
+    def test_rest_search_rejects_bad_arguments(self):
+        for params, error in (
+            ({'q': 'kitenge', 'first': 'abc'}, '"first" must be an integer'),
+            ({'q': 'kitenge', 'first': '-1'}, 'Argument "first" must be a non-negative integer'),
+            ({'q': 'kitenge', 'after': 'garbage'}, 'Invalid cursor'),
+        ):
+            with self.subTest(**params):
+                response = self.client.get('/api/clothing-styles/search/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': error})
+
+    def test_admin_search_uses_the_index(self):
+        model_admin = ClothingStyleAdmin(ClothingStyle, AdminSite())
+        request = RequestFactory().get('/admin/products/clothingstyle/', {'q': 'kitenge'})
+        with CaptureQueriesContext(connection) as ctx:
+            queryset, may_have_duplicates = model_admin.get_search_results(request, ClothingStyle.objects.all(), 'kitenge')
+            names = set(queryset.values_list('name', flat=True))
+        self.assertEqual(names, {'Kitenge dress', 'Evening gown'})
+        self.assertFalse(may_have_duplicates)
+        self.assertIn(f'{FTS_TABLE} MATCH', ctx.captured_queries[0]['sql'])
+        self.assertNotIn('LIKE', ctx.captured_queries[0]['sql'])
+
+
+def image_bytes(color='red', size=(600, 400), fmt='PNG'):
+    from PIL import Image
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@override_settings(SIMILAR_STYLES_ASYNC=False)
+class ThumbnailTests(TestCase):
+    """Image uploads are authorised and size checked; variants are written by content hash."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.style = ClothingStyle.objects.create(
+            name='Kitenge dress', description='Wax print', cost=Decimal('30000'), image='https://example.com/1.jpg',
+        )
+        cls.customer = CustomUser.objects.create_user(email='buyer@example.com', password='secret-pass')
+        cls.staff = CustomUser.objects.create_user(email='staff@example.com', password='secret-pass')
+        cls.staff.is_staff = True
+        cls.staff.save()
+        cls.tailor = TailorDetail.objects.create_user(
+            username='fundi', full_name='Fundi Juma', national_id_number='19800101-00009',
+            phone_number='+255700000009', password='secret-pass', email='fundi@example.com',
+            sex='M', area_of_residence='Tanga', area_of_work='Tanga',
+        )
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, THUMBNAIL_WORKERS=1)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.media_root = Path(media_root)
+
+    def upload(self, user=None, data=None, pk=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {refresh_token_for(user).access_token}'} if user else {}
+        image = SimpleUploadedFile('style.png', data or image_bytes(), content_type='image/png')
+        return self.client.post(f'/api/clothing-styles/{pk or self.style.pk}/image/', {'image': image}, **headers)
+
+    def variants(self):
+        return sorted(str(path.relative_to(self.media_root)) for path in self.media_root.rglob('*.*'))
+
+    def test_upload_needs_a_tailor_or_staff_token(self):
+        self.assertEqual(self.upload().status_code, 401)
+        with self.assertNumQueries(0):  # decided from the token's claims alone
+            self.assertEqual(self.upload(self.customer).status_code, 403)
+        self.assertEqual(self.variants(), [])
+        self.style.refresh_from_db()
+        self.assertEqual(self.style.image_sha256, '')
+
+    def test_upload_renders_every_variant(self):
+        data = image_bytes()
+        for user in (self.tailor, self.staff):
+            with self.subTest(user=user):
+                response = self.upload(user, data)
+                self.assertEqual(response.status_code, 200)
+        digest = hashlib.sha256(data).hexdigest()
+        body = response.json()
+        self.assertEqual(body['imageSha256'], digest)
+        self.assertEqual(
+            body['thumbnails']['webp']['256'], f'http://testserver/media/thumbnails/{digest[:2]}/{digest}/256.webp',
+        )
+        self.assertEqual(self.variants(), sorted(
+            f'thumbnails/{digest[:2]}/{digest}/{size}.{ext}' for size in (128, 256, 512) for ext in ('webp', 'jpg')
+        ))
+        self.style.refresh_from_db()
+        self.assertEqual(self.style.image_sha256, digest)
+
+    @override_settings(THUMBNAIL_MAX_SOURCE_BYTES=100)
+    def test_oversized_uploads_are_rejected_unread(self):
+        with mock.patch('products.views.ingest_image') as ingest:
+            response = self.upload(self.tailor)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json(), {'error': 'Image is larger than 100 bytes'})
+        ingest.assert_not_called()
+
+    def test_bad_uploads(self):
+        self.assertEqual(self.upload(self.tailor, b'not an image').status_code, 400)
+        self.assertEqual(self.upload(self.tailor, pk=uuid.uuid4()).status_code, 404)
+        self.assertEqual(self.variants(), [])
+
+    def test_thumbnail_url_picks_the_nearest_larger_variant(self):
+        self.assertEqual(thumbnail_url(self.style), 'https://example.com/1.jpg')
+        style = ClothingStyle(image_sha256='ab' * 32)
+        prefix = f'/media/thumbnails/ab/{"ab" * 32}'
+        self.assertEqual(thumbnail_url(style), f'{prefix}/128.webp')
+        self.assertEqual(thumbnail_url(style, 200, 'jpeg'), f'{prefix}/256.jpg')
+        self.assertEqual(thumbnail_url(style, 5000), f'{prefix}/512.webp')
+        with self.assertRaises(ValueError):
+            thumbnail_url(style, 128, 'gif')
+
+    def test_backfill_resumes_and_reports_failures(self):
+        source = self.media_root / 'source.png'
+        source.write_bytes(image_bytes('blue'))
+        ClothingStyle.objects.filter(pk=self.style.pk).update(image=source.as_uri())
+        missing = ClothingStyle.objects.create(
+            name='Kanzu', description='Robe', cost=Decimal('50000'), image=(self.media_root / 'missing.png').as_uri(),
+        )
+        out, err = StringIO(), StringIO()
+        call_command('backfill_thumbnails', workers=1, stdout=out, stderr=err)
+        self.assertIn('Backfilled thumbnails for 1 clothing styles', out.getvalue())
+        self.assertIn(f'{missing.pk}:', err.getvalue())
+        self.style.refresh_from_db()
+        digest = hashlib.sha256(source.read_bytes()).hexdigest()
+        self.assertEqual(self.style.image_sha256, digest)
+        self.assertTrue((self.media_root / f'thumbnails/{digest[:2]}/{digest}/512.jpg').exists())
+        # Finished styles are skipped on the next run
+        out = StringIO()
+        call_command('backfill_thumbnails', workers=1, stdout=out, stderr=StringIO())
+        self.assertIn('Backfilled thumbnails for 0 clothing styles', out.getvalue())
+
+
+    def test_backfill_only_reads_http_and_media_sources(self):
+        outside = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, outside)
+        (outside / 'secret.png').write_bytes(image_bytes('red'))
+        (self.media_root / 'link.png').symlink_to(outside / 'secret.png')
+        sources = [
+            str(outside / 'secret.png'),
+            (outside / 'secret.png').as_uri(),
+            f'{self.media_root}/../{outside.name}/secret.png',
+            (self.media_root / 'link.png').as_uri(),
+            'ftp://example.com/secret.png',
+        ]
+        ClothingStyle.objects.filter(pk=self.style.pk).update(image=sources[0])
+        for index, source in enumerate(sources[1:]):
+            ClothingStyle.objects.create(name=f'Unsafe {index}', description='Robe', cost=Decimal('50000'), image=source)
+        out = StringIO()
+        with self.assertLogs('products.management.commands.backfill_thumbnails', 'WARNING') as logs:
+            call_command('backfill_thumbnails', workers=1, stdout=out, stderr=StringIO())
+        self.assertEqual(len(logs.records), len(sources))
+        self.assertIn('(0 failed, 5 skipped)', out.getvalue())
+        self.assertEqual(self.variants(), ['link.png'])
+        options = thumbnail_options()
+        for source in sources:
+            with self.subTest(source=source):
+                with self.assertRaisesMessage(ValueError, 'neither an http(s) URL nor a file under'):
+                    read_source(source, options['max_bytes'], options['source_root'])
+
+class UpdateClothingStyleTests(TestCase):
+    """Partial updates are one UPDATE of the supplied columns, guarded by updated_at when asked."""
+
+    MUTATION = '''
+        mutation ($id: ID!, $name: String, $expected: DateTime) {
+            updateClothingStyle(id: $id, name: $name, expectedUpdatedAt: $expected) {
+                clothingStyle { id name %s }
+            }
+        }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.style = ClothingStyle.objects.create(
+            name='Kitenge dress', description='Wax print', cost=Decimal('30000'), image='https://example.com/1.jpg',
+        )
+
+    def update(self, extra='', **variables):
+        variables.setdefault('id', str(self.style.pk))
+        with CaptureQueriesContext(connection) as ctx:
+            result = schema.execute(self.MUTATION % extra, variables=variables)
+        return result, [query['sql'] for query in ctx.captured_queries]
+
+    def updated_columns(self, sql):
+        return set(re.findall(r'"(\w+)" = ', sql.split(' SET ', 1)[1].split(' WHERE ', 1)[0]))
+
+    def test_one_update_of_the_supplied_columns(self):
+        result, queries = self.update(name='Kitenge gown')
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data['updateClothingStyle']['clothingStyle']['name'], 'Kitenge gown')
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0].startswith('UPDATE "products_clothingstyle"'))
+        self.assertEqual(self.updated_columns(queries[0]), {'name', 'updated_at'})
+        self.style.refresh_from_db()
+        self.assertEqual((self.style.name, self.style.description), ('Kitenge gown', 'Wax print'))
+
+    def test_other_selected_columns_are_loaded_alone(self):
+        result, queries = self.update('cost', name='Kitenge gown')
+        self.assertEqual(result.data['updateClothingStyle']['clothingStyle']['cost'], '30000.00')
+        self.assertEqual(len(queries), 2)
+        self.assertIn('SELECT "products_clothingstyle"."cost" FROM', queries[1])
+
+    def test_stale_expected_updated_at_is_a_conflict(self):
+        stale = (self.style.updated_at - timedelta(seconds=1)).isoformat()
+        result, queries = self.update(name='Lost edit', expected=stale)
+        self.assertEqual(
+            result.errors[0].message, 'Clothing style was modified by someone else; reload it and try again',
+        )
+        self.assertEqual(len(queries), 2)  # the guarded UPDATE matched nothing, then the existence check
+        self.style.refresh_from_db()
+        self.assertEqual(self.style.name, 'Kitenge dress')
+        result, _ = self.update(name='Kitenge gown', expected=self.style.updated_at.isoformat())
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data['updateClothingStyle']['clothingStyle']['name'], 'Kitenge gown')
+
+    def test_unknown_id_returns_null(self):
+        result, queries = self.update(id=str(uuid.uuid4()), name='Ghost')
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data, {'updateClothingStyle': None})
+        self.assertEqual(len(queries), 1)
+
+
+@override_settings(SIMILAR_STYLES_ASYNC=False)
+class BulkMutationTests(TestCase):
+    """Bulk create and update apply every item or none; bulk delete reports each id."""
+
+    CREATE = '''
+        mutation ($items: [ClothingStyleInput!]!) {
+            bulkCreateClothingStyles(items: $items) {
+                success results { index id success message clothingStyle { name } }
+            }
+        }
+    '''
+    UPDATE = '''
+        mutation ($items: [ClothingStyleUpdateInput!]!) {
+            bulkUpdateClothingStyles(items: $items) {
+                success results { index id success message clothingStyle { name } }
+            }
+        }
+    '''
+    DELETE = '''
+        mutation ($ids: [ID!]!) {
+            bulkDeleteClothingStyles(ids: $ids) { success deletedCount results { index id success message } }
+        }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.styles = [
+            ClothingStyle.objects.create(
+                name=f'Style {i}', description='Wax print', cost=Decimal('1000') * (i + 1),
+                image=f'https://example.com/{i}.jpg',
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.changed = []
+        receiver = lambda sender, pks=None, **kwargs: self.changed.append(set(pks))
+        clothing_styles_changed.connect(receiver, weak=False, dispatch_uid='bulk-mutation-tests')
+        self.addCleanup(clothing_styles_changed.disconnect, dispatch_uid='bulk-mutation-tests')
+
+    def item(self, name, cost='5000'):
+        return {'name': name, 'description': 'Ankara', 'cost': cost, 'image': 'https://example.com/new.jpg'}
+
+    def execute(self, query, **variables):
+        result = schema.execute(query, variables=variables)
+        self.assertIsNone(result.errors)
+        return next(iter(result.data.values()))
+
+    def test_create_inserts_every_item(self):
+        data = self.execute(self.CREATE, items=[self.item('Boubou'), self.item('Agbada')])
+        self.assertTrue(data['success'])
+        self.assertEqual(
+            [(result['index'], result['success'], result['message'], result['clothingStyle']['name'])
+             for result in data['results']],
+            [(0, True, None, 'Boubou'), (1, True, None, 'Agbada')],
+        )
+        created = {uuid.UUID(result['id']) for result in data['results']}
+        self.assertEqual(
+            set(ClothingStyle.objects.filter(pk__in=created).values_list('name', flat=True)), {'Boubou', 'Agbada'},
+        )
+        self.assertEqual(self.changed, [created])
+
+    def test_create_writes_nothing_when_one_item_is_invalid(self):
+        data = self.execute(self.CREATE, items=[self.item('Boubou'), self.item('Agbada', cost='-1')])
+        self.assertFalse(data['success'])
+        first, second = data['results']
+        self.assertEqual(
+            (first['success'], first['message'], first['clothingStyle']),
+            (False, 'Not applied: other items failed validation', None),
+        )
+        self.assertFalse(second['success'])
+        self.assertIn('cost', second['message'])
+        self.assertFalse(ClothingStyle.objects.filter(name__in=['Boubou', 'Agbada']).exists())
+        self.assertEqual(self.changed, [])
+
+    @override_settings(BULK_MUTATION_MAX_ITEMS=1)
+    def test_too_many_items_are_rejected(self):
+        result = schema.execute(self.CREATE, variables={'items': [self.item('Boubou'), self.item('Agbada')]})
+        self.assertEqual(result.errors[0].message, 'At most 1 items can be sent in one bulk mutation')
+        self.assertFalse(ClothingStyle.objects.filter(name='Boubou').exists())
+
+    def test_update_writes_every_item(self):
+        first, second = self.styles[:2]
+        data = self.execute(self.UPDATE, items=[
+            {'id': str(first.pk), 'name': 'Kaftan'},
+            {'id': str(second.pk), 'cost': '7500'},
+        ])
+        self.assertTrue(data['success'])
+        self.assertEqual(
+            [(result['id'], result['clothingStyle']['name']) for result in data['results']],
+            [(str(first.pk), 'Kaftan'), (str(second.pk), 'Style 1')],
+        )
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.name, second.cost), ('Kaftan', Decimal('7500')))
+        self.assertEqual(self.changed, [{first.pk, second.pk}])
+
+    def test_update_writes_nothing_when_one_item_fails(self):
+        style = self.styles[0]
+        missing = str(uuid.uuid4())
+        data = self.execute(self.UPDATE, items=[
+            {'id': str(style.pk), 'name': 'Kaftan'},
+            {'id': missing, 'name': 'Ghost'},
+            {'id': 'not-a-uuid', 'name': 'Typo'},
+            {'id': str(style.pk), 'name': 'Twice'},
+            {'id': str(self.styles[1].pk), 'cost': '-1'},
+        ])
+        self.assertFalse(data['success'])
+        self.assertEqual(
+            [(result['id'], result['success'], result['message']) for result in data['results'][:4]],
+            [(str(style.pk), False, 'Not applied: other items failed validation'),
+             (missing, False, 'Clothing style not found'),
+             ('not-a-uuid', False, 'Invalid clothing style id'),
+             (str(style.pk), False, 'Duplicate clothing style id')],
+        )
+        self.assertIn('cost', data['results'][4]['message'])
+        self.assertEqual(
+            list(ClothingStyle.objects.order_by('name').values_list('name', 'cost')),
+            [(style.name, style.cost) for style in self.styles],
+        )
+        self.assertEqual(self.changed, [])
+
+    def test_delete_reports_each_id(self):
+        doomed = [str(style.pk) for style in self.styles[:2]]
+        missing = str(uuid.uuid4())
+        deleted = []
+        receiver = lambda sender, instance, **kwargs: deleted.append(instance.pk)
+        post_delete.connect(receiver, sender=ClothingStyle, weak=False, dispatch_uid='bulk-mutation-tests')
+        self.addCleanup(post_delete.disconnect, sender=ClothingStyle, dispatch_uid='bulk-mutation-tests')
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.execute(self.DELETE, ids=doomed + [missing, 'not-a-uuid', doomed[0]])
+        self.assertEqual(len([query for query in ctx.captured_queries if query['sql'].startswith('DELETE')]), 1)
+        self.assertFalse(data['success'])
+        self.assertEqual(data['deletedCount'], 2)
+        self.assertEqual(
+            [(result['index'], result['success'], result['message']) for result in data['results']],
+            [(0, True, None), (1, True, None), (2, False, 'Clothing style not found'),
+             (3, False, 'Invalid clothing style id'), (4, False, 'Duplicate clothing style id')],
+        )
+        self.assertEqual(list(ClothingStyle.objects.values_list('pk', flat=True)), [self.styles[2].pk])
+        # One clothing_styles_changed, no post_delete per row
+        self.assertEqual(deleted, [])
+        self.assertEqual(self.changed, [{style.pk for style in self.styles[:2]}])
+
+    def test_delete_of_unknown_ids_deletes_nothing(self):
+        data = self.execute(self.DELETE, ids=[str(uuid.uuid4())])
+        self.assertEqual((data['success'], data['deletedCount']), (False, 0))
+        self.assertEqual(ClothingStyle.objects.count(), 3)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'the FTS5 index is SQLite specific')
+@override_settings(SIMILAR_STYLES_ASYNC=False, SIMILAR_STYLES_COUNT=3)
+class SeedDataTests(TestCase):
+    """Synthetic seeding replaces earlier synthetic data and leaves the search index working."""
+
+    def seed(self, **options):
+        call_command('seed_data', stdout=StringIO(), **options)
+
+    def search_objects(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE name LIKE %s", [f'{FTS_TABLE}%'])
+            return {name for name, in cursor.fetchall()}
+
+    def indexed(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+            return cursor.fetchone()[0]
+
+    def test_reseeding_replaces_the_catalog_and_keeps_the_index(self):
+        objects = self.search_objects()
+        self.seed(count=40, seed=1)
+        rebuild_similar_styles()
+        self.seed(count=30, seed=2)
+        self.assertEqual(ClothingStyle.objects.count(), 30)
+        self.assertFalse(SimilarClothingStyle.objects.exists())
+        self.assertEqual(self.search_objects(), objects)
+        self.assertEqual(self.indexed(), 30)
+        name = ClothingStyle.objects.values_list('name', flat=True).first()
+        self.assertIn(name, [row.name for row in search_clothing_styles(name, active_only=False)[0]])
+        # The triggers are back: later writes are indexed too
+        ClothingStyle.objects.create(name='Kitambi', description='Cloth', cost=Decimal('50000'), image='https://example.com/k.jpg')
+        self.assertEqual([row.name for row in search_clothing_styles('kitambi')[0]], ['Kitambi'])
+
+    def test_failed_seeding_reinstalls_the_index(self):
+        objects = self.search_objects()
+        with mock.patch('products.management.commands.seed_data.Command.clothing_styles', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.seed(count=10)
+        self.assertEqual(self.search_objects(), objects)
+        ClothingStyle.objects.create(name='Kitambi', description='Cloth', cost=Decimal('50000'), image='https://example.com/k.jpg')
+        self.assertEqual([row.name for row in search_clothing_styles('kitambi')[0]], ['Kitambi'])
+
+    def test_reseeding_accounts_keeps_real_ones(self):
+        real = TailorDetail.objects.create_user(
+            username='fundi', full_name='Fundi Juma', national_id_number='19800101-00010',
+            phone_number='+255700000010', password='secret-pass', email='fundi@example.com',
+            sex='M', area_of_residence='Tanga', area_of_work='Tanga',
+        )
+        customer = CustomUser.objects.create_user(email='buyer@example.com', password='secret-pass')
+        TailorProduct.objects.create(
+            tailor=real, category='TSHIRT', product_name='Real shirt', product_image='https://example.com/s.jpg',
+            cost=500, description='Shirt', measurement_guides='Neck',
+        )
+        self.seed(tailors=4, products=10, users=3, seed=1)
+        deleted = []
+        receiver = lambda sender, instance, **kwargs: deleted.append(instance)
+        post_delete.connect(receiver, weak=False, dispatch_uid='seed-data-tests')
+        self.addCleanup(post_delete.disconnect, dispatch_uid='seed-data-tests')
+        # Batches narrower than the seeded pk ranges
+        self.seed(tailors=4, products=10, users=3, seed=2, batch_size=3)
+        self.assertEqual(deleted, [])
+        self.assertEqual(TailorDetail.objects.count(), 5)
+        self.assertEqual(TailorProduct.objects.count(), 11)
+        self.assertEqual(CustomUser.objects.count(), 4)
+        self.assertTrue(TailorDetail.objects.filter(pk=real.pk).exists())
+        self.assertEqual(list(real.products.values_list('product_name', flat=True)), ['Real shirt'])
+        self.assertTrue(CustomUser.objects.filter(pk=customer.pk).exists())
+
+
+@override_settings(SIMILAR_STYLES_ASYNC=False, SIMILAR_STYLES_COUNT=3)
+class SimilarClothingStylesTests(TestCase):
+    """Incremental refreshes must leave the same neighbour lists as a full rebuild."""
+
+    TEXTS = [
+        ('Kitenge maxi dress', 'Long kitenge print dress with flared sleeves'),
+        ('Kitenge midi dress', 'Kitenge print dress cut below the knee'),
+        ('Linen safari suit', 'Two piece linen suit with patch pockets'),
+        ('Wool safari suit', 'Two piece wool suit with a belted jacket'),
+        ('Kanzu', 'Embroidered white robe for ceremonies'),
+        ('Silk kanzu', 'White silk robe with embroidered collar'),
+    ]
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.styles = [
+                ClothingStyle.objects.create(name=name, description=description, cost=Decimal('1000.00'),
+                                             image='https://example.com/style.jpg')
+                for name, description in self.TEXTS
+            ]
+
+    def stored_lists(self):
+        lists = {}
+        for link in SimilarClothingStyle.objects.order_by('style_id', 'rank'):
+            # Scores only: which of several equally similar styles survives the cut-off is arbitrary.
+            lists.setdefault(link.style_id, []).append(round(link.score, 5))
+        return lists
+
+    maxDiff = None
+
+    def assertMatchesRebuild(self):
+        incremental = self.stored_lists()
+        rebuild_similar_styles()
+        self.assertEqual(incremental, self.stored_lists())
+
+    def test_neighbours_follow_creates_edits_and_deletes(self):
+        self.assertMatchesRebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            style = self.styles[4]
+            style.name, style.description = 'Kitenge shirt', 'Kitenge print shirt with short sleeves'
+            style.save()
+        self.assertMatchesRebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.styles[0].delete()
+        self.assertFalse(SimilarClothingStyle.objects.filter(similar_id=self.styles[0].pk).exists())
+        self.assertMatchesRebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            ClothingStyle.objects.filter(pk=self.styles[3].pk)._raw_delete(ClothingStyle.objects.db)
+            clothing_styles_changed.send(sender=ClothingStyle, pks=[self.styles[3].pk])
+        self.assertMatchesRebuild()
+
+    def test_inactive_styles_are_not_ranked(self):
+        kitenge, midi = self.styles[:2]
+        ClothingStyle.objects.filter(pk=midi.pk).update(is_active=False)
+        # Not refreshed yet: the stale link is skipped before the page is cut
+        self.assertCountEqual(  # equally similar, so in key order
+            [style.name for style in similar_clothing_styles(kitenge.pk, first=2)],
+            ['Linen safari suit', 'Wool safari suit'],
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            clothing_styles_changed.send(sender=ClothingStyle, pks=[midi.pk])
+        self.assertFalse(SimilarClothingStyle.objects.filter(similar_id=midi.pk).exists())
+        self.assertFalse(SimilarClothingStyle.objects.filter(style_id=midi.pk).exists())
+        self.assertMatchesRebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            midi.is_active = True
+            midi.save()
+        self.assertEqual(similar_clothing_styles(kitenge.pk, first=1), [midi])
+        self.assertMatchesRebuild()
+
+    @override_settings(SIMILAR_STYLES_ASYNC=True)
+    def test_commits_are_queued_for_the_worker(self):
+        deleted = self.styles[0].pk
+        self.assertMatchesRebuild()
+        with mock.patch('products.similarity.get_index', side_effect=AssertionError('web process loaded the matrix')):
+            with self.captureOnCommitCallbacks(execute=True):
+                style = self.styles[4]
+                style.name, style.description = 'Kitenge shirt', 'Kitenge print shirt with short sleeves'
+                style.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.styles[0].delete()
+        self.assertEqual(SimilarStyleRefresh.objects.count(), 2)
+        self.assertTrue(SimilarClothingStyle.objects.filter(similar_id=deleted).exists())
+        out = StringIO()
+        call_command('refresh_similar_styles', batch_size=1, stdout=out)
+        self.assertIn('Refreshed similar styles for 2 queued changes', out.getvalue())
+        self.assertFalse(SimilarStyleRefresh.objects.exists())
+        self.assertFalse(SimilarClothingStyle.objects.filter(similar_id=deleted).exists())
+        self.assertMatchesRebuild()
+
+    def test_query_is_one_indexed_lookup(self):
+        query = '''
+            query ($id: ID!) { similarClothingStyles(id: $id, first: 2) { name } }
+        '''
+        with CaptureQueriesContext(connection) as ctx:
+            result = schema.execute(query, variables={'id': str(self.styles[0].pk)})
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(result.data['similarClothingStyles'][0]['name'], 'Kitenge midi dress')
+
+
+class SelectionProjectionTests(TestCase):
+    """Resolvers read only the columns the client selected."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.style = ClothingStyle.objects.create(
+            name='Kitenge maxi dress', description='Long kitenge print dress', cost=Decimal('1000.00'),
+            image='https://example.com/style.jpg',
+        )
+
+    def selected_columns(self, query, variables=None):
+        with CaptureQueriesContext(connection) as ctx:
+            result = schema.execute(query, variables=variables)
+        self.assertIsNone(result.errors)
+        sql = ctx.captured_queries[0]['sql']
+        return set(re.findall(r'"products_clothingstyle"\."(\w+)"', sql.split(' FROM ')[0]))
+
+    def test_connection_selects_fields_and_ordering_columns(self):
+        columns = self.selected_columns('{ allClothingStyles(orderBy: COST) { edges { node { id name } } } }')
+        self.assertEqual(columns, {'id', 'name', 'cost'})
+
+    def test_fragments_and_resolver_dependencies(self):
+        query = '''
+            query ($id: ID) { clothingStyle(id: $id) { ...Card } }
+            fragment Card on ClothingStyleType { name thumbnailUrl(size: 128) }
+        '''
+        columns = self.selected_columns(query, {'id': str(self.style.pk)})
+        self.assertEqual(columns, {'id', 'name', 'image', 'image_sha256'})
+
+    def test_similar_styles_select_through_the_link(self):
+        query = '''query ($id: ID!) { similarClothingStyles(id: $id) { cost } }'''
+        with CaptureQueriesContext(connection) as ctx:
+            schema.execute(query, variables={'id': str(self.style.pk)})
+        selected = ctx.captured_queries[0]['sql'].split(' FROM ')[0]
+        self.assertIn('"cost"', selected)
+        self.assertNotIn('"description"', selected)
+
+
+class PersistedQueryTests(TestCase):
+    """The endpoint accepts APQ hashes and reuses parsed documents."""
+
+    QUERY = '{ allClothingStyles(first: 1) { edges { node { name } } } }'
+
+    def setUp(self):
+        caches['graphql-apq'].clear()
+        document_cache.clear()
+
+    def post(self, body):
+        response = self.client.post('/graphql/', json.dumps(body), content_type='application/json')
+        return response.json()
+
+    def persisted(self, query=None, sha256=None):
+        body = {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': sha256 or query_hash(query or self.QUERY)}}}
+        if query is not None:
+            body['query'] = query
+        return body
+
+    def test_hash_is_registered_by_the_first_full_request(self):
+        self.assertEqual(self.post(self.persisted())['errors'][0]['message'], 'PersistedQueryNotFound')
+        self.assertIn('data', self.post(self.persisted(self.QUERY)))
+        document_cache.clear()  # e.g. another worker sharing the store
+        self.assertEqual(self.post(self.persisted()), {'data': {'allClothingStyles': {'edges': []}}})
+
+    def test_repeat_queries_skip_parsing(self):
+        with mock.patch('sews.views.parse', wraps=parse) as parsed:
+            for _ in range(3):
+                self.assertIn('data', self.post({'query': self.QUERY}))
+        self.assertEqual(parsed.call_count, 1)
+        self.assertEqual(document_cache.stats(), {'hits': 2, 'misses': 1, 'size': 1})
+
+    def test_only_valid_documents_are_registered(self):
+        for query in ('{ allClothingStyles(first: 1) {', '{ noSuchField }'):
+            with self.subTest(query=query):
+                self.assertIn('errors', self.post(self.persisted(query)))
+                self.assertEqual(self.post(self.persisted(sha256=query_hash(query)))['errors'][0]['message'],
+                                 'PersistedQueryNotFound')
+        self.assertEqual(self.post(self.persisted(self.QUERY, sha256=query_hash(self.QUERY)))['data'],
+                         {'allClothingStyles': {'edges': []}})
+        self.assertIsNotNone(caches['graphql-apq'].get(f'graphql:apq:{query_hash(self.QUERY)}'))
+
+    def test_hash_must_match_the_query(self):
+        body = self.persisted(self.QUERY, sha256='0' * 64)
+        self.assertEqual(self.post(body)['errors'][0]['extensions']['code'], 'PERSISTED_QUERY_HASH_MISMATCH')
+
+    def test_allowlist_rejects_unknown_documents(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as manifest:
+            json.dump({query_hash(self.QUERY): self.QUERY}, manifest)
+        self.addCleanup(os.unlink, manifest.name)
+        with override_settings(GRAPHQL_PERSISTED_QUERY_ALLOWLIST=manifest.name):
+            self.assertIn('data', self.post(self.persisted()))
+            self.assertIn('data', self.post({'query': self.QUERY}))
+            other = '{ catalogVersion }'
+            self.assertEqual(self.post({'query': other})['errors'][0]['extensions']['code'], 'PERSISTED_QUERY_NOT_ALLOWED')
+            self.assertEqual(self.post(self.persisted(other))['errors'][0]['extensions']['code'],
+                             'PERSISTED_QUERY_NOT_ALLOWED')
+
+
+class QueryCostTests(TestCase):
+    """Over-budget operations are rejected by validation, before anything executes."""
+
+    def post(self, query):
+        response = self.client.post('/graphql/', json.dumps({'query': query}), content_type='application/json')
+        return response.json()
+
+    def setUp(self):
+        document_cache.clear()
+
+    @override_settings(GRAPHQL_RESULT_CACHE_FIELDS={})
+    def test_cost_is_logged_on_every_execution(self):
+        with self.assertLogs('sews.query_cost', 'INFO') as logs:
+            for _ in range(2):  # the second run reuses the cached document and its cost
+                result = self.post('query Catalog { allClothingStyles(first: 100) { edges { node { name } } } }')
+        self.assertIn('data', result)
+        self.assertEqual(logs.output, ['INFO:sews.query_cost:GraphQL operation Catalog: cost 300, depth 4, aliases 0'] * 2)
+        with self.assertLogs('sews.query_cost', 'INFO') as logs:
+            self.post('query A { catalogVersion } query B { catalogVersion c: catalogVersion }')
+            self.client.post('/graphql/', json.dumps({'query': 'query A { catalogVersion } query B { catalogVersion c: catalogVersion }',
+                                                      'operationName': 'B'}), content_type='application/json')
+        self.assertEqual(logs.output, ['INFO:sews.query_cost:GraphQL operation B: cost 0, depth 1, aliases 1'])
+
+    @override_settings(GRAPHQL_MAX_ALIASES=None)
+    def test_aliased_copies_exceed_the_cost(self):
+        # $first has no default, so each copy is priced at the maximum page size
+        copies = ' '.join(f'c{i}: allClothingStyles(first: $first) {{ edges {{ node {{ name }} }} }}' for i in range(40))
+        with CaptureQueriesContext(connection) as ctx:
+            result = self.post(f'query Copies($first: Int) {{ {copies} }}')
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertNotIn('data', result)
+        self.assertEqual(result['errors'][0]['message'], 'Operation Copies has a cost of 12000, over the limit of 10000.')
+        self.assertEqual(result['errors'][0]['extensions']['code'], 'OPERATION_TOO_EXPENSIVE')
+
+    @override_settings(GRAPHQL_MAX_COST=1000)
+    def test_variable_defaults_are_not_trusted(self):
+        # The document is validated once, so a cheap default would price every later $n
+        copies = ' '.join(f'c{i}: allClothingStyles(first: $n) {{ edges {{ node {{ name }} }} }}' for i in range(4))
+        result = self.post(f'query Copies($n: Int = 1) {{ {copies} }}')
+        self.assertEqual(result['errors'][0]['message'], 'Operation Copies has a cost of 1200, over the limit of 1000.')
+        # Left out, "first" is the default page size: 20 * (1 + (1 + (1 + 0)))
+        with self.assertLogs('sews.query_cost', 'INFO') as logs:
+            self.assertIn('data', self.post('query Page { allClothingStyles { edges { node { name } } } }'))
+        self.assertEqual(logs.output, ['INFO:sews.query_cost:GraphQL operation Page: cost 60, depth 4, aliases 0'])
+
+    @override_settings(GRAPHQL_MAX_DEPTH=3, GRAPHQL_MAX_ALIASES=1)
+    def test_depth_and_alias_limits(self):
+        result = self.post('{ a: catalogVersion b: catalogVersion allClothingStyles { edges { node { name } } } }')
+        self.assertEqual(
+            [error['message'] for error in result['errors']],
+            ['Operation (anonymous) has a depth of 4, over the limit of 3.',
+             'Operation (anonymous) has an alias count of 2, over the limit of 1.'],
+        )
+
+
+@override_settings(SIMILAR_STYLES_ASYNC=False)
+class ResultCacheTests(TestCase):
+    """Listed catalog reads are answered from the result cache until a clothing style changes."""
+
+    QUERY = 'query Style($id: ID) { clothingStyle(id: $id) { name cost } }'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.style = ClothingStyle.objects.create(name='Kitenge', description='Wax print', cost=Decimal('25000'))
+
+    def setUp(self):
+        caches['graphql-results'].clear()
+        document_cache.clear()
+        result_cache.clear_stats()
+
+    def post(self, query=None, **variables):
+        body = {'query': query or self.QUERY, 'variables': variables or {'id': str(self.style.pk)}}
+        return self.client.post('/graphql/', json.dumps(body), content_type='application/json').json()
+
+    def test_repeat_reads_run_no_resolvers(self):
+        first = self.post()
+        with self.assertNumQueries(1):  # the shared tag versions, nothing else
+            # Formatting is normalized away
+            self.assertEqual(self.post('query Style($id: ID) {\n  clothingStyle(id: $id) {\n    name\n    cost\n  }\n}'), first)
+        self.assertEqual(first['data']['clothingStyle']['name'], 'Kitenge')
+        self.assertEqual(result_cache.stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_variables_are_part_of_the_key(self):
+        other = ClothingStyle.objects.create(name='Kanzu', description='Robe', cost=Decimal('40000'))
+        self.post()
+        self.assertEqual(self.post(id=str(other.pk))['data']['clothingStyle']['name'], 'Kanzu')
+        self.assertEqual(result_cache.stats()['hits'], 0)
+
+    def test_saving_a_style_evicts_its_readers(self):
+        self.post()
+        self.post('{ allClothingStyles(first: 5) { edges { node { name } } } }')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.style.name = 'Kitenge dress'
+            self.style.save()
+        self.assertEqual(self.post()['data']['clothingStyle']['name'], 'Kitenge dress')
+        self.assertEqual(
+            self.post('{ allClothingStyles(first: 5) { edges { node { name } } } }')['data'],
+            {'allClothingStyles': {'edges': [{'node': {'name': 'Kitenge dress'}}]}},
+        )
+        self.assertEqual(result_cache.stats()['hits'], 0)
+
+    def test_other_models_do_not_evict(self):
+        self.post()
+        result_cache.invalidate(SimilarClothingStyle)
+        self.post()
+        self.assertEqual(result_cache.stats()['hits'], 1)
+
+    def test_invalidations_from_other_processes_evict(self):
+        self.post()
+        # Another worker or a management command bumps the shared version
+        caches['invalidation'].delete('graphql:result:tag:products.clothingstyle')
+        self.post()
+        self.assertEqual(result_cache.stats()['hits'], 0)
+
+    def test_per_process_tag_cache_is_reported(self):
+        self.assertEqual(check_tag_cache(None), [])
+        with override_settings(GRAPHQL_RESULT_TAG_CACHE='graphql-results'):
+            self.assertEqual([warning.id for warning in check_tag_cache(None)], ['sews.W001'])
+
+    def test_only_listed_root_fields_are_cached(self):
+        self.post('query Style($id: ID) { clothingStyle(id: $id) { name } catalogVersion }')
+        self.post(f'mutation {{ deleteClothingStyle(id: "{self.style.pk}") {{ success }} }}')
+        self.assertEqual(result_cache.stats(), {'hits': 0, 'misses': 0, 'hit_rate': 0.0})
+        with override_settings(GRAPHQL_RESULT_CACHE_FIELDS={}):
+            self.post()
+            self.post()
+        self.assertEqual(result_cache.stats()['misses'], 0)
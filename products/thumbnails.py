@@ -0,0 +1,156 @@
+# products/thumbnails.py
+import hashlib
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import urlopen
+
+from django.conf import settings
+
+# Pillow format name and file extension for every variant format.
+FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+_executor = None
+
+
+def thumbnail_sizes():
+    return tuple(sorted(getattr(settings, 'THUMBNAIL_SIZES', (128, 256, 512))))
+
+
+def thumbnail_options():
+    """Everything a worker needs, so workers never have to set up Django."""
+    return {
+        'media_root': str(settings.MEDIA_ROOT),
+        'sizes': thumbnail_sizes(),
+        'formats': tuple(FORMATS),
+        'quality': getattr(settings, 'THUMBNAIL_QUALITY', 80),
+        'max_bytes': getattr(settings, 'THUMBNAIL_MAX_SOURCE_BYTES', 20 * 1024 * 1024),
+        'source_root': str(getattr(settings, 'THUMBNAIL_SOURCE_ROOT', settings.MEDIA_ROOT)),
+    }
+
+
+def variant_name(digest, size, fmt):
+    """Storage path of a variant relative to MEDIA_ROOT; content-addressed by ``digest``."""
+    return f'thumbnails/{digest[:2]}/{digest}/{size}.{FORMATS[fmt][1]}'
+
+
+def pick_size(requested):
+    """The smallest configured size that is at least ``requested``, else the largest."""
+    sizes = thumbnail_sizes()
+    for size in sizes:
+        if requested is None or size >= requested:
+            return size
+    return sizes[-1]
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=getattr(settings, 'THUMBNAIL_WORKERS', None))
+    return _executor
+
+
+def local_source(source, source_root):
+    """
+    The file a local path or ``file://`` URL names, if it lies under
+    ``source_root`` once symlinks and ``..`` are resolved; otherwise None.
+    """
+    parsed = urlparse(source)
+    if parsed.scheme == 'file':
+        path = parsed.path
+    elif parsed.scheme:
+        return None
+    else:
+        path = source
+    path = Path(path).resolve()
+    return path if path.is_relative_to(Path(source_root).resolve()) else None
+
+
+def is_readable_source(source, source_root):
+    """Whether read_source() will read ``source``: an http(s) URL or a file under ``source_root``."""
+    return urlparse(source).scheme in ('http', 'https') or local_source(source, source_root) is not None
+
+
+def read_source(source, max_bytes, source_root):
+    """Read image bytes from an http(s) URL or a file under ``source_root``."""
+    if urlparse(source).scheme in ('http', 'https'):
+        with urlopen(source, timeout=30) as response:
+            data = response.read(max_bytes + 1)
+    else:
+        path = local_source(source, source_root)
+        if path is None:
+            raise ValueError(f'Image source is neither an http(s) URL nor a file under {source_root}')
+        with open(path, 'rb') as handle:
+            data = handle.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ValueError(f'Image is larger than {max_bytes} bytes')
+    return data
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as handle:
+        handle.write(data)
+    os.replace(tmp, path)
+
+
+def render_variants(data, options):
+    """
+    Decode ``data`` once, write every missing size/format variant under the
+    content-addressed directory and return the sha256 digest.
+
+    Runs inside pool workers: it only touches Pillow and the filesystem.
+    Files are written via rename, so an interrupted run never leaves a
+    truncated variant behind and a rerun skips what already exists.
+    """
+    from PIL import Image, ImageOps
+
+    digest = hashlib.sha256(data).hexdigest()
+    media_root = Path(options['media_root'])
+    pending = [
+        (size, fmt) for size in options['sizes'] for fmt in options['formats']
+        if not (media_root / variant_name(digest, size, fmt)).exists()
+    ]
+    if not pending:
+        return digest
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for size, fmt in pending:
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            variant.save(buffer, FORMATS[fmt][0], quality=options['quality'], optimize=True)
+            _write_atomic(media_root / variant_name(digest, size, fmt), buffer.getvalue())
+    return digest
+
+
+def render_source(source, options):
+    """Pool task for the backfill: fetch ``source`` and render its variants."""
+    return render_variants(read_source(source, options['max_bytes'], options['source_root']), options)
+
+
+def ingest_image(data):
+    """
+    Render the variants of an uploaded image on the process pool and return
+    its digest, to be stored in ``ClothingStyle.image_sha256``.
+    """
+    options = thumbnail_options()
+    if len(data) > options['max_bytes']:
+        raise ValueError(f"Image is larger than {options['max_bytes']} bytes")
+    return get_executor().submit(render_variants, data, options).result()
+
+
+def thumbnail_url(style, size=None, fmt='webp'):
+    """MEDIA_URL of the requested variant, or the original image URL before ingestion."""
+    if not style.image_sha256:
+        return style.image
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    return settings.MEDIA_URL + variant_name(style.image_sha256, pick_size(size), fmt)
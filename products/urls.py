@@ -7,4 +7,6 @@ app_name = 'products'
 
 urlpatterns = [
     path('clothing-styles/', views.clothing_styles_api, name='clothing_styles_api'),
+    path('clothing-styles/search/', views.search_clothing_styles_api, name='search_clothing_styles_api'),
+    path('clothing-styles/<uuid:pk>/image/', views.clothing_style_image_api, name='clothing_style_image_api'),
 ]
\ No newline at end of file
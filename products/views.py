@@ -1,26 +1,207 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
+from json.encoder import encode_basestring_ascii
+from .cache import catalog_cache_key, get_catalog_version
 from .models import ClothingStyle
+from .pagination import cursor_for
+from .search import search_clothing_styles
+from .signals import clothing_styles_changed
+from .thumbnails import ingest_image, thumbnail_options, thumbnail_sizes, thumbnail_url
+import itertools
 import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Column order used by the streaming encoder; keep in step with _encode_style_row.
+STREAM_FIELDS = ('id', 'name', 'description', 'cost', 'image', 'is_active')
+
+
+def _encode_style_row(row):
+    """
+    Encode one ``values_list(*STREAM_FIELDS)`` row exactly as JsonResponse
+    would encode the equivalent dict, without building the dict.
+    """
+    id, name, description, cost, image, is_active = row
+    return '{"id": "%s", "name": %s, "description": %s, "cost": %r, "image": %s, "isActive": %s}' % (
+        id,
+        encode_basestring_ascii(name),
+        encode_basestring_ascii(description),
+        float(cost),
+        encode_basestring_ascii(image),
+        'true' if is_active else 'false',
+    )
+
+
+def stream_clothing_styles(queryset, chunk_size):
+    """
+    Yield the ``{"clothing_styles": [...]}`` document in chunks of
+    ``chunk_size`` rows.
+
+    Nothing is yielded before the query has run, so the view can still
+    answer a failing query with a 500. Once bytes are out the status is
+    sent; a later failure closes the document with an ``"error"`` member
+    instead of truncating it.
+    """
+    rows = queryset.values_list(*STREAM_FIELDS).iterator(chunk_size=chunk_size)
+    buffer = ['{"clothing_styles": [']
+    separator = ''
+    sent = False
+    try:
+        for row in rows:
+            buffer.append(separator)
+            buffer.append(_encode_style_row(row))
+            separator = ', '
+            if len(buffer) >= 2 * chunk_size:
+                yield ''.join(buffer).encode()
+                sent = True
+                buffer.clear()
+    except Exception:
+        if not sent:
+            raise
+        logger.exception('Streaming clothing styles failed')
+        yield b'], "error": "The catalog stream was interrupted"}'
+        return
+    finally:
+        rows.close()  # release the cursor now, not whenever it is collected
+    buffer.append(']}')
+    yield ''.join(buffer).encode()
+
+
+def serialize_style(style):
+    return {
+        'id': str(style.id),
+        'name': style.name,
+        'description': style.description,
+        'cost': float(style.cost),
+        'image': style.image,
+        'isActive': style.is_active,
+    }
+
+
+def request_catalog_version(request):
+    # Once per request: the generation is read from the shared cache
+    if not hasattr(request, '_catalog_version'):
+        request._catalog_version = get_catalog_version()
+    return request._catalog_version
+
+
+def catalog_etag(request, *args, **kwargs):
+    return request_catalog_version(request)[0]
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return request_catalog_version(request)[1]
+
 
 @csrf_exempt
 @require_http_methods(["GET"])
+@condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)
 def clothing_styles_api(request):
-    """REST API endpoint for clothing styles (optional)"""
+    """REST API endpoint for clothing styles (optional)
+
+    Pass ``?stream=1`` to receive the same document as a chunked stream with
+    constant memory use, for large catalogs.
+
+    Responses carry an ETag and Last-Modified derived from the catalog
+    version, so polling clients get ``304 Not Modified`` while nothing has
+    changed. The rendered document is cached per version.
+    """
     try:
         styles = ClothingStyle.objects.filter(is_active=True)
-        data = []
-        for style in styles:
-            data.append({
-                'id': str(style.id),
-                'name': style.name,
-                'description': style.description,
-                'cost': float(style.cost),
-                'image': style.image,
-                'isActive': style.is_active,
-            })
-        return JsonResponse({'clothing_styles': data})
+        if request.GET.get('stream') in ('1', 'true'):
+            chunk_size = getattr(settings, 'CLOTHING_STYLES_STREAM_CHUNK_SIZE', 2000)
+            chunks = stream_clothing_styles(styles, chunk_size)
+            # Runs the query here, where its errors still become a 500
+            first = next(chunks)
+            return StreamingHttpResponse(
+                itertools.chain([first], chunks),
+                content_type='application/json',
+            )
+        cache_key = catalog_cache_key('clothing-styles-api', request_catalog_version(request)[0])
+        content = cache.get(cache_key)
+        if content is not None:
+            return HttpResponse(content, content_type='application/json')
+        data = [serialize_style(style) for style in styles]
+        response = JsonResponse({'clothing_styles': data})
+        cache.set(cache_key, response.content, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+        return response
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def search_clothing_styles_api(request):
+    """Full-text search over active clothing styles: ``?q=&first=&after=``"""
+    first = request.GET.get('first')
+    try:
+        first = int(first) if first else None
+    except ValueError:
+        return JsonResponse({'error': '"first" must be an integer'}, status=400)
+    try:
+        rows, has_next_page, ordering = search_clothing_styles(
+            request.GET.get('q', ''),
+            first=first,
+            after=request.GET.get('after') or None,
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    return JsonResponse({
+        'clothing_styles': [serialize_style(style) for style in rows],
+        'next_cursor': cursor_for(rows[-1], ordering) if rows else None,
+        'has_next_page': has_next_page,
+    })
+
+
+def can_change_images(principal):
+    """Tailors and staff may replace style images; ``is_staff`` is the token's claim."""
+    return principal.is_staff or principal.is_tailor
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def clothing_style_image_api(request, pk):
+    """
+    Upload a new image (multipart field ``image``) and generate its thumbnails.
+
+    Needs a bearer token of a tailor or a staff user. Browsers never attach
+    bearer tokens on their own, which is why the view can be CSRF exempt.
+    """
+    principal = getattr(request, 'principal', None)
+    if principal is None or not principal.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    if not can_change_images(principal):
+        return JsonResponse({'error': 'Only tailors and staff can change images'}, status=403)
+    upload = request.FILES.get('image')
+    if upload is None:
+        return JsonResponse({'error': 'Missing "image" file'}, status=400)
+    max_bytes = thumbnail_options()['max_bytes']
+    if upload.size > max_bytes:
+        return JsonResponse({'error': f'Image is larger than {max_bytes} bytes'}, status=413)
+    if not ClothingStyle.objects.filter(pk=pk).exists():
+        return JsonResponse({'error': 'Clothing style not found'}, status=404)
+    try:
+        digest = ingest_image(upload.read())
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': f'Could not process image: {e}'}, status=400)
+    with transaction.atomic():
+        ClothingStyle.objects.filter(pk=pk).update(image_sha256=digest, updated_at=timezone.now())
+        clothing_styles_changed.send(sender=ClothingStyle, pks=[pk])
+    style = ClothingStyle(pk=pk, image_sha256=digest)
+    return JsonResponse({
+        'id': str(pk),
+        'imageSha256': digest,
+        'thumbnails': {
+            fmt: {size: request.build_absolute_uri(thumbnail_url(style, size, fmt)) for size in thumbnail_sizes()}
+            for fmt in ('webp', 'jpeg')
+        },
+    })
@@ -0,0 +1,74 @@
+"""
+Helpers shared by the ``benchmark_*`` management commands.
+"""
+import os
+import resource
+import tempfile
+import time
+from contextlib import contextmanager
+from multiprocessing import get_context
+
+from django.db import connections
+
+
+@contextmanager
+def scratch_database(alias='default'):
+    """
+    Run the block against a freshly migrated throwaway database so
+    benchmarks never touch real data. SQLite scratch databases are kept on
+    disk, not in memory, so they don't count towards the process RSS.
+    """
+    connection = connections[alias]
+    old_name = connection.settings_dict['NAME']
+    workdir = None
+    if connection.vendor == 'sqlite':
+        workdir = tempfile.mkdtemp(prefix='sews-bench-')
+        connection.settings_dict['TEST']['NAME'] = os.path.join(workdir, 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        if workdir:
+            os.rmdir(workdir)
+
+
+def current_rss_kb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize() // 1024
+
+
+def _run_isolated(conn, func, args):
+    start_rss = current_rss_kb()
+    result = func(*args)
+    result['peak_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result['rss_growth_kb'] = result['peak_rss_kb'] - start_rss
+    conn.send(result)
+    conn.close()
+
+
+def run_isolated(func, *args):
+    """
+    Run ``func(*args)`` in a forked child and return its result dict with
+    the child's peak RSS added, so each measurement starts from the same
+    memory baseline. Linux only.
+    """
+    connections.close_all()
+    ctx = get_context('fork')
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_run_isolated, args=(child_conn, func, args))
+    process.start()
+    result = parent_conn.recv()
+    process.join()
+    return result
+
+
+def timed(func, *args, repeat=1):
+    """Return the best wall-clock time of ``repeat`` calls, in seconds."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
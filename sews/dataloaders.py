@@ -0,0 +1,80 @@
+"""
+Per-request batch loaders for GraphQL resolvers.
+
+Execution is synchronous, so a resolver cannot wait for its siblings to
+ask for their keys the way promise-based DataLoaders do. Instead the
+resolver that returns a list announces the keys its children will need
+with ``enqueue()``; the first ``load()`` then fetches every queued key in
+one batch, and the rest of the siblings are served from the loader's cache.
+"""
+
+
+class DataLoader:
+    """
+    Batch and cache calls to ``batch_load(keys)``, which must return a dict
+    mapping each found key to its value; missing keys load as ``default``.
+    """
+
+    def __init__(self, batch_load, default=None):
+        self.batch_load = batch_load
+        self.default = default
+        self._cache = {}
+        self._queue = {}  # insertion-ordered set of keys awaiting the next batch
+        self.batches = 0
+
+    def enqueue(self, keys):
+        """Remember ``keys`` for the next batch; never queries."""
+        for key in keys:
+            if key not in self._cache:
+                self._queue[key] = None
+
+    def prime(self, key, value):
+        """Cache a value the caller already holds."""
+        self._cache[key] = value
+        self._queue.pop(key, None)
+
+    def load(self, key):
+        if key not in self._cache:
+            self._queue[key] = None
+            self._dispatch()
+        return self._cache[key]
+
+    def load_many(self, keys):
+        keys = list(keys)
+        self.enqueue(keys)
+        if self._queue:
+            self._dispatch()
+        return [self._cache[key] for key in keys]
+
+    def _dispatch(self):
+        keys = list(self._queue)
+        self._queue.clear()
+        found = self.batch_load(keys)
+        self.batches += 1
+        for key in keys:
+            self._cache[key] = found.get(key, self.default)
+
+
+def get_loader(info, batch_load, default=None):
+    """
+    The loader for ``batch_load`` that belongs to the current request.
+
+    Loaders live on ``info.context`` so everything resolved for one request
+    shares them; without a context every call gets a fresh, unshared loader.
+    """
+    context = info.context
+    loaders = getattr(context, 'dataloaders', None)
+    if loaders is None:
+        loaders = {}
+        if context is not None:
+            context.dataloaders = loaders
+    loader = loaders.get(batch_load)
+    if loader is None:
+        loader = loaders[batch_load] = DataLoader(batch_load, default)
+    return loader
+
+
+def clear_loaders(context):
+    """Forget everything loaded for ``context``, e.g. after a mutation."""
+    if getattr(context, 'dataloaders', None):
+        context.dataloaders = {}
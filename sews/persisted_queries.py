@@ -0,0 +1,126 @@
+"""
+Automatic persisted queries (APQ) and the parsed-document cache behind the
+GraphQL endpoint.
+
+Clients following the APQ protocol send ``extensions.persistedQuery.
+sha256Hash`` instead of the query text; the first time a hash is unknown
+the server answers ``PersistedQueryNotFound`` and the client retries with
+the text, which is then stored under its hash for every later request.
+
+Whether the text arrives or is looked up, the parsed and validated
+``DocumentNode`` is kept in a per-process LRU keyed by the same hash, so
+repeat operations skip both parsing and validation.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+
+KEY_PREFIX = 'graphql:apq'
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+class DocumentCache:
+    """
+    Per-process LRU keyed by ``(schema, validation rules, query hash)``; the
+    view stores each validated document with its operation costs.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            document = self._entries.get(key)
+            if document is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return document
+
+    def set(self, key, document):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = document
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+class PersistedQueryStore:
+    """
+    Query texts by sha256 hash.
+
+    By default any client may register a document through APQ once it has
+    parsed and validated; it is kept in the cache named by
+    GRAPHQL_PERSISTED_QUERY_CACHE, an alias of its own so registrations
+    can only evict other registrations. With
+    GRAPHQL_PERSISTED_QUERY_ALLOWLIST set to a JSON manifest of
+    ``{"<sha256>": "<query>"}`` only the documents in the manifest are
+    known and nothing can be registered at runtime.
+    """
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'GRAPHQL_PERSISTED_QUERY_CACHE', 'graphql-apq')]
+        self.allowlist = load_allowlist(getattr(settings, 'GRAPHQL_PERSISTED_QUERY_ALLOWLIST', None))
+
+    @property
+    def allowlist_only(self):
+        return self.allowlist is not None
+
+    def get(self, sha256):
+        if self.allowlist_only:
+            return self.allowlist.get(sha256)
+        return self.cache.get(f'{KEY_PREFIX}:{sha256}')
+
+    def register(self, sha256, query):
+        if not self.allowlist_only:
+            self.cache.set(f'{KEY_PREFIX}:{sha256}', query, None)
+
+
+_allowlists = {}
+
+
+def load_allowlist(path):
+    """The manifest at ``path`` as a dict, read once per process; None when unset."""
+    if not path:
+        return None
+    path = str(path)
+    if path not in _allowlists:
+        try:
+            with open(path, encoding='utf-8') as handle:
+                manifest = json.load(handle)
+        except (OSError, ValueError) as e:
+            raise ImproperlyConfigured(f'GRAPHQL_PERSISTED_QUERY_ALLOWLIST {path!r} is unreadable: {e}')
+        if not isinstance(manifest, dict):
+            raise ImproperlyConfigured('GRAPHQL_PERSISTED_QUERY_ALLOWLIST must map sha256 hashes to queries')
+        for sha256, query in manifest.items():
+            if query_hash(query) != sha256:
+                raise ImproperlyConfigured(f'GRAPHQL_PERSISTED_QUERY_ALLOWLIST entry {sha256} does not match its query')
+        _allowlists[path] = manifest
+    return _allowlists[path]
+
+
+document_cache = DocumentCache(getattr(settings, 'GRAPHQL_DOCUMENT_CACHE_SIZE', 1000))
@@ -0,0 +1,115 @@
+"""
+Column projection from the GraphQL selection set.
+
+``project()`` narrows a queryset to the columns the client actually
+selected: ``.only()`` for the model's own columns and ``select_related()``
+(with its own ``.only()`` columns) for selected foreign keys whose type is
+the related model's DjangoObjectType. Reverse and many-to-many relations
+are left to the per-request loaders in ``sews.dataloaders``, which already
+fetch them with one ``IN`` query.
+
+A GraphQL field maps to the model field of the same (snake_case) name.
+Resolvers that read other columns declare them on the graphene type::
+
+    class ClothingStyleType(DjangoObjectType):
+        field_dependencies = {'thumbnail_url': ('image', 'image_sha256')}
+"""
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from graphene.utils.str_converters import to_snake_case
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode, get_named_type
+
+
+def selected_fields(info, nodes):
+    """
+    Field nodes selected directly below ``nodes``, grouped by field name and
+    merged across aliases and fragments. Type conditions and ``@skip`` /
+    ``@include`` are ignored: selecting a column too many is harmless.
+    """
+    fields = {}
+
+    def walk(selection_set):
+        for selection in selection_set.selections if selection_set else ():
+            if isinstance(selection, FieldNode):
+                fields.setdefault(selection.name.value, []).append(selection)
+            elif isinstance(selection, FragmentSpreadNode):
+                walk(info.fragments[selection.name.value].selection_set)
+            elif isinstance(selection, InlineFragmentNode):
+                walk(selection.selection_set)
+
+    for node in nodes:
+        walk(node.selection_set)
+    return fields
+
+
+def _model_of(graphql_type):
+    meta = getattr(getattr(graphql_type, 'graphene_type', None), '_meta', None)
+    return getattr(meta, 'model', None)
+
+
+def _columns(info, nodes, graphql_type, model, prefix, only, related):
+    dependencies = getattr(graphql_type.graphene_type, 'field_dependencies', {})
+    only.add(prefix + model._meta.pk.name)
+    for name, field_nodes in selected_fields(info, nodes).items():
+        if name.startswith('__'):
+            continue
+        snake = to_snake_case(name)
+        for attname in dependencies.get(snake, (snake,)):
+            try:
+                field = model._meta.get_field(attname)
+            except FieldDoesNotExist:
+                continue
+            if not field.concrete:
+                continue  # reverse relations: see sews.dataloaders
+            only.add(prefix + field.name)
+            if not field.is_relation or field.many_to_many or name not in graphql_type.fields:
+                continue
+            nested_type = get_named_type(graphql_type.fields[name].type)
+            if _model_of(nested_type) is field.related_model:
+                related.append(prefix + field.name)
+                _columns(info, field_nodes, nested_type, field.related_model,
+                         f'{prefix}{field.name}__', only, related)
+
+
+def project(queryset, info, path=(), required=(), through=None):
+    """
+    Apply ``.only()``/``.select_related()`` for the selection of the field
+    being resolved.
+
+    ``path`` leads from that field to the objects the queryset produces,
+    e.g. ``('edges', 'node')`` for a connection. ``required`` names columns
+    the resolver itself reads, such as the pagination ordering. With
+    ``through`` the queryset produces rows of an intermediate model and the
+    selected objects are its ``through`` foreign key.
+
+    The queryset is returned unchanged when the selected type is not a
+    DjangoObjectType of the model.
+    """
+    if not getattr(settings, 'GRAPHQL_PROJECTION', True):
+        return queryset
+    nodes = info.field_nodes
+    graphql_type = get_named_type(info.return_type)
+    for name in path:
+        if name not in getattr(graphql_type, 'fields', {}):
+            return queryset
+        nodes = selected_fields(info, nodes).get(name, [])
+        graphql_type = get_named_type(graphql_type.fields[name].type)
+
+    model = queryset.model
+    prefix = ''
+    if through is not None:
+        model = model._meta.get_field(through).related_model
+        prefix = f'{through}__'
+    if not nodes or _model_of(graphql_type) is not model:
+        return queryset
+
+    only = {prefix + name.lstrip('-') for name in required}
+    related = [through] if through else []
+    _columns(info, nodes, graphql_type, model, prefix, only, related)
+    if through:
+        only.add(through)
+    if related or not {prefix + field.name for field in model._meta.concrete_fields} <= only:
+        queryset = queryset.only(*sorted(only))
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset
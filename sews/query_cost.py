@@ -0,0 +1,176 @@
+"""
+Static depth, alias and cost limits for GraphQL operations.
+
+``QueryCostRule`` runs with the other validation rules, before anything
+executes, and rejects operations over GRAPHQL_MAX_DEPTH,
+GRAPHQL_MAX_ALIASES or GRAPHQL_MAX_COST.
+
+The cost of a field is ``size * (weight + cost of its selections)``:
+
+* ``weight`` is GRAPHQL_FIELD_COSTS["Type.field"], else 1 for fields that
+  return objects and 0 for scalars;
+* ``size`` is the number of items the field may return. For fields with
+  a ``first`` argument that is its literal value, PAGINATION_MAX_PAGE_SIZE
+  when it is a variable and PAGINATION_DEFAULT_PAGE_SIZE when it is left
+  out. Other list fields count GRAPHQL_LIST_SIZES["Type.field"] or
+  GRAPHQL_DEFAULT_LIST_SIZE items, everything else 1. The ``edges`` of a
+  connection are already counted by the connection's ``first``.
+
+A variable is priced at the maximum, never at its default, because a
+document is validated once and then cached: the values clients send
+later are never seen here.
+
+So ``allClothingStyles(first: 100) { edges { node { name } } }`` costs
+100 * (1 + (1 + (1 + 0))) = 300. Introspection fields are not counted.
+
+Documents are validated once per process thanks to sews.persisted_queries.
+The view keeps each document's ``operation_costs()`` next to it in the
+document cache and logs the figures with ``log_cost()`` every time the
+operation runs, so the log follows real traffic.
+"""
+import logging
+
+from django.conf import settings
+from graphql import (
+    FieldNode, FragmentSpreadNode, GraphQLError, GraphQLList, GraphQLNonNull, InlineFragmentNode,
+    IntValueNode, VariableNode, get_named_type, is_composite_type, specified_rules,
+)
+from graphql.validation import ValidationRule
+
+logger = logging.getLogger(__name__)
+
+
+def cost_limits():
+    return {
+        'depth': getattr(settings, 'GRAPHQL_MAX_DEPTH', 10),
+        'aliases': getattr(settings, 'GRAPHQL_MAX_ALIASES', 30),
+        'cost': getattr(settings, 'GRAPHQL_MAX_COST', 10000),
+    }
+
+
+def batch_cost_limit():
+    """Limit on the summed cost of the operations of one batch; None disables it."""
+    return getattr(settings, 'GRAPHQL_MAX_BATCH_COST', cost_limits()['cost'])
+
+
+def _is_list(graphql_type):
+    if isinstance(graphql_type, GraphQLNonNull):
+        graphql_type = graphql_type.of_type
+    return isinstance(graphql_type, GraphQLList)
+
+
+class OperationCost:
+    """Depth, alias count and cost of one operation, fragments expanded."""
+
+    def __init__(self, schema, document, operation):
+        self.schema = schema
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if definition.kind == 'fragment_definition'
+        }
+        self.field_costs = getattr(settings, 'GRAPHQL_FIELD_COSTS', {})
+        self.list_sizes = getattr(settings, 'GRAPHQL_LIST_SIZES', {})
+        self.default_list_size = getattr(settings, 'GRAPHQL_DEFAULT_LIST_SIZE', 20)
+        self.max_page_size = getattr(settings, 'PAGINATION_MAX_PAGE_SIZE', 100)
+        self.default_page_size = min(getattr(settings, 'PAGINATION_DEFAULT_PAGE_SIZE', 20), self.max_page_size)
+        self.depth = self.aliases = 0
+        root = schema.get_root_type(operation.operation)
+        self.cost = self.selection_cost(operation.selection_set, root, 1, ()) if root else 0
+
+    def selection_cost(self, selection_set, parent_type, depth, fragments):
+        total = 0
+        for selection in selection_set.selections if selection_set else ():
+            if isinstance(selection, FieldNode):
+                total += self.field_cost(selection, parent_type, depth)
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition
+                fragment_type = self.schema.get_type(condition.name.value) if condition else parent_type
+                total += self.selection_cost(selection.selection_set, fragment_type, depth, fragments)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is None or name in fragments:
+                    continue  # reported by the spec rules
+                fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                total += self.selection_cost(fragment.selection_set, fragment_type, depth, fragments + (name,))
+        return total
+
+    def field_cost(self, node, parent_type, depth):
+        name = node.name.value
+        field = getattr(parent_type, 'fields', {}).get(name)
+        if field is None or name.startswith('__'):
+            return 0
+        if node.alias is not None:
+            self.aliases += 1
+        self.depth = max(self.depth, depth)
+        key = f'{parent_type.name}.{name}'
+        named_type = get_named_type(field.type)
+        weight = self.field_costs.get(key, 1 if is_composite_type(named_type) else 0)
+        children = self.selection_cost(node.selection_set, named_type, depth + 1, ())
+        return self.size(node, field, parent_type, key) * (weight + children)
+
+    def size(self, node, field, parent_type, key):
+        if 'first' in field.args:
+            first = next((argument.value for argument in node.arguments if argument.name.value == 'first'), None)
+            if isinstance(first, VariableNode):
+                return self.max_page_size
+            if isinstance(first, IntValueNode):
+                return max(0, min(int(first.value), self.max_page_size))
+            return self.default_page_size
+        if not _is_list(field.type):
+            return 1
+        if node.name.value == 'edges' and parent_type.name.endswith('Connection'):
+            return 1
+        return self.list_sizes.get(key, self.default_list_size)
+
+
+def operation_costs(schema, document):
+    """OperationCost of every operation in a valid ``document``, by name (None when anonymous)."""
+    return {
+        definition.name.value if definition.name else None: OperationCost(schema, document, definition)
+        for definition in document.definitions
+        if definition.kind == 'operation_definition'
+    }
+
+
+def selected_cost(costs, operation_name):
+    """The OperationCost ``operation_name`` selects from ``costs``, or None."""
+    if operation_name is None and len(costs) == 1:
+        [analysis] = costs.values()
+        return analysis
+    return costs.get(operation_name)
+
+
+def log_cost(costs, operation_name):
+    """Log the figures of the operation ``operation_name`` selects from ``costs``."""
+    if operation_name is None and len(costs) == 1:
+        [(operation_name, analysis)] = costs.items()
+    else:
+        analysis = costs.get(operation_name)
+    if analysis is not None:
+        logger.info(
+            'GraphQL operation %s: cost %d, depth %d, aliases %d',
+            operation_name or '(anonymous)', analysis.cost, analysis.depth, analysis.aliases,
+        )
+
+
+class QueryCostRule(ValidationRule):
+    """Reject operations over the configured depth, alias or cost limits."""
+
+    def enter_operation_definition(self, node, *args):
+        analysis = OperationCost(self.context.schema, self.context.document, node)
+        name = node.name.value if node.name else '(anonymous)'
+        limits = cost_limits()
+        measured = {'depth': analysis.depth, 'aliases': analysis.aliases, 'cost': analysis.cost}
+        for limit, label in (('depth', 'a depth'), ('aliases', 'an alias count'), ('cost', 'a cost')):
+            if limits[limit] is not None and measured[limit] > limits[limit]:
+                self.report_error(GraphQLError(
+                    f'Operation {name} has {label} of {measured[limit]}, over the limit of {limits[limit]}.',
+                    node, extensions={'code': 'OPERATION_TOO_EXPENSIVE', limit: measured[limit]},
+                ))
+        return self.SKIP
+
+
+# The specification's rules plus the limits; the view passes these to validate().
+validation_rules = (*specified_rules, QueryCostRule)
@@ -0,0 +1,217 @@
+"""
+Opt-in cache of whole GraphQL results.
+
+An operation is served from the cache when every root field it selects is
+listed in GRAPHQL_RESULT_CACHE_FIELDS. A hit returns the stored data
+without running a single resolver. Only results without errors are
+stored, in the cache alias GRAPHQL_RESULT_CACHE, for
+GRAPHQL_RESULT_CACHE_TIMEOUT seconds; the alias' MAX_ENTRIES bounds its size.
+
+Each field is listed with its scope:
+
+* ``'public'``: one entry shared by every client;
+* ``'principal'``: one entry per authenticated principal (customer or
+  tailor), plus one for anonymous clients.
+
+The key combines the hash of the normalized document (formatting does not
+matter), the operation name, the variables, the scope, the host (absolute
+URLs may be built from it) and the version of every tag.
+
+The tags are the models behind the DjangoObjectTypes the operation
+selects, so ``clothingStyle(id:) { name }`` is tagged
+``products.clothingstyle``. ``invalidate(model)`` gives the model's tag a
+new version: exactly the entries that read the model become unreachable
+and age out of the cache, while everything else stays warm. Apps call it
+from their model signals; see products.signals.
+
+The tag versions are kept in the alias GRAPHQL_RESULT_TAG_CACHE, which
+must be shared by every process: a write made by another worker or a
+management command only evicts this process' results through it.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode, OperationType, get_named_type, get_operation_ast
+from graphql.language import print_ast
+
+from .persisted_queries import DocumentCache, query_hash
+from .projection import _model_of
+
+KEY_PREFIX = 'graphql:result'
+SCOPES = ('public', 'principal')
+# Backends whose entries no other process can see
+PER_PROCESS_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+class CachePolicy:
+    """How results of one operation are cached: normalized hash, scope and model tags."""
+
+    def __init__(self, document_hash, scope, tags):
+        self.document_hash = document_hash
+        self.scope = scope
+        self.tags = tags
+
+
+def build_policy(schema, document, operation_name, fields):
+    """The CachePolicy of the operation, or None when it must not be cached."""
+    operation = get_operation_ast(document, operation_name)
+    if operation is None or operation.operation != OperationType.QUERY:
+        return None
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions
+        if definition.kind == 'fragment_definition'
+    }
+    scopes, tags = set(), set()
+
+    def walk(selection_set, parent_type, seen, root):
+        for selection in selection_set.selections if selection_set else ():
+            if isinstance(selection, FieldNode):
+                name = selection.name.value
+                if name == '__typename':
+                    continue
+                if root:
+                    scope = fields.get(f'{parent_type.name}.{name}')
+                    if scope not in SCOPES:
+                        return False
+                    scopes.add(scope)
+                field = getattr(parent_type, 'fields', {}).get(name)
+                if field is None:
+                    return False
+                named_type = get_named_type(field.type)
+                model = _model_of(named_type)
+                if model is not None:
+                    tags.add(model._meta.label_lower)
+                if not walk(selection.selection_set, named_type, (), False):
+                    return False
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition
+                fragment_type = schema.get_type(condition.name.value) if condition else parent_type
+                if not walk(selection.selection_set, fragment_type, seen, root):
+                    return False
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = fragments.get(name)
+                if fragment is None or name in seen:
+                    return False
+                fragment_type = schema.get_type(fragment.type_condition.name.value)
+                if not walk(fragment.selection_set, fragment_type, seen + (name,), root):
+                    return False
+        return True
+
+    if not walk(operation.selection_set, schema.query_type, (), True) or not scopes:
+        return None
+    scope = 'principal' if 'principal' in scopes else 'public'
+    return CachePolicy(query_hash(print_ast(document)), scope, tuple(sorted(tags)))
+
+
+class ResultCache:
+    """Cached operation results, with this process' hit and miss counts."""
+
+    def __init__(self, policy_cache_size):
+        self._policies = DocumentCache(policy_cache_size)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'GRAPHQL_RESULT_CACHE', 'default')]
+
+    @property
+    def tag_cache(self):
+        return caches[getattr(settings, 'GRAPHQL_RESULT_TAG_CACHE', 'default')]
+
+    def policy(self, schema, document, sha256, operation_name):
+        fields = getattr(settings, 'GRAPHQL_RESULT_CACHE_FIELDS', {})
+        if not fields:
+            return None
+        key = (schema, sha256, operation_name, tuple(sorted(fields.items())))
+        policy = self._policies.get(key)
+        if policy is None:
+            policy = build_policy(schema, document, operation_name, fields) or False
+            self._policies.set(key, policy)
+        return policy or None
+
+    def tag_versions(self, tags):
+        keys = [f'{KEY_PREFIX}:tag:{tag}' for tag in tags]
+        versions = self.tag_cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                # add() so concurrent first readers agree on one version
+                self.tag_cache.add(key, str(time.time_ns()), None)
+                versions[key] = self.tag_cache.get(key)
+        return [versions[key] for key in keys]
+
+    def key(self, request, policy, operation_name, variables):
+        scope = 'public'
+        if policy.scope == 'principal':
+            principal = getattr(request, 'principal', None)
+            if principal is not None and principal.is_authenticated:
+                scope = f'{principal.principal}:{principal.id}'
+            else:
+                scope = 'anonymous'
+        host = request.get_host() if hasattr(request, 'get_host') else ''
+        payload = json.dumps(
+            [policy.document_hash, operation_name, variables, scope, host, self.tag_versions(policy.tags)],
+            sort_keys=True, separators=(',', ':'), default=str,
+        )
+        return f'{KEY_PREFIX}:{hashlib.sha256(payload.encode("utf-8")).hexdigest()}'
+
+    def get(self, key):
+        data = self.cache.get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, key, data):
+        self.cache.set(key, data, getattr(settings, 'GRAPHQL_RESULT_CACHE_TIMEOUT', 60))
+
+    def invalidate(self, model):
+        """Make every result that read ``model`` unreachable."""
+        self.tag_cache.delete(f'{KEY_PREFIX}:tag:{model._meta.label_lower}')
+
+    def clear_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+@checks.register(checks.Tags.caches)
+def check_tag_cache(app_configs, **kwargs):
+    if not getattr(settings, 'GRAPHQL_RESULT_CACHE_FIELDS', {}):
+        return []
+    alias = getattr(settings, 'GRAPHQL_RESULT_TAG_CACHE', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend in PER_PROCESS_BACKENDS:
+        return [checks.Warning(
+            f'GRAPHQL_RESULT_TAG_CACHE names the per-process cache {alias!r}.',
+            hint=(
+                'Writes made by other processes will not evict cached GraphQL results until '
+                'GRAPHQL_RESULT_CACHE_TIMEOUT passes; use a cache every process shares.'
+            ),
+            id='sews.W001',
+        )]
+    return []
+
+
+result_cache = ResultCache(getattr(settings, 'GRAPHQL_DOCUMENT_CACHE_SIZE', 1000))
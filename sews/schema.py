@@ -1,10 +1,11 @@
 import graphene
 from products.schema import Query as ProductsQuery, Mutation as ProductsMutation
+from users.schema import Query as UsersQuery, Mutation as UsersMutation
 
-class Query(ProductsQuery, graphene.ObjectType):
+class Query(ProductsQuery, UsersQuery, graphene.ObjectType):
     pass
 
-class Mutation(ProductsMutation, graphene.ObjectType):
+class Mutation(ProductsMutation, UsersMutation, graphene.ObjectType):
     pass
 
 schema = graphene.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -124,6 +126,39 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing, per environment. PASSWORD_HASHER picks the hasher for
+# new passwords; the other stays listed so its hashes keep verifying. Hashes
+# made with another hasher or cost are re-encoded on the next login.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+_PASSWORD_HASHER_PATHS = {
+    'pbkdf2': 'users.hashers.ConfigurablePBKDF2PasswordHasher',
+    'scrypt': 'users.hashers.ConfigurableScryptPasswordHasher',
+}
+if PASSWORD_HASHER not in _PASSWORD_HASHER_PATHS:
+    raise ImproperlyConfigured(f"PASSWORD_HASHER must be one of {', '.join(_PASSWORD_HASHER_PATHS)}")
+PASSWORD_HASHERS = [_PASSWORD_HASHER_PATHS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHER_PATHS.items() if name != PASSWORD_HASHER
+]
+# Costs; unset means Django's defaults (600000 iterations, n=2**14 r=8 p=1)
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS') or 0) or None
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.environ.get('PASSWORD_SCRYPT_WORK_FACTOR') or 0) or None
+PASSWORD_SCRYPT_BLOCK_SIZE = int(os.environ.get('PASSWORD_SCRYPT_BLOCK_SIZE') or 0) or None
+PASSWORD_SCRYPT_PARALLELISM = int(os.environ.get('PASSWORD_SCRYPT_PARALLELISM') or 0) or None
+
+
+# Login throttle: token buckets per username/email and per client IP, kept
+# in this cache alias, which nothing else may use (point it at a file or
+# database cache to share the buckets between worker processes). Set
+# LOGIN_THROTTLE_IP_HEADER (e.g. 'HTTP_X_FORWARDED_FOR') only behind a
+# proxy that sets it.
+LOGIN_THROTTLE_CACHE = 'login-throttle'
+LOGIN_THROTTLE_USERNAME_BURST = 5
+LOGIN_THROTTLE_USERNAME_PER_MINUTE = 5
+LOGIN_THROTTLE_IP_BURST = 30
+LOGIN_THROTTLE_IP_PER_MINUTE = 30
+LOGIN_THROTTLE_IP_HEADER = None
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -143,6 +178,21 @@ STATIC_URL = "static/"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Clothing style thumbnails: edge lengths in pixels, generated as WebP and JPEG
+THUMBNAIL_SIZES = (128, 256, 512)
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_WORKERS = None  # ProcessPoolExecutor default: one per CPU
+# backfill_thumbnails reads http(s) images and local files under
+# THUMBNAIL_SOURCE_ROOT (MEDIA_ROOT unless set); other sources are skipped.
+
+# Similar styles: hashed feature dimensions, neighbours kept per style, and
+# whether changed styles are queued after each commit for the
+# refresh_similar_styles worker (run it with --interval) instead of being
+# refreshed in the committing process.
+SIMILAR_STYLES_DIMENSIONS = 256
+SIMILAR_STYLES_COUNT = 10
+SIMILAR_STYLES_ASYNC = True
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -155,17 +205,131 @@ AUTHENTICATION_BACKENDS = [
 
 ]
 
+# 'default' holds persisted queries, login throttles and the catalog
+# version; cached GraphQL results get their own size-bounded alias.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'graphql-results': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'graphql-results',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    # Registered APQ documents; bounded, and apart from everything else
+    'graphql-apq': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'graphql-apq',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    # Login throttle buckets, one per recent username and client IP
+    'login-throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'login-throttle',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+    # Invalidation state every worker and management command must agree on:
+    # a handful of version keys, read once per cached request. migrate
+    # creates the table (see products.signals).
+    'invalidation': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'sews_invalidation_cache',
+    },
+}
+
+# The catalog version behind the REST ETag and catalogVersion is cached
+# per process for CATALOG_VERSION_TIMEOUT seconds under a generation kept
+# in CATALOG_VERSION_CACHE; model signals start a new generation. That
+# alias has to be shared by every process (a system check warns otherwise).
+CATALOG_VERSION_CACHE = 'invalidation'
+CATALOG_VERSION_TIMEOUT = 60
+
 GRAPHENE = {
-    "SCHEMA": "users.schema.schema",  # adjust this to your schema path
-    "MIDDLEWARE": [
-        "graphql_jwt.middleware.JSONWebTokenMiddleware",
-    ],
+    "SCHEMA": "sews.schema.schema",  # products + users
+    # Authentication happens once per request in users.middleware; a
+    # per-resolver graphql_jwt middleware would force the lazy request.user
+    # on every field without a graphql_jwt backend to authenticate against.
+    "MIDDLEWARE": [],
+}
+
+# Resolvers load only the model columns the GraphQL selection set needs
+# (sews.projection). False loads whole rows, e.g. to compare in benchmarks.
+GRAPHQL_PROJECTION = True
+
+# Automatic persisted queries: documents registered by clients, once they
+# parse and validate, are kept in this cache alias of their own (use a
+# shared cache so every worker knows them), and
+# each process keeps up to GRAPHQL_DOCUMENT_CACHE_SIZE parsed and validated
+# documents. Pointing GRAPHQL_PERSISTED_QUERY_ALLOWLIST at a JSON manifest
+# of {"<sha256>": "<query>"} rejects every other document.
+GRAPHQL_PERSISTED_QUERY_CACHE = 'graphql-apq'
+GRAPHQL_DOCUMENT_CACHE_SIZE = 1000
+GRAPHQL_PERSISTED_QUERY_ALLOWLIST = os.environ.get('GRAPHQL_PERSISTED_QUERY_ALLOWLIST') or None
+
+# Whole results of read operations whose root fields are all listed here,
+# with their scope: 'public' entries are shared by every client,
+# 'principal' entries are kept per customer or tailor. A hit runs no
+# resolver; model signals evict the entries that read the changed model
+# (sews.result_cache). The cache alias' MAX_ENTRIES bounds its size.
+# Results are kept per process, but the tag versions that evict them live
+# in GRAPHQL_RESULT_TAG_CACHE, which has to be shared by every process (a
+# system check warns otherwise) so writes from anywhere evict everywhere.
+GRAPHQL_RESULT_CACHE = 'graphql-results'
+GRAPHQL_RESULT_TAG_CACHE = 'invalidation'
+GRAPHQL_RESULT_CACHE_TIMEOUT = 300
+GRAPHQL_RESULT_CACHE_FIELDS = {
+    'Query.allClothingStyles': 'public',
+    'Query.activeClothingStyles': 'public',
+    'Query.clothingStyle': 'public',
+}
+
+# Most operations /graphql/ runs from one JSON array body; every operation
+# is held to the limits below on its own, and the batch as a whole is
+# rejected before anything runs when their costs add up to more than
+# GRAPHQL_MAX_BATCH_COST.
+GRAPHQL_MAX_BATCH_SIZE = 20
+GRAPHQL_MAX_BATCH_COST = 20000
+
+# Operations over these limits are rejected before execution; see
+# sews.query_cost for how the cost is computed. The cost of every executed
+# operation is logged by the "sews.query_cost" logger at INFO. None
+# disables a limit.
+GRAPHQL_MAX_DEPTH = 10
+GRAPHQL_MAX_ALIASES = 30
+GRAPHQL_MAX_COST = 10000
+# Per-item weight of a field, by "Type.field"
+GRAPHQL_FIELD_COSTS = {
+    'Query.clothingStylePriceFacets': 50,  # one grouped scan of the catalog
+}
+# Items returned by list fields without a "first" argument
+GRAPHQL_DEFAULT_LIST_SIZE = 20
+GRAPHQL_LIST_SIZES = {
+    'Query.allTailors': 1000,  # unbounded
+    'Query.allCustomUsers': 1000,  # unbounded
+    'Query.clothingStylePriceFacets': 1,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # One line per executed operation, for tuning the limits above
+        'sews.query_cost': {
+            'handlers': ['console'],
+            'level': os.environ.get('GRAPHQL_COST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
 }
 
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Resolves customers and tailors alike from the token's principal claim
+        'users.authentication.PrincipalJWTAuthentication',
     ),
 }
 
@@ -178,9 +342,23 @@ GRAPHQL_JWT = {
 
 
 SIMPLE_JWT = {
+    # Also how long a revoked is_staff claim is still honoured by
+    # request.principal checks, which never query the database
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 AUTH_USER_MODEL = 'users.CustomUser'
 
+# Per-process cache of users resolved from access tokens; entries live at
+# most as long as the access token (or this many seconds, when set)
+AUTH_PRINCIPAL_CACHE_SIZE = 10000
+AUTH_PRINCIPAL_CACHE_TIMEOUT = None
+
+# Keyset pagination limits for GraphQL connections
+PAGINATION_DEFAULT_PAGE_SIZE = 20
+PAGINATION_MAX_PAGE_SIZE = 100
+
+# Largest input list accepted by the bulk catalog mutations
+BULK_MUTATION_MAX_ITEMS = 5000
+
 
@@ -14,17 +14,22 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from xml.etree.ElementInclude import include
+from django.urls import include, path
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path
-from graphene_django.views import GraphQLView
+from .views import PersistedQueryGraphQLView
 
 
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     # path('', include('demoApp.urls'))
-    path('graphql/', GraphQLView.as_view(graphiql=True)),
+    path('graphql/', PersistedQueryGraphQLView.as_view(graphiql=True)),
     path('api/', include('products.urls')),
     
 ]
+
+# Serve uploaded media (thumbnails) during development
+if settings.DEBUG:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,251 @@
+import json
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import HttpResponseBadRequest, HttpResponseNotAllowed
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView, HttpError
+from graphql import ExecutionResult, GraphQLError, OperationType, execute, get_operation_ast, parse, validate
+from graphql.type.validate import validate_schema
+
+from . import query_cost
+from .dataloaders import clear_loaders
+from .persisted_queries import PersistedQueryStore, document_cache, query_hash
+from .result_cache import result_cache
+
+
+def persisted_query_error(message, code):
+    return GraphQLError(message, extensions={'code': code})
+
+
+class PersistedQueryGraphQLView(GraphQLView):
+    """
+    GraphQLView with automatic persisted queries and a cache of parsed,
+    validated documents; see sews.persisted_queries.
+
+    Documents are cached per process under the sha256 of their text, so a
+    repeated operation costs one hash (or, sent as a bare APQ hash, one
+    dictionary lookup) instead of a parse and a full validation pass.
+    Validation includes the depth, alias and cost limits of sews.query_cost;
+    the operation's cost is cached with the document and logged whenever
+    the operation is executed.
+    Operations whose root fields are all listed in
+    GRAPHQL_RESULT_CACHE_FIELDS are answered from sews.result_cache.
+
+    A JSON array of operations is run as a batch: one HTTP request, one
+    pass through the middleware and authentication, and one context (the
+    request) shared by every operation, so their DataLoaders share a cache.
+    The response is the array of results, each with the operation's ``id``
+    and ``status``. A batch whose operations together cost more than
+    GRAPHQL_MAX_BATCH_COST is rejected whole, before any of it runs.
+    """
+    validation_rules = query_cost.validation_rules
+
+    def parse_body(self, request):
+        if self.get_content_type(request) != 'application/json':
+            return super().parse_body(request)
+        try:
+            data = json.loads(request.body.decode('utf-8'))
+        except UnicodeDecodeError as e:
+            raise HttpError(HttpResponseBadRequest(str(e)))
+        except ValueError:
+            raise HttpError(HttpResponseBadRequest('POST body sent invalid JSON.'))
+        if isinstance(data, list):
+            max_size = getattr(settings, 'GRAPHQL_MAX_BATCH_SIZE', 20)
+            if not data:
+                raise HttpError(HttpResponseBadRequest('Received an empty list in the batch request.'))
+            if len(data) > max_size:
+                raise HttpError(HttpResponseBadRequest(f'Batches are limited to {max_size} operations.'))
+            if not all(isinstance(entry, dict) for entry in data):
+                raise HttpError(HttpResponseBadRequest('Every operation in a batch must be a JSON object.'))
+            self.batch = True  # a view instance serves a single request
+            self.check_batch_cost(request, data)
+            return data
+        if not isinstance(data, dict):
+            raise HttpError(HttpResponseBadRequest('The received data is not a valid JSON query.'))
+        return data
+
+    @classmethod
+    def can_display_graphiql(cls, request, data):
+        return not isinstance(data, list) and super().can_display_graphiql(request, data)
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        try:
+            sha256, query, register = self.get_persisted_query(request, data, query)
+        except GraphQLError as e:
+            return ExecutionResult(data=None, errors=[e])
+        if sha256 is None:
+            # No query at all: GraphiQL or a 400, as before
+            return super().execute_graphql_request(request, data, query, variables, operation_name, show_graphiql)
+
+        schema = self.schema.graphql_schema
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        document, costs, errors = self.load_document(schema, sha256, query)
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+        if register:
+            # Only documents that parse and validate take a slot in the store
+            self.persisted_queries.register(sha256, query)
+
+        policy = result_cache.policy(schema, document, sha256, operation_name)
+        if policy is None:
+            query_cost.log_cost(costs, operation_name)
+            return self.execute_document(request, schema, document, variables, operation_name, show_graphiql)
+        result_key = result_cache.key(request, policy, operation_name, variables)
+        data = result_cache.get(result_key)
+        if data is not None:
+            return ExecutionResult(data=data)
+        query_cost.log_cost(costs, operation_name)
+        result = self.execute_document(request, schema, document, variables, operation_name, show_graphiql)
+        if result is not None and not result.errors and result.data is not None:
+            result_cache.set(result_key, result.data)
+        return result
+
+    def load_document(self, schema, sha256, query):
+        """
+        Return ``(document, costs, errors)`` for the query ``sha256`` names,
+        parsing and validating ``query`` (or the stored text of a bare hash)
+        unless the document cache already holds it.
+        """
+        cache_key = (schema, tuple(self.validation_rules or ()), sha256)
+        cached = document_cache.get(cache_key)
+        if cached is not None:
+            return (*cached, None)
+        if query is None:
+            query = self.persisted_queries.get(sha256)
+            if query is None:
+                return None, None, [persisted_query_error('PersistedQueryNotFound', 'PERSISTED_QUERY_NOT_FOUND')]
+        try:
+            document = parse(query)
+        except Exception as e:
+            return None, None, [e]
+        validation_errors = validate(schema, document, self.validation_rules, graphene_settings.MAX_VALIDATION_ERRORS)
+        if validation_errors:
+            return None, None, validation_errors
+        costs = query_cost.operation_costs(schema, document)
+        document_cache.set(cache_key, (document, costs))
+        return document, costs, None
+
+    def check_batch_cost(self, request, data):
+        """
+        Reject a batch whose operations together cost more than
+        GRAPHQL_MAX_BATCH_COST, before any of them runs. Operations that
+        fail to load are left to fail on their own and add nothing.
+        """
+        limit = query_cost.batch_cost_limit()
+        if limit is None:
+            return
+        schema = self.schema.graphql_schema
+        if validate_schema(schema):
+            return
+        total = 0
+        for entry in data:
+            query, variables, operation_name, id = self.get_graphql_params(request, entry)
+            try:
+                sha256, query, register = self.get_persisted_query(request, entry, query)
+            except GraphQLError:
+                continue
+            if sha256 is None:
+                continue
+            document, costs, errors = self.load_document(schema, sha256, query)
+            analysis = None if errors else query_cost.selected_cost(costs, operation_name)
+            if analysis is not None:
+                total += analysis.cost
+        if total > limit:
+            raise HttpError(HttpResponseBadRequest(
+                f'The operations of this batch have a cost of {total}, over the limit of {limit}.',
+            ))
+
+    @property
+    def persisted_queries(self):
+        # Built per request: cheap, and follows settings overridden in tests.
+        if not hasattr(self, '_persisted_queries'):
+            self._persisted_queries = PersistedQueryStore()
+        return self._persisted_queries
+
+    def get_persisted_query(self, request, data, query):
+        """
+        Return ``(sha256, query, register)`` for the request. ``query`` is
+        None when only the hash was sent; ``sha256`` is None when neither
+        was. ``register`` is true when an APQ client sent the text, which is
+        stored once the document has been validated.
+        """
+        extensions = data.get('extensions') or request.GET.get('extensions')
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest('Extensions are invalid JSON.'))
+        persisted = extensions.get('persistedQuery') if isinstance(extensions, dict) else None
+        store = self.persisted_queries
+
+        if persisted is None:
+            if not query:
+                return None, None, False
+            sha256 = query_hash(query)
+            if store.allowlist_only and store.get(sha256) is None:
+                raise persisted_query_error('Query is not in the allowlist', 'PERSISTED_QUERY_NOT_ALLOWED')
+            return sha256, query, False
+
+        sha256 = persisted.get('sha256Hash') if isinstance(persisted, dict) else None
+        if persisted.get('version') != 1 or not isinstance(sha256, str):
+            raise persisted_query_error('PersistedQueryNotSupported', 'PERSISTED_QUERY_NOT_SUPPORTED')
+        if query:
+            if query_hash(query) != sha256:
+                raise persisted_query_error('provided sha does not match query', 'PERSISTED_QUERY_HASH_MISMATCH')
+            if store.allowlist_only and store.get(sha256) is None:
+                raise persisted_query_error('Query is not in the allowlist', 'PERSISTED_QUERY_NOT_ALLOWED')
+        elif store.allowlist_only and store.get(sha256) is None:
+            raise persisted_query_error('PersistedQueryNotFound', 'PERSISTED_QUERY_NOT_FOUND')
+        return sha256, query or None, bool(query) and not store.allowlist_only
+
+    def execute_document(self, request, schema, document, variables, operation_name, show_graphiql=False):
+        """GraphQLView.execute_graphql_request() from the parsed document onwards."""
+        operation_ast = get_operation_ast(document, operation_name)
+
+        if (
+            request.method.lower() == 'get'
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseNotAllowed(
+                ['POST'], f'Can only perform a {operation_ast.operation.value} operation from a POST request.',
+            ))
+
+        try:
+            execute_options = {
+                'root_value': self.get_root_value(request),
+                'context_value': self.get_context(request),
+                'variable_values': variables,
+                'operation_name': operation_name,
+                'middleware': self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options['execution_context_class'] = self.execution_context_class
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get('ATOMIC_MUTATIONS', False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+            else:
+                result = execute(schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+        if operation_ast is not None and operation_ast.operation == OperationType.MUTATION:
+            # Later operations of a batch must not read rows cached before the mutation
+            clear_loaders(execute_options['context_value'])
+        return result
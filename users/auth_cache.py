@@ -0,0 +1,91 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework_simplejwt.settings import api_settings
+
+
+class PrincipalCache:
+    """
+    Per-process LRU of authenticated users keyed by ``(principal, token id)``,
+    where the principal identifies the user across tables, e.g.
+    ``('tailor', 42)``.
+
+    An entry never outlives its access token or ``max_age`` seconds, so a
+    change made through another process (or through ``QuerySet.update()``,
+    which sends no signal) is picked up at the latest when the token it was
+    cached for expires - the same window a stateless JWT already allows.
+    """
+
+    def __init__(self, max_size, max_age):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, principal, token_id):
+        key = (principal, token_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Each request gets its own copy, so per-request attributes such as
+        # permission caches never leak between requests.
+        return copy.copy(entry[0])
+
+    def set(self, principal, token_id, user, expires_at):
+        """Cache ``user`` until ``expires_at`` (a Unix timestamp) or ``max_age``, whichever is sooner."""
+        lifetime = min(self.max_age, expires_at - time.time())
+        if lifetime <= 0 or self.max_size <= 0:
+            return
+        key = (principal, token_id)
+        with self._lock:
+            self._entries[key] = (user, time.monotonic() + lifetime)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(principal, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, principal):
+        with self._lock:
+            for key in list(self._keys_by_user.get(principal, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+
+def _default_max_age():
+    return api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+
+
+principal_cache = PrincipalCache(
+    max_size=getattr(settings, 'AUTH_PRINCIPAL_CACHE_SIZE', 10000),
+    max_age=getattr(settings, 'AUTH_PRINCIPAL_CACHE_TIMEOUT', None) or _default_max_age(),
+)
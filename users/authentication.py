@@ -0,0 +1,100 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .auth_cache import principal_cache
+from .models import CustomUser, TailorDetail
+
+# Token claim naming the table the user id belongs to. Tokens issued before
+# the claim existed only ever belonged to CustomUser.
+PRINCIPAL_CLAIM = 'principal'
+CUSTOMER = 'customer'
+TAILOR = 'tailor'
+
+PRINCIPAL_MODELS = {
+    CUSTOMER: CustomUser,
+    TAILOR: TailorDetail,
+}
+
+
+def principal_type(user):
+    return TAILOR if isinstance(user, TailorDetail) else CUSTOMER
+
+
+def refresh_token_for(user):
+    """
+    ``RefreshToken.for_user()`` plus the claims resolvers need without a
+    query. ``is_staff`` is copied as it is now: revoking staff does not reach
+    tokens already issued.
+    """
+    refresh = RefreshToken.for_user(user)
+    refresh[PRINCIPAL_CLAIM] = principal_type(user)
+    refresh['is_staff'] = user.is_staff
+    return refresh
+
+
+class PrincipalTokenUser(TokenUser):
+    """
+    Stateless user built from the token alone: id, principal type and staff
+    flag, for resolvers and permission checks that need no model fields.
+
+    ``is_staff`` is trusted from the signed claim without a database check,
+    so a user demoted after login keeps it until the access token expires
+    (SIMPLE_JWT['ACCESS_TOKEN_LIFETIME']). Checks that must see a revocation
+    at once read ``request.user`` instead.
+    """
+
+    @property
+    def principal(self):
+        return self.token.get(PRINCIPAL_CLAIM, CUSTOMER)
+
+    @property
+    def is_tailor(self):
+        return self.principal == TAILOR
+
+    @property
+    def is_customer(self):
+        return self.principal == CUSTOMER
+
+
+class PrincipalJWTAuthentication(JWTAuthentication):
+    """
+    Resolves the token's user from the table named by its principal claim
+    with one primary-key lookup, or none when the per-process principal
+    cache already holds it.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+        principal = validated_token.get(PRINCIPAL_CLAIM, CUSTOMER)
+        model = PRINCIPAL_MODELS.get(principal)
+        if model is None:
+            raise InvalidToken('Token names an unknown principal type')
+
+        token_id = validated_token.get(api_settings.JTI_CLAIM)
+        if token_id is not None:
+            user = principal_cache.get((principal, user_id), token_id)
+            if user is not None:
+                return user
+        try:
+            user = model.objects.get(pk=user_id)
+        except model.DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        if token_id is not None:
+            principal_cache.set((principal, user_id), token_id, user, validated_token['exp'])
+        return user
+
+    def get_token_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken('Token contained no recognizable user identification')
+        return PrincipalTokenUser(validated_token)
+
+
+jwt_authentication = PrincipalJWTAuthentication()
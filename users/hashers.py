@@ -0,0 +1,50 @@
+import base64
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, ScryptPasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count taken from
+    PASSWORD_PBKDF2_ITERATIONS (Django's default when unset).
+
+    The algorithm name is unchanged, so existing hashes still verify, and
+    ``must_update()`` flags any hash with a different count: Django then
+    re-encodes it on the next successful login, upwards or downwards.
+    """
+
+    def __init__(self):
+        # Resolved once per instance: pool workers get a pickled copy and
+        # never have to read settings themselves.
+        self.iterations = getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
+
+
+class ConfigurableScryptPasswordHasher(ScryptPasswordHasher):
+    """
+    The stdlib (OpenSSL) scrypt hasher with its cost taken from
+    PASSWORD_SCRYPT_WORK_FACTOR, PASSWORD_SCRYPT_BLOCK_SIZE and
+    PASSWORD_SCRYPT_PARALLELISM; hashes with other parameters are
+    re-encoded on the next successful login.
+    """
+
+    def __init__(self):
+        self.work_factor = getattr(settings, 'PASSWORD_SCRYPT_WORK_FACTOR', None) or ScryptPasswordHasher.work_factor
+        self.block_size = getattr(settings, 'PASSWORD_SCRYPT_BLOCK_SIZE', None) or ScryptPasswordHasher.block_size
+        self.parallelism = getattr(settings, 'PASSWORD_SCRYPT_PARALLELISM', None) or ScryptPasswordHasher.parallelism
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        self._check_encode_args(password, salt)
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        # scrypt needs 128 * n * r bytes, and OpenSSL's 32 MiB default limit
+        # rejects work factors above 2**14. Size the limit per call, since
+        # verifying an older hash may need more than the current cost.
+        hash_ = hashlib.scrypt(
+            password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+            maxmem=256 * n * r, dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from sews.benchmark import scratch_database
+from users.auth_cache import principal_cache
+from users.authentication import refresh_token_for
+from users.middleware import JSONWebTokenMiddleware
+from users.models import CustomUser
+
+
+def _per_request_us(middleware, request_for, read, iterations, cold=False):
+    # Requests are built up front so only the middleware is timed.
+    requests = [request_for() for _ in range(iterations)]
+    started = time.perf_counter()
+    for request in requests:
+        if cold:
+            principal_cache.clear()
+        middleware.process_request(request)
+        if read:
+            getattr(request, read).is_authenticated
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+class Command(BaseCommand):
+    help = 'Per-request cost of the JWT middleware with and without an Authorization header'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        factory = RequestFactory()
+        with scratch_database():
+            user = CustomUser.objects.create_user(email='bench@example.com', password='bench-pass')
+            header = f'Bearer {refresh_token_for(user).access_token}'
+            middleware = JSONWebTokenMiddleware(lambda request: None)
+            cases = [
+                ('no header', lambda: factory.post('/graphql/'), None, False),
+                ('header, user unread', lambda: factory.post('/graphql/', HTTP_AUTHORIZATION=header), None, False),
+                ('header, principal read', lambda: factory.post('/graphql/', HTTP_AUTHORIZATION=header), 'principal', False),
+                ('header, user read, cached', lambda: factory.post('/graphql/', HTTP_AUTHORIZATION=header), 'user', False),
+                ('header, user read, uncached', lambda: factory.post('/graphql/', HTTP_AUTHORIZATION=header), 'user', True),
+            ]
+            _per_request_us(middleware, cases[3][1], 'user', iterations)  # warm up
+            baseline = _per_request_us(middleware, cases[0][1], None, iterations)
+            self.stdout.write(f"{'case':<30} {'us/request':>11} {'over no header':>15}")
+            for label, request_for, read, cold in cases:
+                cost = _per_request_us(middleware, request_for, read, iterations, cold)
+                self.stdout.write(f'{label:<30} {cost:>11.1f} {cost - baseline:>15.1f}')
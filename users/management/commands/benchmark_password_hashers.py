@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from sews.benchmark import scratch_database
+from users.models import TailorDetail
+from users.schema import schema
+
+LOGIN = '''
+    mutation ($username: String!, $password: String!) {
+        tailorLogin(username: $username, password: $password) { success }
+    }
+'''
+
+HASHERS = {
+    'pbkdf2': ('users.hashers.ConfigurablePBKDF2PasswordHasher', 'PASSWORD_PBKDF2_ITERATIONS'),
+    'scrypt': ('users.hashers.ConfigurableScryptPasswordHasher', 'PASSWORD_SCRYPT_WORK_FACTOR'),
+}
+
+DEFAULT_CONFIGS = [
+    'pbkdf2:600000', 'pbkdf2:300000', 'pbkdf2:100000',
+    'scrypt:32768', 'scrypt:16384', 'scrypt:8192',
+]
+
+
+def parse_config(config):
+    name, _, cost = config.partition(':')
+    if name not in HASHERS or not cost.isdigit():
+        raise CommandError(f'Expected <{"|".join(HASHERS)}>:<cost>, got {config!r}')
+    path, setting = HASHERS[name]
+    return {'PASSWORD_HASHERS': [path], setting: int(cost)}
+
+
+class Command(BaseCommand):
+    help = 'Tailor logins per second per worker for each password hasher and cost'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'configs', nargs='*', default=DEFAULT_CONFIGS,
+            help='hasher:cost pairs; cost is PBKDF2 iterations or the scrypt work factor (n)',
+        )
+        parser.add_argument('--logins', type=int, default=20)
+
+    def handle(self, *args, **options):
+        configs = [(config, parse_config(config)) for config in options['configs']]
+        with scratch_database():
+            self.stdout.write(f"{'hasher:cost':<16} {'ms/login':>9} {'logins/s/worker':>16}")
+            for number, (label, overrides) in enumerate(configs):
+                with override_settings(**overrides):
+                    username = f'bench-{number}'
+                    TailorDetail.objects.create_user(
+                        username=username, full_name='Bench Tailor', national_id_number=f'BENCH{number}',
+                        phone_number='+255700000000', password='bench-pass', email=f'{username}@example.com',
+                        sex='F', area_of_residence='Arusha', area_of_work='Arusha',
+                    )
+                    variables = {'username': username, 'password': 'bench-pass'}
+                    started = time.perf_counter()
+                    for _ in range(options['logins']):
+                        result = schema.execute(LOGIN, variables=variables)
+                        if not result.data['tailorLogin']['success']:
+                            raise CommandError(f'Login failed with {label}')
+                    per_login = (time.perf_counter() - started) / options['logins']
+                self.stdout.write(f'{label:<16} {per_login * 1000:>9.1f} {1 / per_login:>16.1f}')
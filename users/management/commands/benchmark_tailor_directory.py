@@ -0,0 +1,67 @@
+import random
+import statistics
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from products.management.commands.seed_data import AREAS
+from products.pagination import cursor_for, paginate
+from sews.benchmark import scratch_database
+from users.schema import TAILOR_DIRECTORY_ORDERING, tailor_directory
+
+FILTERS = {
+    'no filter': lambda area, other: {},
+    'work': lambda area, other: {'area_of_work': area},
+    'work + sex': lambda area, other: {'area_of_work': area, 'sex': 'F'},
+    'residence': lambda area, other: {'area_of_residence': area},
+    'work + residence': lambda area, other: {'area_of_work': area, 'area_of_residence': other},
+}
+
+
+def _plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}' if connection.vendor == 'sqlite' else f'EXPLAIN {sql}', params)
+        return ' | '.join(str(row[-1]) for row in cursor.fetchall())
+
+
+class Command(BaseCommand):
+    help = 'Latency of tailor directory pages per filter, first page and a deep page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tailors', type=int, default=1000000)
+        parser.add_argument('--queries', type=int, default=100)
+        parser.add_argument('--depth', type=int, default=50, help='Pages followed to reach the deep page')
+        parser.add_argument('--first', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        first = options['first']
+        with scratch_database():
+            call_command('seed_data', tailors=options['tailors'], stdout=StringIO())
+            self.stdout.write(f"{'filter':<18} {'page 1 p50 ms':>14} {'page 1 max ms':>14} {'deep p50 ms':>12}  plan")
+            for label, make_filters in FILTERS.items():
+                first_page, deep_page = [], []
+                for _ in range(options['queries']):
+                    filters = make_filters(rng.choice(AREAS), rng.choice(AREAS))
+                    after = None
+                    for depth in range(options['depth']):
+                        started = time.perf_counter()
+                        rows, has_next = paginate(tailor_directory(**filters), TAILOR_DIRECTORY_ORDERING, first, after)
+                        elapsed = time.perf_counter() - started
+                        if depth == 0:
+                            first_page.append(elapsed)
+                        if not has_next:
+                            break
+                        after = cursor_for(rows[-1], TAILOR_DIRECTORY_ORDERING)
+                    deep_page.append(elapsed)
+                plan = _plan(tailor_directory(**make_filters(AREAS[0], AREAS[1])).order_by(*TAILOR_DIRECTORY_ORDERING)[:first])
+                self.stdout.write(
+                    f'{label:<18} {statistics.median(first_page) * 1000:>14.3f} '
+                    f'{max(first_page) * 1000:>14.3f} {statistics.median(deep_page) * 1000:>12.3f}  {plan}'
+                )
+
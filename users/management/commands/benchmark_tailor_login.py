@@ -0,0 +1,50 @@
+import random
+import statistics
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from products.management.commands.seed_data import SEED_TAILOR_PREFIX
+from sews.benchmark import scratch_database
+from users.models import TailorDetail
+
+
+def _latencies(lookup, usernames):
+    samples = []
+    for username in usernames:
+        started = time.perf_counter()
+        TailorDetail.objects.get(**{lookup: username})
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+class Command(BaseCommand):
+    help = 'Compare TailorLogin username lookups: iexact scan versus exact match on the unique index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tailors', type=int, default=1000000)
+        parser.add_argument('--logins', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with scratch_database():
+            call_command('seed_data', tailors=options['tailors'], stdout=StringIO())
+            usernames = [
+                f'{SEED_TAILOR_PREFIX}{rng.randrange(options["tailors"]):07d}'
+                for _ in range(options['logins'])
+            ]
+            self.stdout.write(f"{'lookup':<10} {'p50 ms':>9} {'max ms':>9}  plan")
+            for lookup in ('username__iexact', 'username'):
+                samples = _latencies(lookup, usernames)
+                sql, params = TailorDetail.objects.filter(**{lookup: usernames[0]}).query.sql_with_params()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}' if connection.vendor == 'sqlite' else f'EXPLAIN {sql}', params)
+                    plan = ' | '.join(str(row[-1]) for row in cursor.fetchall())
+                self.stdout.write(
+                    f"{lookup.split('__')[-1]:<10} {statistics.median(samples) * 1000:>9.3f} "
+                    f"{max(samples) * 1000:>9.3f}  {plan}"
+                )
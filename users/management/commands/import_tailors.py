@@ -0,0 +1,207 @@
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.auth.models import BaseUserManager
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from users.models import TailorDetail
+from users.schema import RegisterTailor, unique_violation_field
+
+FIELDS = (
+    'full_name', 'username', 'email', 'national_id_number', 'phone_number',
+    'sex', 'area_of_residence', 'area_of_work',
+)
+UNIQUE_FIELDS = ('username', 'email', 'national_id_number')
+
+
+def hash_passwords(hasher, passwords):
+    """
+    Pool task: encode ``passwords`` with ``hasher``. The hasher instance is
+    pickled from the parent, so workers never have to set up Django.
+    """
+    return [hasher.encode(password, hasher.salt()) for password in passwords]
+
+
+def read_rows(handle, fmt):
+    """Yield ``(line, row)`` pairs one at a time; the file is never held in memory."""
+    if fmt == 'csv':
+        reader = csv.DictReader(handle)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line, text in enumerate(handle, 1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as e:
+            yield line, {'__error__': f'Invalid JSON: {e}'}
+            continue
+        yield line, row if isinstance(row, dict) else {'__error__': 'Expected a JSON object'}
+
+
+def build_tailor(row):
+    """Return ``(tailor, password)`` for a valid row, or raise ValidationError."""
+    if '__error__' in row:
+        raise ValidationError(row['__error__'])
+    values = {field: (row.get(field) or '').strip() for field in FIELDS}
+    values['username'] = TailorDetail.normalize_username(values['username'])
+    values['email'] = BaseUserManager.normalize_email(values['email'])
+    password = row.get('password') or ''
+    tailor = TailorDetail(**values)
+    tailor.set_area_keys()  # bulk_create() bypasses save()
+    errors = {}
+    try:
+        tailor.full_clean(exclude=['password', 'last_login'], validate_unique=False)
+    except ValidationError as e:
+        errors.update(e.message_dict)
+    if not password:
+        errors['password'] = ['This field is required.']
+    if errors:
+        raise ValidationError(errors)
+    return tailor, password
+
+
+class Command(BaseCommand):
+    help = (
+        'Import tailors from a CSV or JSONL file (columns: full_name, username, email, '
+        'national_id_number, phone_number, sex, area_of_residence, area_of_work, password). '
+        'Passwords are hashed on a process pool and rows are inserted in chunked transactions; '
+        'rows that fail validation or clash with an existing tailor go to a reject file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin")
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=None, help='Hashing processes; defaults to one per CPU')
+        parser.add_argument('--rejects', help='Reject file (JSONL); defaults to <path>.rejects.jsonl')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl' if path != '-' else None)
+        if fmt is None:
+            raise CommandError('--format is required when reading from stdin')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        rejects_path = options['rejects'] or (
+            'tailor-rejects.jsonl' if path == '-' else f'{path}.rejects.jsonl'
+        )
+        workers = options['workers'] or os.cpu_count() or 1
+        self.hasher = get_hasher('default')
+        self.rejects_path = rejects_path
+        self.rejects = None
+        self.imported = self.rejected = 0
+
+        started = time.perf_counter()
+        handle = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                self.run(executor, workers, read_rows(handle, fmt), options['batch_size'])
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+            if self.rejects is not None:
+                self.rejects.close()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.imported} tailors in {elapsed:.1f}s ({self.imported / elapsed if elapsed else 0:.0f}/s)'
+        ))
+        if self.rejected:
+            self.stdout.write(self.style.WARNING(f'Rejected {self.rejected} rows, see {rejects_path}'))
+
+    def run(self, executor, workers, rows, batch_size):
+        # One batch hashes on the pool while the next one is validated, so
+        # the workers stay busy and at most two batches are held in memory.
+        pending = deque()
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if batch:
+                valid = self.validate(batch)
+                passwords = [password for _, _, password in valid]
+                step = -(-len(passwords) // workers) or 1
+                futures = [
+                    executor.submit(hash_passwords, self.hasher, passwords[start:start + step])
+                    for start in range(0, len(passwords), step)
+                ]
+                pending.append((valid, futures))
+            if pending and (len(pending) > 1 or not batch):
+                valid, futures = pending.popleft()
+                hashes = [encoded for future in futures for encoded in future.result()]
+                for (_, tailor, _), encoded in zip(valid, hashes):
+                    tailor.password = encoded
+                self.insert(valid)
+            if not batch and not pending:
+                return
+
+    def validate(self, batch):
+        """Field validation plus one lookup per unique field for the whole batch."""
+        valid = []
+        for line, row in batch:
+            try:
+                tailor, password = build_tailor(row)
+            except ValidationError as e:
+                self.reject(line, row, e.message_dict if hasattr(e, 'error_dict') else {'__all__': e.messages})
+                continue
+            valid.append((line, tailor, password))
+
+        clashes = {}
+        for field in UNIQUE_FIELDS:
+            values = [getattr(tailor, field) for _, tailor, _ in valid]
+            taken = set(TailorDetail.objects.filter(**{f'{field}__in': values}).values_list(field, flat=True))
+            seen = set()
+            for line, tailor, _ in valid:
+                value = getattr(tailor, field)
+                if value in taken or value in seen:
+                    clashes.setdefault(line, {})[field] = [RegisterTailor.DUPLICATE_MESSAGES[field]]
+                seen.add(value)
+        if clashes:
+            for line, tailor, password in valid:
+                if line in clashes:
+                    self.reject(line, self.row_of(tailor), clashes[line])
+            valid = [entry for entry in valid if entry[0] not in clashes]
+        return valid
+
+    def insert(self, valid):
+        tailors = [tailor for _, tailor, _ in valid]
+        try:
+            with transaction.atomic():
+                TailorDetail.objects.bulk_create(tailors)
+            self.imported += len(tailors)
+            return
+        except IntegrityError:
+            pass
+        # A clash with a row from the previous, still unsaved batch or with a
+        # concurrent signup: retry one row per savepoint to find the culprits.
+        with transaction.atomic():
+            for line, tailor, _ in valid:
+                tailor.pk = None  # may have been set by a sub-batch that was rolled back
+                try:
+                    with transaction.atomic():
+                        tailor.save(force_insert=True)
+                    self.imported += 1
+                except IntegrityError as e:
+                    field = unique_violation_field(e, TailorDetail)
+                    message = RegisterTailor.DUPLICATE_MESSAGES.get(field, str(e))
+                    self.reject(line, self.row_of(tailor), {field or '__all__': [message]})
+
+    @staticmethod
+    def row_of(tailor):
+        return {field: getattr(tailor, field) for field in FIELDS}
+
+    def reject(self, line, row, errors):
+        if self.rejects is None:
+            self.rejects = open(self.rejects_path, 'w', encoding='utf-8')
+        row = {key: value for key, value in row.items() if key not in ('password', '__error__')}
+        self.rejects.write(json.dumps({'line': line, 'row': row, 'errors': errors}) + '\n')
+        self.rejected += 1
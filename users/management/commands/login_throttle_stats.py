@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from users.throttle import get_login_throttle
+
+
+class Command(BaseCommand):
+    help = (
+        'Show how many login attempts the throttle let through and rejected (password hashes saved); '
+        'counts are shared between processes only when LOGIN_THROTTLE_CACHE is a shared cache'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        throttle = get_login_throttle()
+        stats = throttle.stats()
+        self.stdout.write(f"allowed: {stats['allowed']}  rejected (hashes saved): {stats['rejected']}")
+        if options['reset']:
+            throttle.reset_stats()
@@ -1,40 +1,115 @@
+import re
+
 from django.utils.deprecation import MiddlewareMixin
-from django.http import JsonResponse
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.utils.functional import SimpleLazyObject
+from django.contrib.auth.models import AnonymousUser
 from django.conf import settings
+from .authentication import jwt_authentication
+
+
+def compile_exempt_paths(paths):
+    """
+    Fold the JWT_EXEMPT_PATHS prefixes into one anchored regex, so the
+    per-request check is a single match instead of a scan of the list.
+    Returns None when nothing is exempt.
+    """
+    if not paths:
+        return None
+    # Longest first, so a prefix never shadows a longer alternative.
+    prefixes = sorted(set(paths), key=len, reverse=True)
+    return re.compile('|'.join(re.escape(prefix) for prefix in prefixes))
+
+
+def validate_header(auth_header):
+    """The validated token of a ``Bearer`` header, or None when it is missing or invalid."""
+    try:
+        return jwt_authentication.get_validated_token(auth_header.split(' ')[1])
+    except Exception:
+        return None
+
+
+class BearerToken:
+    """The request's bearer token, decoded and verified at most once."""
+
+    __slots__ = ('auth_header', '_validated')
+    _unset = object()
+
+    def __init__(self, auth_header):
+        self.auth_header = auth_header
+        self._validated = self._unset
+
+    def validated(self):
+        if self._validated is self._unset:
+            self._validated = validate_header(self.auth_header)
+        return self._validated
+
+
+def resolve_user(validated_token, fallback):
+    """
+    Resolve the token's user from the table its principal claim names; on
+    any failure the request keeps the user it had before (session user or
+    anonymous).
+    """
+    if validated_token is None:
+        return fallback
+    try:
+        return jwt_authentication.get_user(validated_token)
+    except Exception:
+        # If authentication fails, let the view handle the unauthenticated request
+        return fallback
+
+
+def resolve_principal(validated_token):
+    """Id, principal type and staff flag straight from the token; never queries."""
+    if validated_token is None:
+        return AnonymousUser()
+    try:
+        return jwt_authentication.get_token_user(validated_token)
+    except Exception:
+        return AnonymousUser()
+
 
 class JSONWebTokenMiddleware(MiddlewareMixin):
     """
     Middleware for authenticating with JSON Web Tokens.
+
+    ``request.user`` is lazy: the token is only decoded, verified and mapped
+    to a user the first time something reads ``request.user``, so operations
+    that never look at the user do not pay for it.
+
+    ``request.principal`` is the token-only counterpart for checks that need
+    no more than the id and role, such as the tailor/staff check on image
+    uploads: it shares the validated token with ``request.user`` and never
+    touches the database, so its ``is_staff`` is the token's claim (see
+    PrincipalTokenUser).
     """
     def __init__(self, get_response=None):
         self.get_response = get_response
         super().__init__(get_response)
-        
+        # Compiled once per process when the handler loads the middleware
+        self.exempt_paths = compile_exempt_paths(getattr(settings, 'JWT_EXEMPT_PATHS', []))
+
     def process_request(self, request):
         """
         Process the request to authenticate using JWT.
         """
+        request.principal = AnonymousUser()
+
         # Skip authentication for paths that don't need it
-        exempt_paths = getattr(settings, 'JWT_EXEMPT_PATHS', [])
-        current_path = request.path_info
-        
-        if any(current_path.startswith(path) for path in exempt_paths):
+        if self.exempt_paths is not None and self.exempt_paths.match(request.path_info):
             return None
-            
+
         # Check for authorization header
         auth_header = request.META.get('HTTP_AUTHORIZATION')
         if not auth_header:
             return None  # Let the request continue to views that might handle unauthenticated requests
-        
-        try:
-            # JWT authentication process
-            jwt_auth = JWTAuthentication()
-            validated_token = jwt_auth.get_validated_token(auth_header.split(' ')[1])
-            user = jwt_auth.get_user(validated_token)
-            request.user = user
-        except Exception as e:
-            # If authentication fails, you can either return a response here or let the view handle it
-            return None
-            
-        return None  # Continue processing the request
\ No newline at end of file
+
+        # Not evaluated here: the session user set by AuthenticationMiddleware is lazy too
+        fallback = getattr(request, 'user', None)
+        if fallback is None:
+            fallback = AnonymousUser()
+        # Shared, so whichever attribute is read first verifies the token for both
+        token = BearerToken(auth_header)
+        request.user = SimpleLazyObject(lambda: resolve_user(token.validated(), fallback))
+        request.principal = SimpleLazyObject(lambda: resolve_principal(token.validated()))
+        return None  # Continue processing the request
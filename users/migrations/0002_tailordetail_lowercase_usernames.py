@@ -0,0 +1,46 @@
+# Generated by Django 4.2 on 2026-10-17 19:30
+
+import unicodedata
+
+from django.db import migrations
+
+BATCH_SIZE = 5000
+
+
+def normalize(username):
+    # Mirrors TailorDetail.normalize_username; historical models lack the classmethod.
+    return unicodedata.normalize('NFKC', username).strip().lower()
+
+
+def lowercase_usernames(apps, schema_editor):
+    TailorDetail = apps.get_model('users', 'TailorDetail')
+    db = schema_editor.connection.alias
+    rows = TailorDetail.objects.using(db).order_by().values_list('pk', 'username')
+    seen = set()
+    clashes = []
+    changed = []
+    for pk, username in rows.iterator(chunk_size=BATCH_SIZE):
+        normalized = normalize(username)
+        if normalized in seen:
+            clashes.append(username)
+        seen.add(normalized)
+        if normalized != username:
+            changed.append(TailorDetail(pk=pk, username=normalized))
+    if clashes:
+        # Merging accounts is not a migration's call; rename one side first.
+        raise RuntimeError(
+            'Tailor usernames differ only by case from another tailor and cannot be lowercased: '
+            + ', '.join(clashes[:20])
+        )
+    TailorDetail.objects.using(db).bulk_update(changed, ['username'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_usernames, migrations.RunPython.noop),
+    ]
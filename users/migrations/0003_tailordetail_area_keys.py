@@ -0,0 +1,74 @@
+# Generated by Django 4.2 on 2026-10-17 21:05
+
+import unicodedata
+
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def normalize(area):
+    # Mirrors TailorDetail.normalize_area; historical models lack the method.
+    return ' '.join(unicodedata.normalize('NFKC', area or '').casefold().split())
+
+
+def fill_area_keys(apps, schema_editor):
+    TailorDetail = apps.get_model('users', 'TailorDetail')
+    manager = TailorDetail.objects.using(schema_editor.connection.alias)
+    last_pk = 0
+    # Walks the primary key in pages rather than holding one cursor open
+    # over the table it is updating.
+    while True:
+        rows = list(
+            manager.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'area_of_residence', 'area_of_work')[:BATCH_SIZE]
+        )
+        if not rows:
+            return
+        manager.bulk_update(
+            [
+                TailorDetail(pk=pk, area_of_residence_key=normalize(residence), area_of_work_key=normalize(work))
+                for pk, residence, work in rows
+            ],
+            ['area_of_residence_key', 'area_of_work_key'],
+        )
+        last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_tailordetail_lowercase_usernames'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tailordetail',
+            name='area_of_residence_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='tailordetail',
+            name='area_of_work_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        # Filled before the indexes exist, so they are built once instead of
+        # being updated row by row.
+        migrations.RunPython(fill_area_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='tailordetail',
+            index=models.Index(fields=['date_of_registration', 'id'], name='users_tailor_registered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tailordetail',
+            index=models.Index(fields=['area_of_work_key', 'date_of_registration', 'id'], name='users_tailor_work_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tailordetail',
+            index=models.Index(fields=['area_of_residence_key', 'date_of_registration', 'id'], name='users_tailor_residence_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tailordetail',
+            index=models.Index(fields=['area_of_work_key', 'area_of_residence_key', 'date_of_registration', 'id'], name='users_tailor_work_resid_idx'),
+        ),
+    ]
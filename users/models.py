@@ -1,3 +1,5 @@
+import unicodedata
+
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
@@ -112,6 +114,8 @@ class TailorManager(BaseUserManager):
         """
         if not username:
             raise ValueError('Tailors must have a username')
+
+        username = self.model.normalize_username(username)
         
         if email:
             email = self.normalize_email(email)
@@ -171,6 +175,10 @@ class TailorDetail(AbstractBaseUser, PermissionsMixin):
     area_of_residence = models.CharField(max_length=255)
     area_of_work = models.CharField(max_length=255)
     date_of_registration = models.DateField(auto_now_add=True)
+    # Lookup keys for the tailor directory, kept in step with the free-text
+    # areas by set_area_keys(); see normalize_area().
+    area_of_residence_key = models.CharField(max_length=255, default='', editable=False)
+    area_of_work_key = models.CharField(max_length=255, default='', editable=False)
     
     groups = models.ManyToManyField(
         'auth.Group',
@@ -183,6 +191,61 @@ class TailorDetail(AbstractBaseUser, PermissionsMixin):
         blank=True,
     )
 
+    @classmethod
+    def normalize_username(cls, username):
+        """
+        Usernames are stored lowercased so logins can match them exactly and
+        seek the unique index, instead of scanning it with ``iexact``.
+        """
+        username = super().normalize_username(username)
+        return username.strip().lower() if isinstance(username, str) else username
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the tailor directory over
+            # (date_of_registration, id) within an area; sex is filtered
+            # from the index range, it only halves the rows read.
+            models.Index(fields=['date_of_registration', 'id'], name='users_tailor_registered_idx'),
+            models.Index(
+                fields=['area_of_work_key', 'date_of_registration', 'id'],
+                name='users_tailor_work_idx',
+            ),
+            models.Index(
+                fields=['area_of_residence_key', 'date_of_registration', 'id'],
+                name='users_tailor_residence_idx',
+            ),
+            models.Index(
+                fields=['area_of_work_key', 'area_of_residence_key', 'date_of_registration', 'id'],
+                name='users_tailor_work_resid_idx',
+            ),
+        ]
+
+    @staticmethod
+    def normalize_area(area):
+        """
+        Directory lookup key of a free-text area: "  Dar es  Salaam" and
+        "dar es salaam" both become "dar es salaam".
+        """
+        return ' '.join(unicodedata.normalize('NFKC', area or '').casefold().split())
+
+    def set_area_keys(self):
+        """Refresh the area lookup keys; bulk inserts must call this themselves."""
+        self.area_of_residence_key = self.normalize_area(self.area_of_residence)
+        self.area_of_work_key = self.normalize_area(self.area_of_work)
+
+    def save(self, *args, **kwargs):
+        self.username = self.normalize_username(self.username)
+        self.set_area_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'area_of_residence' in update_fields:
+                update_fields.add('area_of_residence_key')
+            if 'area_of_work' in update_fields:
+                update_fields.add('area_of_work_key')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.full_name
 
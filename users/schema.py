@@ -1,22 +1,83 @@
 import graphene
+from graphene import relay
 from graphene_django.types import DjangoObjectType
-from .models import CustomUser, TailorDetail
+from .models import CustomUser, TailorDetail, TailorProduct
 from django.contrib.auth.hashers import make_password
 import logging
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import Group
+from django.db import IntegrityError, transaction
 from graphql import GraphQLError
+from products.pagination import connection_from_page, paginate
+from sews.dataloaders import get_loader
+from sews.projection import project
+from .authentication import refresh_token_for
+from .throttle import get_login_throttle, throttled_message
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+def unique_violation_field(error, model):
+    """
+    Name of the unique field whose constraint raised ``error``, or None.
+
+    Recognises SQLite (``table.column``), MySQL 8 (``key 'table.column'``),
+    MySQL 5.7 (``key 'column'``) and PostgreSQL (``table_column_key``) messages.
+    """
+    text = str(error.__cause__ or error)
+    table = model._meta.db_table
+    for field in model._meta.fields:
+        if not field.unique or field.primary_key:
+            continue
+        column = field.column
+        if (f'{table}.{column}' in text or f"key '{column}'" in text
+                or f'{table}_{column}_' in text):
+            return field.name
+    return None
+
 # Define the CustomUserType for the GraphQL schema
 class CustomUserType(DjangoObjectType):
     class Meta:
         model = CustomUser 
         fields = ("id", "first_name", "last_name", "email", "is_staff", "is_superuser")
 
+def tailors_by_id(ids):
+    """DataLoader batch: tailors by primary key, one IN query."""
+    return TailorDetail.objects.in_bulk(ids)
+
+def products_by_tailor(tailor_ids):
+    """DataLoader batch: every tailor's products, one IN query."""
+    products = {tailor_id: [] for tailor_id in tailor_ids}
+    for product in TailorProduct.objects.filter(tailor_id__in=tailor_ids).order_by('tailor_id', 'id'):
+        products[product.tailor_id].append(product)
+    return products
+
+def enqueue_tailors(info, tailors):
+    # The tailors' products are fetched together if any of them asks.
+    get_loader(info, products_by_tailor).enqueue(tailor.pk for tailor in tailors)
+
+def enqueue_products(info, products):
+    tailor_ids = [product.tailor_id for product in products]
+    get_loader(info, tailors_by_id).enqueue(tailor_ids)
+    # ...and so are those tailors' products, for product { tailor { products } }
+    get_loader(info, products_by_tailor).enqueue(tailor_ids)
+
+class TailorProductType(DjangoObjectType):
+    tailor = graphene.Field(lambda: TailorDetailType)
+
+    class Meta:
+        model = TailorProduct
+        fields = ("id", "category", "product_name", "product_image", "cost", "description", "measurement_guides")
+
+    def resolve_tailor(self, info):
+        if TailorProduct.tailor.is_cached(self):  # select_related() by sews.projection
+            return self.tailor
+        return get_loader(info, tailors_by_id).load(self.tailor_id)
+
+class TailorProductConnection(relay.Connection):
+    class Meta:
+        node = TailorProductType
+
 # Define TailorDetailType for the TailorDetail model
 class TailorDetailType(DjangoObjectType):
     # Add custom fields with camelCase names
@@ -28,10 +89,17 @@ class TailorDetailType(DjangoObjectType):
     dateOfRegistration = graphene.String()
     isStaff = graphene.Boolean()
     isSuperuser = graphene.Boolean()
+    products = graphene.List(graphene.NonNull(TailorProductType))
     
     class Meta:
         model = TailorDetail
         fields = ("id", "username", "email", "sex")
+
+    def resolve_products(self, info):
+        products = get_loader(info, products_by_tailor).load(self.pk)
+        # Every product's tailor is this one
+        get_loader(info, tailors_by_id).prime(self.pk, self)
+        return products
     
     def resolve_fullName(self, info):
         return self.full_name
@@ -57,6 +125,24 @@ class TailorDetailType(DjangoObjectType):
     def resolve_isSuperuser(self, info):
         return self.is_superuser
 
+class TailorDetailConnection(relay.Connection):
+    class Meta:
+        node = TailorDetailType
+
+# Newest registrations first; each area filter has a (key, date_of_registration, id) index.
+TAILOR_DIRECTORY_ORDERING = ('-date_of_registration', '-id')
+
+def tailor_directory(area_of_work=None, area_of_residence=None, sex=None):
+    """Active tailors matching every given filter; areas match case- and spacing-insensitively."""
+    queryset = TailorDetail.objects.filter(is_active=True)
+    if area_of_work:
+        queryset = queryset.filter(area_of_work_key=TailorDetail.normalize_area(area_of_work))
+    if area_of_residence:
+        queryset = queryset.filter(area_of_residence_key=TailorDetail.normalize_area(area_of_residence))
+    if sex:
+        queryset = queryset.filter(sex=sex.strip().upper())
+    return queryset
+
 # Define the mutation class for creating a CustomUser
 class CreateCustomUser(graphene.Mutation):
     class Arguments:
@@ -73,21 +159,25 @@ class CreateCustomUser(graphene.Mutation):
         try:
             logger.debug(f"Creating user: {first_name} {last_name} with email: {email}")
             
-            # Check if user already exists
-            if CustomUser.objects.filter(email=email).exists():
+            # Create user using the manager for proper setup. A single INSERT in a
+            # savepoint: the unique constraint on email rejects duplicates, so
+            # there is no exists() round-trip and no race between check and insert.
+            try:
+                with transaction.atomic():
+                    custom_user = CustomUser.objects.create_user(
+                        email=email,
+                        password=password,  # The create_user method will hash the password
+                        first_name=first_name,
+                        last_name=last_name
+                    )
+            except IntegrityError as e:
+                if unique_violation_field(e, CustomUser) != 'email':
+                    raise
                 return CreateCustomUser(
                     custom_user=None,
                     success=False,
                     message="User with this email already exists"
                 )
-
-            # Create user using the manager for proper setup
-            custom_user = CustomUser.objects.create_user(
-                email=email,
-                password=password,  # The create_user method will hash the password
-                first_name=first_name,
-                last_name=last_name
-            )
             
             logger.info(f"User created successfully: {custom_user.email}")
             return CreateCustomUser(
@@ -118,7 +208,20 @@ class CustomerUserLogin(graphene.Mutation):
     def mutate(self, info, email, password):
         try:
             logger.debug(f"Attempting customer login with email: {email}")
-            
+
+            # Refuse over-limit attempts before any password is hashed
+            throttle = get_login_throttle()
+            retry_after = throttle.attempt(info.context, email)
+            if retry_after:
+                logger.warning(f"Customer login throttled for email: {email}")
+                return CustomerUserLogin(
+                    token=None,
+                    refresh=None,
+                    user=None,
+                    success=False,
+                    message=throttled_message(retry_after)
+                )
+
             # Try to authenticate the customer user
             user = authenticate(username=email, password=password)
             
@@ -132,8 +235,10 @@ class CustomerUserLogin(graphene.Mutation):
                     message="authentication failed. "
                 )
 
+            throttle.succeeded(info.context, email)
+
             # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = refresh_token_for(user)
             logger.info(f"Customer authentication successful for: {user.email}")
             
             return CustomerUserLogin(
@@ -169,6 +274,19 @@ class ObtainJwtToken(graphene.Mutation):
         try:
             logger.debug(f"Attempting to obtain token for email: {email}")
             
+            # Refuse over-limit attempts before any password is hashed
+            throttle = get_login_throttle()
+            retry_after = throttle.attempt(info.context, email)
+            if retry_after:
+                logger.warning(f"Token request throttled for email: {email}")
+                return ObtainJwtToken(
+                    token=None,
+                    refresh=None,
+                    user=None,
+                    success=False,
+                    message=throttled_message(retry_after)
+                )
+
             # Use authenticate with correct parameters
             user = authenticate(username=email, password=password)
             
@@ -182,7 +300,8 @@ class ObtainJwtToken(graphene.Mutation):
                     message="Login failed. Please try againInvalid credentials"
                 )
 
-            refresh = RefreshToken.for_user(user)
+            throttle.succeeded(info.context, email)
+            refresh = refresh_token_for(user)
             logger.info(f"Authentication successful for user: {user.email}")
             
             return ObtainJwtToken(
@@ -227,8 +346,8 @@ class TailorLogin(graphene.Mutation):
                     message="Username and password are required"
                 )
             
-            # Clean and normalize the username
-            cleaned_username = username.strip().rstrip('@').lower()
+            # Clean and normalize the username the same way it was stored
+            cleaned_username = TailorDetail.normalize_username(username.strip().rstrip('@'))
             
             if not cleaned_username:
                 logger.warning("Authentication attempt with invalid username after cleaning")
@@ -241,10 +360,23 @@ class TailorLogin(graphene.Mutation):
                 )
             
             logger.debug(f"Login attempt for user '{cleaned_username}' (original: '{username}')")
+
+            # Refuse over-limit attempts before the lookup and the password hash
+            throttle = get_login_throttle()
+            retry_after = throttle.attempt(info.context, cleaned_username)
+            if retry_after:
+                logger.warning(f"Login throttled for user '{cleaned_username}'")
+                return TailorLogin(
+                    token=None,
+                    refresh=None,
+                    tailor=None,
+                    success=False,
+                    message=throttled_message(retry_after)
+                )
             
-            # Step 1: Check if tailor exists
+            # Step 1: Check if tailor exists (exact match on the unique index)
             try:
-                tailor = TailorDetail.objects.get(username__iexact=cleaned_username)
+                tailor = TailorDetail.objects.get(username=cleaned_username)
                 logger.debug(f"User '{cleaned_username}' found in database")
             except TailorDetail.DoesNotExist:
                 logger.warning(f"User '{cleaned_username}' not found in tailor records")
@@ -286,9 +418,11 @@ class TailorLogin(graphene.Mutation):
                     message="Invalid username or password"  # Generic message for security
                 )
             
+            throttle.succeeded(info.context, cleaned_username)
+
             # Step 4: Generate tokens
             try:
-                refresh = RefreshToken.for_user(tailor)
+                refresh = refresh_token_for(tailor)
                 access_token = str(refresh.access_token)
                 refresh_token = str(refresh)
                 
@@ -338,38 +472,42 @@ class RegisterTailor(graphene.Mutation):
         areaOfResidence = graphene.String(required=True)  # Changed from area_of_residence
         areaOfWork = graphene.String(required=True)  # Changed from area_of_work
         password = graphene.String(required=True)
+
+    # Friendly messages for the unique constraint that rejected the INSERT
+    DUPLICATE_MESSAGES = {
+        'username': "Username already exists",
+        'email': "Email already exists",
+        'national_id_number': "National ID number already exists",
+    }
         
     def mutate(self, info, fullName, username, email, nationalIdNumber, phoneNumber, 
                sex, areaOfResidence, areaOfWork, password):
         try:
-            # Validate inputs
-            if TailorDetail.objects.filter(username=username).exists():
-                return RegisterTailor(
-                    tailor=None,
-                    success=False,
-                    message="Username already exists"
-                )
-               
-            if TailorDetail.objects.filter(email=email).exists():
+            # Create tailor using the manager for proper setup. One INSERT in a
+            # savepoint; the unique constraints reject duplicates atomically.
+            try:
+                with transaction.atomic():
+                    tailor = TailorDetail.objects.create_user(
+                        username=username,
+                        full_name=fullName,  # Map camelCase to snake_case for model
+                        national_id_number=nationalIdNumber,
+                        phone_number=phoneNumber,
+                        email=email,
+                        sex=sex,
+                        area_of_residence=areaOfResidence,
+                        area_of_work=areaOfWork,
+                        password=password  # Manager will hash the password
+                    )
+            except IntegrityError as e:
+                message = RegisterTailor.DUPLICATE_MESSAGES.get(unique_violation_field(e, TailorDetail))
+                if message is None:
+                    raise
                 return RegisterTailor(
                     tailor=None,
                     success=False,
-                    message="Email already exists"
+                    message=message
                 )
             
-            # Create tailor using the manager for proper setup
-            tailor = TailorDetail.objects.create_user(
-                username=username,
-                full_name=fullName,  # Map camelCase to snake_case for model
-                national_id_number=nationalIdNumber,
-                phone_number=phoneNumber,
-                email=email,
-                sex=sex,
-                area_of_residence=areaOfResidence,
-                area_of_work=areaOfWork,
-                password=password  # Manager will hash the password
-            )
-            
             logger.info(f"Tailor registered successfully: {tailor.username}")
             return RegisterTailor(
                 tailor=tailor,
@@ -387,27 +525,60 @@ class RegisterTailor(graphene.Mutation):
 # Define the Query class
 class Query(graphene.ObjectType):
     all_custom_users = graphene.List(CustomUserType)
-    all_tailors = graphene.List(TailorDetailType)
+    all_tailors = graphene.List(
+        TailorDetailType, deprecation_reason='Unbounded; use the paginated tailors connection.'
+    )
+    tailors = graphene.Field(
+        TailorDetailConnection,
+        area_of_work=graphene.String(),
+        area_of_residence=graphene.String(),
+        sex=graphene.String(),
+        first=graphene.Int(),
+        after=graphene.String(),
+        description='Tailor directory, newest registrations first.',
+    )
+    tailor_products = graphene.Field(
+        TailorProductConnection,
+        first=graphene.Int(),
+        after=graphene.String(),
+        description='Tailor products in creation order.',
+    )
     custom_user = graphene.Field(CustomUserType, id=graphene.ID())
     tailor = graphene.Field(TailorDetailType, id=graphene.ID())
 
     def resolve_all_custom_users(self, info):
         logger.debug("Fetching all custom users.")
-        return CustomUser.objects.all()
+        return project(CustomUser.objects.all(), info)
     
     def resolve_all_tailors(self, info):
         logger.debug("Fetching all registered tailors.")
-        return TailorDetail.objects.all()
+        tailors = list(project(TailorDetail.objects.all(), info))
+        enqueue_tailors(info, tailors)
+        return tailors
+
+    def resolve_tailors(self, info, area_of_work=None, area_of_residence=None, sex=None, first=None, after=None):
+        queryset = tailor_directory(area_of_work, area_of_residence, sex)
+        queryset = project(queryset, info, ('edges', 'node'), TAILOR_DIRECTORY_ORDERING)
+        rows, has_next_page = paginate(queryset, TAILOR_DIRECTORY_ORDERING, first, after)
+        enqueue_tailors(info, rows)
+        return connection_from_page(TailorDetailConnection, rows, has_next_page, TAILOR_DIRECTORY_ORDERING, after)
+
+    def resolve_tailor_products(self, info, first=None, after=None):
+        # tailor_id is read by enqueue_products()
+        queryset = project(TailorProduct.objects.all(), info, ('edges', 'node'), ('id', 'tailor'))
+        rows, has_next_page = paginate(queryset, ('id',), first, after)
+        enqueue_products(info, rows)
+        return connection_from_page(TailorProductConnection, rows, has_next_page, ('id',), after)
     
     def resolve_custom_user(self, info, id):
         try:
-            return CustomUser.objects.get(pk=id)
+            return project(CustomUser.objects.all(), info).get(pk=id)
         except CustomUser.DoesNotExist:
             return None
     
     def resolve_tailor(self, info, id):
         try:
-            return TailorDetail.objects.get(pk=id)
+            return project(TailorDetail.objects.all(), info).get(pk=id)
         except TailorDetail.DoesNotExist:
             return None
 
@@ -0,0 +1,25 @@
+from django.contrib.auth.hashers import get_hashers, get_hashers_by_algorithm
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .auth_cache import principal_cache
+from .authentication import principal_type
+from .models import CustomUser, TailorDetail
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_save, sender=TailorDetail)
+@receiver(post_delete, sender=TailorDetail)
+def principal_changed(sender, instance, **kwargs):
+    # Deactivation, password and permission changes must not be served from the cache.
+    principal_cache.invalidate((principal_type(instance), instance.pk))
+
+
+@receiver(setting_changed)
+def reset_password_hasher_costs(sender, setting, **kwargs):
+    # Django only drops its cached hasher instances when PASSWORD_HASHERS
+    # itself changes; ours also read their cost when instantiated.
+    if setting.startswith(('PASSWORD_PBKDF2_', 'PASSWORD_SCRYPT_')):
+        get_hashers.cache_clear()
+        get_hashers_by_algorithm.cache_clear()
@@ -1,3 +1,504 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import warnings
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.cache.backends.base import CacheKeyWarning
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .auth_cache import principal_cache
+from .authentication import refresh_token_for
+from .middleware import JSONWebTokenMiddleware
+from .models import CustomUser, TailorDetail, TailorProduct
+from .schema import schema
+from .throttle import get_login_throttle
 
 # Create your tests here.
+
+
+class JSONWebTokenMiddlewareTests(TestCase):
+    """Bearer tokens are validated lazily and their users served from the per-process cache."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='amina@example.com', password='secret-pass')
+
+    def setUp(self):
+        principal_cache.clear()
+        self.header = f'Bearer {AccessToken.for_user(self.user)}'
+
+    def authenticate(self, path='/graphql/', header=None):
+        request = RequestFactory().post(path, HTTP_AUTHORIZATION=header or self.header)
+        request.user = AnonymousUser()
+        JSONWebTokenMiddleware(lambda request: None).process_request(request)
+        return request
+
+    def test_repeated_requests_need_no_auth_queries(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate().user.pk, self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate().user.pk, self.user.pk)
+        self.assertEqual(principal_cache.stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+    def test_saving_the_user_evicts_it(self):
+        self.authenticate().user.is_authenticated
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(principal_cache.stats()['size'], 0)
+        with self.assertNumQueries(1):
+            self.assertFalse(self.authenticate().user.is_authenticated)
+
+    def test_token_is_only_checked_when_the_user_is_read(self):
+        with self.assertNumQueries(0):
+            self.authenticate()
+        self.assertEqual(principal_cache.stats()['misses'], 0)
+
+    def test_invalid_token_keeps_the_previous_user(self):
+        self.assertTrue(self.authenticate(header='Bearer not-a-token').user.is_anonymous)
+
+    @override_settings(JWT_EXEMPT_PATHS=['/admin/', '/api/clothing-styles/'])
+    def test_exempt_paths_skip_authentication(self):
+        request = self.authenticate('/api/clothing-styles/search/')
+        self.assertIsInstance(request.user, AnonymousUser)
+        self.assertEqual(self.authenticate('/api/other/').user.pk, self.user.pk)
+
+    def test_tailor_token_resolves_to_the_tailor(self):
+        tailor = TailorDetail.objects.create_user(
+            username='baraka', full_name='Baraka Said', national_id_number='19880303-00003',
+            phone_number='+255700000003', password='secret-pass', email='baraka@example.com',
+            sex='M', area_of_residence='Dodoma', area_of_work='Dodoma',
+        )
+        header = f'Bearer {refresh_token_for(tailor).access_token}'
+        with self.assertNumQueries(1):
+            user = self.authenticate(header=header).user
+            self.assertIsInstance(user, TailorDetail)
+            self.assertEqual(user.pk, tailor.pk)
+        with self.assertNumQueries(0):
+            self.assertIsInstance(self.authenticate(header=header).user, TailorDetail)
+        # Customers and tailors are cached under separate keys even when their ids collide
+        with self.assertNumQueries(1):
+            self.assertIsInstance(self.authenticate().user, CustomUser)
+
+    def test_principal_is_read_from_the_token(self):
+        tailor = TailorDetail(pk=self.user.pk + 1000, username='ghost', is_staff=False)
+        with self.assertNumQueries(0):
+            principal = self.authenticate(header=f'Bearer {refresh_token_for(tailor).access_token}').principal
+            self.assertTrue(principal.is_tailor)
+            self.assertEqual(principal.pk, tailor.pk)
+            self.assertTrue(self.authenticate().principal.is_customer)
+            self.assertTrue(self.authenticate(header='Bearer not-a-token').principal.is_anonymous)
+
+    def test_staff_flag_is_trusted_from_the_token(self):
+        self.user.is_staff = True
+        self.user.save()
+        header = f'Bearer {refresh_token_for(self.user).access_token}'
+        self.user.is_staff = False
+        self.user.save()
+        with self.assertNumQueries(0):
+            self.assertTrue(self.authenticate(header=header).principal.is_staff)
+        self.assertFalse(self.authenticate(header=header).user.is_staff)
+        self.assertFalse(self.authenticate().principal.is_staff)
+
+
+class TailorLoginTests(TestCase):
+    """Usernames are stored lowercased, so logins match them exactly."""
+
+    LOGIN = '''
+        mutation ($username: String!, $password: String!) {
+            tailorLogin(username: $username, password: $password) { success message }
+        }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tailor = TailorDetail.objects.create_user(
+            username='  Mama.Ashura ', full_name='Ashura Mussa', national_id_number='19900101-00001',
+            phone_number='+255700000001', password='secret-pass', email='ashura@example.com',
+            sex='F', area_of_residence='Arusha', area_of_work='Arusha',
+        )
+
+    def test_username_is_stored_lowercased(self):
+        self.assertEqual(self.tailor.username, 'mama.ashura')
+
+    def test_login_matches_any_case_with_an_exact_lookup(self):
+        with CaptureQueriesContext(connection) as ctx:
+            result = schema.execute(self.LOGIN, variables={'username': 'MAMA.Ashura', 'password': 'secret-pass'})
+        self.assertIsNone(result.errors)
+        self.assertTrue(result.data['tailorLogin']['success'])
+        self.assertNotIn('LIKE', ctx.captured_queries[0]['sql'])
+
+
+class RegistrationTests(TestCase):
+    """Signups are one INSERT; the unique constraints report duplicates."""
+
+    REGISTER = '''
+        mutation ($username: String!, $email: String!, $nid: String!) {
+            registerTailor(fullName: "Neema Juma", username: $username, email: $email,
+                           nationalIdNumber: $nid, phoneNumber: "+255700000002", sex: "F",
+                           areaOfResidence: "Mwanza", areaOfWork: "Mwanza", password: "secret-pass") {
+                success message
+            }
+        }
+    '''
+
+    def register(self, username='neema', email='neema@example.com', nid='19920202-00002'):
+        with CaptureQueriesContext(connection) as ctx:
+            result = schema.execute(self.REGISTER, variables={'username': username, 'email': email, 'nid': nid})
+        self.assertIsNone(result.errors)
+        statements = [query['sql'].split()[0] for query in ctx.captured_queries]
+        return result.data['registerTailor'], statements
+
+    def test_registration_is_a_single_insert(self):
+        data, statements = self.register()
+        self.assertTrue(data['success'])
+        self.assertEqual([s for s in statements if s in ('SELECT', 'INSERT')], ['INSERT'])
+
+    def test_duplicates_map_to_friendly_messages(self):
+        self.register()
+        cases = [
+            ({'username': 'Neema', 'email': 'other@example.com', 'nid': 'other'}, 'Username already exists'),
+            ({'username': 'other', 'nid': 'other'}, 'Email already exists'),
+            ({'username': 'other', 'email': 'other@example.com'}, 'National ID number already exists'),
+        ]
+        for arguments, message in cases:
+            data, _ = self.register(**arguments)
+            self.assertEqual(data, {'success': False, 'message': message})
+        self.assertEqual(TailorDetail.objects.count(), 1)
+
+    def test_duplicate_customer_email(self):
+        mutation = '''
+            mutation { createCustomUser(firstName: "Juma", lastName: "Ali", email: "juma@example.com",
+                                        password: "secret-pass") { success message } }
+        '''
+        self.assertTrue(schema.execute(mutation).data['createCustomUser']['success'])
+        self.assertEqual(
+            schema.execute(mutation).data['createCustomUser'],
+            {'success': False, 'message': 'User with this email already exists'},
+        )
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportTailorsTests(TestCase):
+    """import_tailors inserts the valid rows and writes the rest to the reject file."""
+
+    def test_import_with_rejects(self):
+        rows = [
+            {'full_name': 'Neema Juma', 'username': 'Neema', 'email': 'neema@example.com',
+             'national_id_number': 'N1', 'phone_number': '+255700000002', 'sex': 'F',
+             'area_of_residence': 'Mwanza', 'area_of_work': 'Mwanza', 'password': 'secret-pass'},
+            {'full_name': 'Neema Again', 'username': 'neema', 'email': 'other@example.com',
+             'national_id_number': 'N2', 'phone_number': '+255700000003', 'sex': 'F',
+             'area_of_residence': 'Mwanza', 'area_of_work': 'Mwanza', 'password': 'secret-pass'},
+            {'full_name': 'No Password', 'username': 'juma', 'email': 'juma@example.com',
+             'national_id_number': 'N3', 'phone_number': '+255700000004', 'sex': 'X',
+             'area_of_residence': 'Dodoma', 'area_of_work': 'Dodoma'},
+        ]
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, 'tailors.jsonl')
+            with open(path, 'w') as handle:
+                handle.writelines(json.dumps(row) + '\n' for row in rows)
+                handle.write('{not json\n')
+            call_command('import_tailors', path, workers=1, batch_size=2, stdout=StringIO())
+            with open(path + '.rejects.jsonl') as handle:
+                rejects = {entry['line']: entry['errors'] for entry in map(json.loads, handle)}
+
+        tailor = TailorDetail.objects.get()
+        self.assertEqual(tailor.username, 'neema')
+        self.assertTrue(tailor.check_password('secret-pass'))
+        self.assertEqual(rejects[2], {'username': ['Username already exists']})
+        self.assertEqual(set(rejects[3]), {'sex', 'password'})
+        self.assertIn('__all__', rejects[4])
+
+
+class PasswordRehashTests(TestCase):
+    """A successful login re-encodes the hash with the configured hasher and cost."""
+
+    PBKDF2 = 'users.hashers.ConfigurablePBKDF2PasswordHasher'
+    SCRYPT = 'users.hashers.ConfigurableScryptPasswordHasher'
+
+    def test_tailor_login_changes_pbkdf2_iterations(self):
+        with self.settings(PASSWORD_HASHERS=[self.PBKDF2], PASSWORD_PBKDF2_ITERATIONS=2000):
+            tailor = TailorDetail.objects.create_user(
+                username='zawadi', full_name='Zawadi Said', national_id_number='N9',
+                phone_number='+255700000009', password='secret-pass', email='zawadi@example.com',
+                sex='F', area_of_residence='Tanga', area_of_work='Tanga',
+            )
+        self.assertTrue(tailor.password.startswith('pbkdf2_sha256$2000$'))
+        with self.settings(PASSWORD_HASHERS=[self.PBKDF2], PASSWORD_PBKDF2_ITERATIONS=1000):
+            result = schema.execute(TailorLoginTests.LOGIN, variables={'username': 'zawadi', 'password': 'secret-pass'})
+        self.assertTrue(result.data['tailorLogin']['success'])
+        tailor.refresh_from_db()
+        self.assertTrue(tailor.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_customer_login_moves_to_the_preferred_hasher(self):
+        with self.settings(PASSWORD_HASHERS=[self.PBKDF2], PASSWORD_PBKDF2_ITERATIONS=1000):
+            user = CustomUser.objects.create_user(email='baraka@example.com', password='secret-pass')
+        mutation = '''
+            mutation { customerUserLogin(email: "baraka@example.com", password: "secret-pass") { success } }
+        '''
+        with self.settings(PASSWORD_HASHERS=[self.SCRYPT, self.PBKDF2], PASSWORD_SCRYPT_WORK_FACTOR=2 ** 10):
+            self.assertTrue(schema.execute(mutation).data['customerUserLogin']['success'])
+            user.refresh_from_db()
+            self.assertTrue(user.password.startswith('scrypt$1024$'))
+            self.assertTrue(user.check_password('secret-pass'))
+
+
+@override_settings(LOGIN_THROTTLE_USERNAME_BURST=3, LOGIN_THROTTLE_IP_BURST=10)
+class LoginThrottleTests(TestCase):
+    """Over-limit login attempts are refused before any password is hashed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tailor = TailorDetail.objects.create_user(
+            username='halima', full_name='Halima Omari', national_id_number='N7',
+            phone_number='+255700000007', password='secret-pass', email='halima@example.com',
+            sex='F', area_of_residence='Dodoma', area_of_work='Dodoma',
+        )
+
+    def setUp(self):
+        caches['login-throttle'].clear()
+
+    def login(self, password, ip='10.0.0.1', username='halima'):
+        context = RequestFactory().post('/graphql/', REMOTE_ADDR=ip)
+        result = schema.execute(
+            TailorLoginTests.LOGIN, variables={'username': username, 'password': password}, context_value=context,
+        )
+        return result.data['tailorLogin']
+
+    def test_username_bucket_stops_hashing(self):
+        with mock.patch.object(TailorDetail, 'check_password', autospec=True, return_value=False) as check:
+            results = [self.login('wrong', ip=f'10.0.0.{i}') for i in range(5)]
+        self.assertEqual([r['success'] for r in results], [False] * 5)
+        self.assertTrue(results[3]['message'].startswith('Too many login attempts'))
+        self.assertEqual(check.call_count, 3)
+        self.assertEqual(get_login_throttle().stats(), {'allowed': 3, 'rejected': 2})
+
+    def test_ip_bucket_spans_usernames(self):
+        results = [self.login('wrong', username=f'guess{i}') for i in range(12)]
+        self.assertEqual(sum(r['message'].startswith('Too many') for r in results), 2)
+
+    def test_successful_logins_are_not_throttled(self):
+        for _ in range(5):
+            self.assertTrue(self.login('secret-pass')['success'])
+
+    def test_other_cache_traffic_cannot_evict_buckets(self):
+        for i in range(3):
+            self.login('wrong', ip=f'10.0.0.{i}')
+        for alias in ('default', 'graphql-apq', 'graphql-results'):
+            for i in range(1000):
+                caches[alias].set(f'flood:{i}', i)
+        self.assertTrue(self.login('wrong')['message'].startswith('Too many login attempts'))
+
+    def test_keys_hash_the_identifiers(self):
+        username = ' Halima\n' + 'x' * 300
+        ip = '2001:db8::1, 10.0.0.1'
+        with override_settings(LOGIN_THROTTLE_IP_HEADER='HTTP_X_FORWARDED_FOR'):
+            request = RequestFactory().post('/graphql/', HTTP_X_FORWARDED_FOR=ip)
+            keys = get_login_throttle()._keys(request, username)
+        self.assertEqual(set(keys), {'username', 'ip'})
+        for key in keys.values():
+            self.assertRegex(key, r'^users:login-throttle:(username|ip):[0-9a-f]{64}$')
+        same = get_login_throttle()._keys(None, username.upper().strip())
+        self.assertEqual(same['username'], keys['username'])
+
+    def test_hostile_usernames_are_still_throttled(self):
+        username = 'halima\x07' + 'x' * 300  # a raw key memcached would refuse
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            results = [self.login('wrong', ip=f'10.0.0.{i}', username=username) for i in range(5)]
+        self.assertEqual(sum(r['message'].startswith('Too many') for r in results), 2)
+
+
+class TailorDirectoryTests(TestCase):
+    """The tailors connection filters on normalised area keys and pages by keyset."""
+
+    QUERY = '''
+        query ($work: String, $residence: String, $sex: String, $first: Int, $after: String) {
+            tailors(areaOfWork: $work, areaOfResidence: $residence, sex: $sex, first: $first, after: $after) {
+                edges { node { username } }
+                pageInfo { hasNextPage endCursor }
+            }
+        }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        areas = [('Kinondoni', 'Ilala', 'F'), (' kinondoni ', 'Temeke', 'M'), ('KINONDONI', 'Ilala', 'M'),
+                 ('Dar es  Salaam', 'Ilala', 'F'), ('Arusha', 'Arusha', 'F')]
+        for i, (work, residence, sex) in enumerate(areas):
+            TailorDetail.objects.create_user(
+                username=f'tailor{i}', full_name=f'Tailor {i}', national_id_number=f'D{i}',
+                phone_number='+255700000010', password='secret-pass', email=f'tailor{i}@example.com',
+                sex=sex, area_of_residence=residence, area_of_work=work,
+            )
+
+    def usernames(self, **variables):
+        result = schema.execute(self.QUERY, variables=variables)
+        self.assertIsNone(result.errors)
+        connection_data = result.data['tailors']
+        return [edge['node']['username'] for edge in connection_data['edges']], connection_data['pageInfo']
+
+    def test_filters_ignore_case_and_spacing(self):
+        self.assertEqual(self.usernames(work='kinondoni')[0], ['tailor2', 'tailor1', 'tailor0'])
+        self.assertEqual(self.usernames(work='Kinondoni', residence='ILALA', sex='m')[0], ['tailor2'])
+        self.assertEqual(self.usernames(work='dar es salaam')[0], ['tailor3'])
+
+    def test_pages_follow_the_cursor(self):
+        seen, after = [], None
+        while True:
+            page, info = self.usernames(first=2, after=after)
+            seen += page
+            if not info['hasNextPage']:
+                break
+            after = info['endCursor']
+        self.assertEqual(seen, [f'tailor{i}' for i in range(4, -1, -1)])
+
+    def test_area_keys_follow_updates(self):
+        tailor = TailorDetail.objects.get(username='tailor4')
+        tailor.area_of_work = 'Kinondoni'
+        tailor.save(update_fields=['area_of_work'])
+        self.assertIn('tailor4', self.usernames(work='KINONDONI')[0])
+
+
+class TailorProductLoaderTests(TestCase):
+    """Products and their tailors are loaded with one IN query per relation, however many rows."""
+
+    TAILORS = '''
+        query ($first: Int) {
+            tailors(first: $first) {
+                edges { node { username products { productName tailor { username } } } }
+            }
+        }
+    '''
+    PRODUCTS = '''
+        query ($first: Int) {
+            tailorProducts(first: $first) {
+                edges { node { productName tailor { username products { id } } } }
+            }
+        }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        tailors = TailorDetail.objects.bulk_create(
+            TailorDetail(username=f'maker{i}', full_name=f'Maker {i}', national_id_number=f'P{i}',
+                         phone_number='+255700000020', email=f'maker{i}@example.com', sex='F',
+                         area_of_residence='Mwanza', area_of_work='Mwanza')
+            for i in range(100)
+        )
+        TailorProduct.objects.bulk_create(
+            TailorProduct(tailor=tailor, category='SUIT', product_name=f'Suit {tailor.pk}-{n}',
+                          product_image='https://images.example.com/suit.jpg', cost=1000,
+                          description='Suit', measurement_guides='Chest')
+            for tailor in tailors for n in range(3)
+        )
+
+    def execute(self, query, first):
+        result = schema.execute(query, variables={'first': first}, context_value=RequestFactory().post('/graphql/'))
+        self.assertIsNone(result.errors)
+        return result.data
+
+    def test_tailors_with_products_is_constant(self):
+        # tailors page + products IN (...); each product's tailor is primed from its parent
+        with self.assertNumQueries(2):
+            data = self.execute(self.TAILORS, 10)
+        with self.assertNumQueries(2):
+            data = self.execute(self.TAILORS, 100)
+        nodes = [edge['node'] for edge in data['tailors']['edges']]
+        self.assertEqual(len(nodes), 100)
+        self.assertTrue(all(
+            len(node['products']) == 3 and {p['tailor']['username'] for p in node['products']} == {node['username']}
+            for node in nodes
+        ))
+
+    def test_products_with_tailors_is_constant(self):
+        # products page joined to the selected tailor columns + products IN (...)
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.execute(self.PRODUCTS, 100)
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertIn('JOIN "users_tailordetail"', ctx.captured_queries[0]['sql'])
+        self.assertNotIn('"full_name"', ctx.captured_queries[0]['sql'])
+        self.assertEqual(len(data['tailorProducts']['edges']), 100)
+        self.assertEqual(len(data['tailorProducts']['edges'][0]['node']['tailor']['products']), 3)
+
+
+class BatchedGraphQLTests(TestCase):
+    """A JSON array body runs every operation in one request with shared loaders."""
+
+    TAILORS = '{ tailors(first: 5) { edges { node { username products { productName } } } } }'
+
+    @classmethod
+    def setUpTestData(cls):
+        tailors = TailorDetail.objects.bulk_create(
+            TailorDetail(username=f'batch{i}', full_name=f'Batch {i}', national_id_number=f'B{i}',
+                         phone_number='+255700000030', email=f'batch{i}@example.com', sex='M',
+                         area_of_residence='Arusha', area_of_work='Arusha')
+            for i in range(5)
+        )
+        TailorProduct.objects.bulk_create(
+            TailorProduct(tailor=tailor, category='SHIRT', product_name=f'Shirt {tailor.pk}',
+                          product_image='https://images.example.com/shirt.jpg', cost=500,
+                          description='Shirt', measurement_guides='Neck')
+            for tailor in tailors
+        )
+
+    def post(self, body):
+        return self.client.post('/graphql/', json.dumps(body), content_type='application/json')
+
+    def product_queries(self, captured):
+        return [query for query in captured if 'FROM "users_tailorproduct"' in query['sql']]
+
+    def test_batch_returns_one_result_per_operation(self):
+        response = self.post([
+            {'id': 'a', 'query': self.TAILORS},
+            {'id': 'b', 'query': '{ tailors(first: 1) { edges { node { username } } } }'},
+            {'id': 'c', 'query': '{ nope }'},
+        ])
+        self.assertEqual(response.status_code, 400)  # the highest of the operations' statuses
+        results = response.json()
+        self.assertEqual([result['id'] for result in results], ['a', 'b', 'c'])
+        self.assertEqual([result['status'] for result in results], [200, 200, 400])
+        self.assertEqual(len(results[0]['data']['tailors']['edges']), 5)
+        self.assertIn('errors', results[2])
+
+    def test_operations_share_loaders(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.post([{'query': self.TAILORS}, {'query': self.TAILORS}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['data'], response.json()[1]['data'])
+        self.assertEqual(len(self.product_queries(ctx.captured_queries)), 1)
+
+    def test_mutations_clear_loaders(self):
+        mutation = '''mutation { createCustomUser(firstName: "A", lastName: "B", email: "batch@example.com",
+                                                  password: "secret-pass") { success } }'''
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.post([{'query': self.TAILORS}, {'query': mutation}, {'query': self.TAILORS}])
+        self.assertTrue(response.json()[1]['data']['createCustomUser']['success'])
+        self.assertEqual(len(self.product_queries(ctx.captured_queries)), 2)
+
+    def test_batch_size_is_limited(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        with override_settings(GRAPHQL_MAX_BATCH_SIZE=2):
+            self.assertEqual(self.post([{'query': self.TAILORS}] * 3).status_code, 400)
+        self.assertEqual(self.post([self.TAILORS]).status_code, 400)
+
+    @override_settings(GRAPHQL_MAX_COST=200, GRAPHQL_MAX_BATCH_COST=300)
+    def test_batch_cost_is_summed(self):
+        mutation = '''mutation { createCustomUser(firstName: "A", lastName: "B", email: "costly@example.com",
+                                                  password: "secret-pass") { success } }'''
+        # Each operation is within GRAPHQL_MAX_COST; together they are not
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.post([{'query': mutation}] + [{'query': self.TAILORS}] * 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('over the limit of 300', response.json()['errors'][0]['message'])
+        self.assertEqual(ctx.captured_queries, [])
+        self.assertFalse(CustomUser.objects.filter(email='costly@example.com').exists())
+        self.assertEqual(self.post([{'query': self.TAILORS}] * 2).status_code, 200)
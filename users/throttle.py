@@ -0,0 +1,124 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+KEY_PREFIX = 'users:login-throttle'
+STAT_NAMES = ('allowed', 'rejected')
+
+
+class LoginThrottle:
+    """
+    Token buckets per username and per client IP, checked before any
+    password is hashed.
+
+    Every attempt takes a token from both buckets; a bucket refills at
+    ``per_minute`` tokens a minute up to ``burst``. A successful login hands
+    the username's token back, so a user logging in normally is never
+    throttled by their own logins.
+
+    State lives in the cache named by LOGIN_THROTTLE_CACHE, so the backing
+    store is whatever that cache uses: local memory for one process, or a
+    file or database cache shared by every worker. The alias is not shared
+    with other caches, whose traffic would otherwise evict the buckets. Buckets are read and
+    written with get_many/set_many, which is approximate under concurrent
+    attempts on the same key - a burst can overshoot by the number of
+    workers, which is fine for a throttle.
+    """
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'LOGIN_THROTTLE_CACHE', 'login-throttle')]
+        self.limits = {
+            'username': (
+                getattr(settings, 'LOGIN_THROTTLE_USERNAME_BURST', 5),
+                getattr(settings, 'LOGIN_THROTTLE_USERNAME_PER_MINUTE', 5) / 60.0,
+            ),
+            'ip': (
+                getattr(settings, 'LOGIN_THROTTLE_IP_BURST', 30),
+                getattr(settings, 'LOGIN_THROTTLE_IP_PER_MINUTE', 30) / 60.0,
+            ),
+        }
+
+    @staticmethod
+    def client_ip(request):
+        meta = getattr(request, 'META', None)
+        if meta is None:
+            return None
+        header = getattr(settings, 'LOGIN_THROTTLE_IP_HEADER', None)
+        if header and meta.get(header):
+            # Left-most entry of e.g. X-Forwarded-For, set by a trusted proxy
+            return meta[header].split(',')[0].strip()
+        return meta.get('REMOTE_ADDR')
+
+    @staticmethod
+    def _digest(value):
+        # Client-supplied text never reaches the cache key: fixed length, no
+        # control characters, and usernames are not readable in the store.
+        return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+    def _keys(self, request, username):
+        keys = {'username': f'{KEY_PREFIX}:username:{self._digest((username or "").strip().lower())}'}
+        ip = self.client_ip(request)
+        if ip:
+            keys['ip'] = f'{KEY_PREFIX}:ip:{self._digest(ip)}'
+        return keys
+
+    def attempt(self, request, username):
+        """
+        Take a token for this attempt. Returns 0 when the attempt may go
+        ahead, otherwise the number of seconds until it would be allowed.
+        """
+        now = time.time()
+        keys = self._keys(request, username)
+        stored = self.cache.get_many(list(keys.values()))
+        updated, retry_after = {}, 0.0
+        for kind, key in keys.items():
+            burst, rate = self.limits[kind]
+            tokens, stamp = stored.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - stamp) * rate)
+            if tokens < 1:
+                retry_after = max(retry_after, (1 - tokens) / rate)
+            updated[key] = (tokens - 1, now)
+        if retry_after:
+            self._count('rejected')
+            return math.ceil(retry_after)
+        for kind, key in keys.items():
+            burst, rate = self.limits[kind]
+            # Kept until the bucket would be full again anyway
+            self.cache.set(key, updated[key], math.ceil(burst / rate) + 1)
+        self._count('allowed')
+        return 0
+
+    def succeeded(self, request, username):
+        key = self._keys(request, username)['username']
+        burst, rate = self.limits['username']
+        state = self.cache.get(key)
+        if state is not None:
+            self.cache.set(key, (min(burst, state[0] + 1), state[1]), math.ceil(burst / rate) + 1)
+
+    def _count(self, name):
+        key = f'{KEY_PREFIX}:stats:{name}'
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            if not self.cache.add(key, 1, None):
+                self.cache.incr(key)
+
+    def stats(self):
+        """Attempts let through and rejected; every rejection is a password hash not computed."""
+        values = self.cache.get_many([f'{KEY_PREFIX}:stats:{name}' for name in STAT_NAMES])
+        return {name: values.get(f'{KEY_PREFIX}:stats:{name}', 0) for name in STAT_NAMES}
+
+    def reset_stats(self):
+        self.cache.delete_many([f'{KEY_PREFIX}:stats:{name}' for name in STAT_NAMES])
+
+
+def get_login_throttle():
+    # Built per call: cheap, and follows settings overridden in tests.
+    return LoginThrottle()
+
+
+def throttled_message(retry_after):
+    return f"Too many login attempts. Try again in {retry_after} seconds"
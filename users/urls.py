@@ -4,12 +4,12 @@ from . import views
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.decorators.csrf import csrf_exempt
-from graphene_django.views import GraphQLView
+from sews.views import PersistedQueryGraphQLView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 urlpatterns = [
     path('', views.home, name='home'),
-    path('graphql/', GraphQLView.as_view(graphiql=True, schema=schema)), 
+    path('graphql/', PersistedQueryGraphQLView.as_view(graphiql=True, schema=schema)), 
     # path('graphql/', csrf_exempt(GraphQLView.as_view(graphiql=True))),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),